@@ -0,0 +1,58 @@
+"""
+Client 吞吐量(requests/sec)：并发 1/8/64 个协程，连接池 1/8/64 个 socket
+
+本地 Server 使用 REP socket，逐个处理请求；连接池把请求的编解码、排队与传输重叠起来，
+服务端处理本身仍是串行的
+
+    python benchmarks/bench_client_pool.py [duration_s]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 使用 tests/test_cs.py 中的 StubExchange
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tests.test_cs import StubExchange
+from tradepulse.fetchdata import Client, Server
+
+ADDRESS = "bench_client_pool"
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+
+async def run(concurrency: int, pool_size: int) -> float:
+    client = Client(address=ADDRESS, pool_size=pool_size)
+    await client.request.start()
+    count = 0
+    deadline = time.perf_counter() + DURATION
+
+    async def worker():
+        nonlocal count
+        while time.perf_counter() < deadline:
+            await client._ohlcv("BTC/USDT", "1m", since=0, limit=100)
+            count += 1
+
+    start = time.perf_counter()
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(concurrency):
+            tg.create_task(worker())
+    return count / (time.perf_counter() - start)
+
+
+async def main():
+    server = Server(address=ADDRESS, exchange=StubExchange({}))
+    await server.start()
+    serving = asyncio.create_task(server.serve())
+    print("requests/sec")
+    print(f"{'concurrency':>12}" + "".join(f"{f'pool={p}':>12}" for p in (1, 8, 64)))
+    try:
+        for concurrency in (1, 8, 64):
+            row = [await run(concurrency, pool_size) for pool_size in (1, 8, 64)]
+            print(f"{concurrency:>12}" + "".join(f"{r:>12.0f}" for r in row))
+    finally:
+        serving.cancel()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
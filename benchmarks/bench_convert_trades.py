@@ -0,0 +1,45 @@
+"""
+DataframeCache.convert 转换 ccxt trades（list[dict]）的耗时：按行构造 DataFrame vs 按列转置
+
+    python benchmarks/bench_convert_trades.py [rows] [repeat]
+"""
+import sys
+import time
+
+import polars as pl
+
+from tradepulse.data.cache_data import from_records
+from tradepulse.typenums import TRADES_SCHEME
+
+LEGACY_SCHEME = {**TRADES_SCHEME, "type": pl.String, "side": pl.String}
+
+
+def trades(n: int) -> list[dict]:
+    # 与 ccxt 统一格式相同，包含不入库的字段
+    return [{
+        "info": {"a": i}, "timestamp": 1704067200000 + i, "datetime": "2024-01-01T00:00:00.000Z", "symbol": "BTC/USDT:USDT",
+        "id": str(i), "order": None, "type": None, "side": "buy" if i % 2 else "sell", "takerOrMaker": None,
+        "price": 42000.0 + i % 100, "amount": 0.01, "cost": 420.0, "fee": None, "fees": [],
+    } for i in range(n)]
+
+
+def bench(func, data: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(data)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(n: int, repeat: int):
+    data = trades(n)
+    legacy = bench(lambda d: pl.DataFrame(d, schema=LEGACY_SCHEME), data, repeat)
+    columnar = bench(lambda d: from_records(d, TRADES_SCHEME), data, repeat)
+    print(f"{n} trades, ms per batch")
+    print(f"{'row-wise':>10}{legacy:>10.1f}")
+    print(f"{'columnar':>10}{columnar:>10.1f}")
+    size = lambda df: df.estimated_size() / 1024 / 1024
+    print(f"memory MiB: row-wise {size(pl.DataFrame(data, schema=LEGACY_SCHEME)):.2f}, columnar {size(from_records(data, TRADES_SCHEME)):.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000, int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,66 @@
+"""
+InvokeMethod 编解码耗时对比: google.protobuf.Struct 参数 vs OhlcvRequest/TradesRequest
+
+    python benchmarks/bench_invoke_method.py
+"""
+import timeit
+from typing import cast
+
+from tradepulse.fetchdata.method_invoke import (
+    create_invoke_method,
+    create_ohlcv_invoke_method,
+    market_type_from_id,
+)
+from tradepulse.message.methodid_pb2 import InvokeMethod, MethodID
+from tradepulse.typenums import MarketType
+
+NUMBER = 20000
+PARAMS = {"symbol": "BTC/USDT", "timeframe": "1m", "since": 1717029200000, "limit": 500, "marktype": "future"}
+
+
+def encode_struct() -> bytes:
+    return create_invoke_method(MethodID.OHLCV, PARAMS).SerializeToString()
+
+
+def encode_typed() -> bytes:
+    return create_ohlcv_invoke_method("BTC/USDT", "1m", since=1717029200000, limit=500, market_type="future").SerializeToString()
+
+
+STRUCT_DATA = encode_struct()
+TYPED_DATA = encode_typed()
+
+
+def decode_struct():
+    para = InvokeMethod.FromString(STRUCT_DATA).params.fields
+    return (
+        para["symbol"].string_value,
+        para["timeframe"].string_value,
+        int(para["since"].number_value),
+        int(para["limit"].number_value),
+        cast(MarketType, para["marktype"].string_value),
+    )
+
+
+def decode_typed():
+    req = InvokeMethod.FromString(TYPED_DATA).ohlcv
+    return req.symbol, req.timeframe, req.since, req.limit, market_type_from_id(req.market_type)
+
+
+def per_request_us(func) -> float:
+    return min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+def main():
+    assert decode_struct() == decode_typed()
+    print(f"payload bytes   struct={len(STRUCT_DATA)}  typed={len(TYPED_DATA)}")
+    for name, struct_func, typed_func in (
+        ("encode", encode_struct, encode_typed),
+        ("decode", decode_struct, decode_typed),
+    ):
+        struct_us = per_request_us(struct_func)
+        typed_us = per_request_us(typed_func)
+        print(f"{name:<8}  struct={struct_us:7.2f}us  typed={typed_us:7.2f}us  x{struct_us / typed_us:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+DataFrameRecoder 逐条追加的吞吐量：按块保存 vs 每次 append 都 pl.concat 整个 DataFrame
+
+每次追加一行，模拟实时 trades；旧实现每次复制全部数据（O(n^2)），只跑较小的 n
+
+    python benchmarks/bench_recoder_append.py [n] [legacy_n]
+"""
+import sys
+import time
+
+import polars as pl
+
+from tradepulse.data.dataframe_recoder import DataFrameRecoder
+
+
+def rows(n: int) -> list[pl.DataFrame]:
+    return [pl.DataFrame({"timestamp": [1620000000000 + i], "price": [float(i)], "amount": [1.0]}) for i in range(n)]
+
+
+def bench_chunked(batch: list[pl.DataFrame]) -> float:
+    recoder = DataFrameRecoder(pair="BTC/USDT", marketType="future", datatype="trades")
+    start = time.perf_counter()
+    for row in batch:
+        recoder.append(row)
+    recoder.data
+    elapsed = time.perf_counter() - start
+    assert len(recoder) == len(batch)
+    return elapsed
+
+
+def bench_legacy(batch: list[pl.DataFrame]) -> float:
+    data = pl.DataFrame()
+    start = time.perf_counter()
+    for row in batch:
+        data = row if data.is_empty() else pl.concat([data, row])
+    return time.perf_counter() - start
+
+
+def main(n: int, legacy_n: int):
+    batch = rows(n)
+    print(f"{'impl':>8}{'rows':>12}{'seconds':>12}{'rows/sec':>14}")
+    for name, func, size in (("chunked", bench_chunked, n), ("legacy", bench_legacy, legacy_n)):
+        elapsed = func(batch[:size])
+        print(f"{name:>8}{size:>12}{elapsed:>12.2f}{size / elapsed:>14.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, int(sys.argv[2]) if len(sys.argv) > 2 else 20_000)
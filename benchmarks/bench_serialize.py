@@ -0,0 +1,66 @@
+"""
+DataFrame 序列化耗时对比: 旧的 bytes 拼接/切片路径 vs 分帧零拷贝路径
+
+    python benchmarks/bench_serialize.py [rows ...]
+"""
+import io
+import sys
+import time
+
+import polars as pl
+
+from tradepulse.data.serialize import deserialize_dataframe_frames, serialize_dataframe_frames
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def trades_frame(rows: int) -> pl.DataFrame:
+    idx = pl.int_range(0, rows, dtype=pl.Int64)
+    return pl.select(
+        timestamp=(idx + 1_717_029_200_000).cast(pl.Datetime("ms", "UTC")),
+        id=idx.cast(pl.String),
+        side=pl.when(idx % 2 == 0).then(pl.lit("buy")).otherwise(pl.lit("sell")),
+        price=idx.cast(pl.Float64) * 0.5,
+        amount=idx.cast(pl.Float64) * 0.01,
+        cost=idx.cast(pl.Float64) * 0.005,
+    )
+
+
+def legacy_serialize(df: pl.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.write_ipc(buf)
+    return b"POLARS_IPC" + buf.getvalue()
+
+
+def legacy_deserialize(data: bytes) -> pl.DataFrame:
+    return pl.read_ipc(source=data[len(b"POLARS_IPC"):])
+
+
+def best_ms(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(rows_list: list[int]):
+    print(f"{'rows':>10}  {'MB':>8}  {'legacy ser':>10}  {'frames ser':>10}  {'legacy de':>10}  {'frames de':>10}")
+    for rows in rows_list:
+        df = trades_frame(rows)
+        repeat = 5 if rows <= 1_000_000 else 2
+        legacy_data = legacy_serialize(df)
+        header, payload = serialize_dataframe_frames(df)
+        assert deserialize_dataframe_frames(header, payload).equals(legacy_deserialize(legacy_data))
+        print(
+            f"{rows:>10}  {len(legacy_data) / 2**20:>8.1f}"
+            f"  {best_ms(lambda: legacy_serialize(df), repeat):>8.2f}ms"
+            f"  {best_ms(lambda: serialize_dataframe_frames(df), repeat):>8.2f}ms"
+            f"  {best_ms(lambda: legacy_deserialize(legacy_data), repeat):>8.2f}ms"
+            f"  {best_ms(lambda: deserialize_dataframe_frames(header, payload), repeat):>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROWS)
@@ -0,0 +1,45 @@
+"""
+按时间查询"最近 N 分钟"的延迟：LazyFrame filter 全列扫描 vs 排序标记下 search_sorted + slice
+
+    python benchmarks/bench_time_slice.py [minutes] [repeat]
+"""
+import sys
+import time
+
+import numpy as np
+import polars as pl
+
+from tradepulse.data.dataframe_recoder import time_slice
+
+START = 1704067200000
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def frame(n: int) -> pl.DataFrame:
+    # 每秒一条 trades，由 numpy 构造，时间列不带排序标记
+    return pl.DataFrame({
+        "timestamp": pl.Series(np.arange(START, START + n * 1000, 1000)).cast(pl.Datetime("ms", "UTC")),
+        "price": pl.repeat(30000.0, n, eager=True),
+    })
+
+
+def bench(df: pl.DataFrame, since: int, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        time_slice(df, "timestamp", since)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(minutes: int, repeat: int):
+    print(f"last {minutes} min, microseconds per query")
+    print(f"{'rows':>12}{'filter':>12}{'sorted':>12}")
+    for n in SIZES:
+        df = frame(n)
+        since = START + n * 1000 - minutes * 60_000
+        unsorted = bench(df, since, repeat)
+        sorted_ = bench(df.with_columns(pl.col("timestamp").set_sorted()), since, repeat)
+        print(f"{n:>12}{unsorted:>12.1f}{sorted_:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5, int(sys.argv[2]) if len(sys.argv) > 2 else 50)
@@ -1,15 +1,22 @@
 from asyncio import run
 from asyncio.log import logger
+from tradepulse.exchange import ExchangeUpdater
+from tradepulse.exchange.exchange import Exchange
 from tradepulse.fetchdata import Server
-async def main(address:str, config):
-    server = Server(address,config)    
+async def main(address:str, config,max_inflight:int=1):
+    server = Server(address,config,max_inflight=max_inflight)    
     await server.start()
+    # 后台持续更新交易所数据
+    updater = ExchangeUpdater(server.exchange) if isinstance(server.exchange, Exchange) else None
+    if updater is not None:
+        updater.start()
     try :
-        while True:
-            await server.recv()
+        await server.serve()
     except Exception as e:
         logger.info("Server stopped")        
-    await server.recv()      
+    finally:
+        if updater is not None:
+            await updater.stop()
     
 
 
@@ -17,4 +24,4 @@ async def main(address:str, config):
 if __name__ == '__main__':
     from argparse import ArgumentParser
     
-    run(main("fetchdata",{}))
\ No newline at end of file
+    run(main("fetchdata",{}))
@@ -1,14 +1,72 @@
 import asyncio
+import logging
+import tempfile
+import threading
+import time
 from abc import abstractmethod
-from datetime import datetime, timedelta
-from typing import overload
+from collections import deque
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, overload
 
+import polars as pl
 from polars import DataFrame
 
-from tradepulse.typenums import CANDLES_SCHEME, TRADES_SCHEME, DataType, MarketType
+from tradepulse.typenums import SCHEMES, DataType, MarketType, TimeStamp
 
-from .dataframe_recoder import DataFrameRecoder
+from .dataframe_recoder import DataFrameRecoder, Snapshot
 from .protocol import DataKey, DataRecoder
+from .ring_recoder import RingBufferRecoder
+from .tiered_recoder import TieredRecoder
+
+logger = logging.getLogger(__name__)
+
+
+def from_records(data: list, schema: dict[str, pl.DataType]) -> DataFrame:
+    """
+    把 ccxt 返回的 list[dict]（按 schema 的列名取值）或 list[list]（按列顺序）转置为按列的数组，再逐列构造
+    只取 schema 中的字段，info/fee 等嵌套字段不会被 polars 逐行推断类型
+    时间列为毫秒时间戳，数值列允许 int/None，Enum 列中未知的值转换为 null 并记录警告
+    """
+    if len(data) == 0:
+        return DataFrame(schema=schema)
+    names = list(schema)
+    if isinstance(data[0], dict):
+        try:
+            columns = [list(map(itemgetter(name), data)) for name in names]
+        except KeyError:
+            columns = [[row.get(name) for row in data] for name in names]
+    else:
+        columns = [list(map(itemgetter(i), data)) for i in range(len(names))]
+    series = []
+    for name, values in zip(names, columns):
+        dtype = schema[name]
+        if dtype == pl.Datetime:
+            series.append(pl.Series(name, values, dtype=pl.Int64, strict=False).cast(dtype))
+        elif isinstance(dtype, pl.Enum):
+            strings = pl.Series(name, values, dtype=pl.String, strict=False)
+            column = strings.cast(dtype, strict=False)
+            if column.null_count() > strings.null_count():
+                unknown = strings.filter(column.is_null() & strings.is_not_null()).unique().to_list()
+                logger.warning(f"{name} 列包含未知的值 {unknown}，已转换为 null，可选值为 {dtype.categories.to_list()}")
+            series.append(column)
+        else:
+            series.append(pl.Series(name, values, dtype=dtype, strict=False))
+    return DataFrame(series)
+
+
+def _key_name(key: DataKey) -> str:
+    """DataKey 对应的文件名"""
+    return "-".join(str(part) for part in key if part).replace("/", "_")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """单个 DataKey 的保留策略，None 表示不限制"""
+    max_age: timedelta | None = None
+    max_rows: int | None = None
 
 
 class DataCache[T](dict[DataKey,DataRecoder[T]]):
@@ -27,8 +85,14 @@ class DataCache[T](dict[DataKey,DataRecoder[T]]):
         # self.trades_cache:dict[str,DataRecoder] = {}
         # self.ohlcv_cache:dict[str,DataRecoder] = {}
         # self.orders_cache:dict[str,DataRecoder] = {}
-      
-        self.lock = asyncio.Lock()
+        # 读取不加锁：每个 recoder 写入后发布不可变的 Snapshot，见 DataFrameRecoder.snapshot
+        # 没有单独设置保留策略的 key 使用 default_retention
+        self.default_retention = RetentionPolicy()
+        self.retention: dict[DataKey, RetentionPolicy] = {}
+        # housekeeping 累计释放的字节数（估算）
+        self.reclaimed_bytes = 0
+        # 读取到已淘汰的数据时调用，通知写入方尽快调用 reload_reads；可能在读取方的线程中调用
+        self.on_spilled_read: Callable[[], None] | None = None
         # self.ohlcv_lock = asyncio.Lock()
         # self.tickers_lock = asyncio.Lock()
         # self.trades_lock = asyncio.Lock()
@@ -60,6 +124,14 @@ class DataCache[T](dict[DataKey,DataRecoder[T]]):
     #     return self.get_daterecator(pair,timeframe=timeframe,marketType=marketType,datatype=datatype)
     
     
+    def read(self, key: DataKey) -> Snapshot | None:
+        """
+        查询使用，可以在其他线程中调用：返回 key 当前的 Snapshot，key 不存在时返回 None
+        不创建 key，也不修改缓存；get_recoder 只在写入方使用
+        """
+        recoder = self.get(key)
+        return None if recoder is None else recoder.snapshot()
+
     @abstractmethod
     def time_range(self,data:T)->tuple[int,int]:...
 
@@ -76,7 +148,15 @@ class DataCache[T](dict[DataKey,DataRecoder[T]]):
     def append(self,key:DataKey, data,dt:datetime|int|None=None):
         pair,timeframe,marketType,datatype = key
         convert_data = self.convert(data,datatype=datatype)
-        self.get_recoder(key = key).append(convert_data,dt)
+        self._recoder(key).append(convert_data,dt)
+
+    def _recoder(self, key: DataKey) -> DataRecoder[T]:
+        """写入最新数据时使用，不计为一次读取"""
+        return self.get_recoder(key=key)
+
+    def enforce_budget(self) -> int:
+        """内存超出预算时淘汰冷数据，返回释放的字节数"""
+        return 0
         
     def prepend(self,key:DataKey,data,dt:datetime|int|None=None):
         pair,timeframe,marketType,datatype = key
@@ -89,27 +169,200 @@ class DataCache[T](dict[DataKey,DataRecoder[T]]):
         pair,timeframe,marketType,datatype = key
         self.get_recoder(pair,timeframe=timeframe,marketType=marketType,datatype=datatype).prune_expired_data(td)
 
+    def set_retention(self, key: DataKey | None = None, max_age: timedelta | None = None, max_rows: int | None = None):
+        """设置 key 的保留策略，key 为 None 时设置默认策略"""
+        policy = RetentionPolicy(max_age=max_age, max_rows=max_rows)
+        if key is None:
+            self.default_retention = policy
+        else:
+            self.retention[key] = policy
+
+    def enforce_retention(self, now: datetime | None = None) -> int:
+        """按保留策略裁剪所有 key，返回本次释放的字节数"""
+        now = datetime.now(timezone.utc) if now is None else now
+        reclaimed = 0
+        for key, recoder in list(self.items()):
+            policy = self.retention.get(key, self.default_retention)
+            if policy.max_age is None and policy.max_rows is None:
+                continue
+            before = (now - policy.max_age).timestamp() * 1000 if policy.max_age is not None else None
+            try:
+                reclaimed += recoder.trim(before=before, max_rows=policy.max_rows)
+            except Exception as e:
+                logger.error(f"{key} retention error: {e}")
+        self.reclaimed_bytes += reclaimed
+        return reclaimed
+
+    def reload_reads(self) -> int:
+        """写入方使用：处理读取记录，读回被读取的已淘汰数据，返回读回的 key 数"""
+        return 0
+
+    async def housekeeping(self) -> int:
+        """执行一次 enforce_retention 和 enforce_budget，返回释放的字节数；由 ExchangeUpdater 定期调用"""
+        reclaimed = self.enforce_retention() + self.enforce_budget()
+        if reclaimed:
+            logger.info(f"retention reclaimed {reclaimed} bytes")
+        return reclaimed
+
 class DataframeCache(DataCache[DataFrame]):
+    def __init__(self, exchange_id='', exchange_name='', max_rows: int | None = None, max_bytes: int | None = None,
+                 budget_bytes: int | None = None, spill_dir: str | Path | None = None, min_idle: float = 60.0,
+                 tier_dir: str | Path | None = None, hot_rows: int = 100_000):
+        """
+        max_rows / max_bytes: 设置任意一个时，trades/ohlcv 使用固定容量的 RingBufferRecoder，每个 key 的内存有上限
+        budget_bytes: 所有 DataFrameRecoder 的内存上限（estimated_size），超出时把最久没有读取的 key 写入 parquet
+        spill_dir: parquet 文件目录，默认使用临时目录
+        min_idle: 至少这么多秒没有读取的 key 才会被淘汰
+        tier_dir: 设置时 trades/ohlcv 使用 TieredRecoder，每个 key 最新的 hot_rows 行在内存中，更早的写入该目录下的 Arrow IPC 文件
+        """
+        super().__init__(exchange_id=exchange_id, exchange_name=exchange_name)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.budget_bytes = budget_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.min_idle = min_idle
+        self.tier_dir = Path(tier_dir) if tier_dir is not None else None
+        self.hot_rows = hot_rows
+        # 每个 key 最近一次 read 的时间（time.monotonic），按读取顺序排列，只在写入方更新
+        self.last_read: dict[DataKey, float] = {}
+        # read 记录的读取，由写入方在 enforce_budget 中取出
+        self.pending_reads: deque[tuple[DataKey, float]] = deque()
+        # 已写入磁盘、还没有读回的数据，按写入顺序排列（越早写入的数据越旧）
+        self.spilled: dict[DataKey, list[Path]] = {}
+        # 保护 spilled 和对应文件：淘汰、读回与读取磁盘上的数据互斥
+        self._spill_lock = threading.Lock()
+        self.evictions = 0
+        self._spill_seq = 0
+
     def get_recoder(self, pair=None, *, timeframe=None, marketType=None, datatype=None, key=None) -> DataRecoder:
+        """写入方使用：key 不存在时创建，已淘汰的数据先读回；不计为一次读取"""
         if key is None:
             key = DataKey(pair, timeframe, marketType, datatype)
-        
+        recoder = self._recoder(key)
+        if key in self.spilled:
+            self._reload(key, recoder)
+        return recoder
+
+    def read(self, key: DataKey) -> Snapshot | None:
+        """
+        查询使用，不修改缓存：已淘汰的 key 把磁盘上的数据放在当前 Snapshot 之前返回
+        读取只记录到 pending_reads，最近读取时间和读回都由写入方在 reload_reads 中处理
+        读取到已淘汰的数据时调用 on_spilled_read 通知写入方，不必等到下一次 enforce_budget
+        """
+        recoder = self.get(key)
+        if recoder is None:
+            return None
+        if self.budget_bytes is None:
+            return recoder.snapshot()
+        self.pending_reads.append((key, time.monotonic()))
+        with self._spill_lock:
+            snapshot = recoder.snapshot()
+            paths = self.spilled.get(key)
+            if not paths:
+                return snapshot
+            spilled = pl.read_parquet(paths)
+        if self.on_spilled_read is not None:
+            self.on_spilled_read()
+        if spilled.is_empty():
+            return snapshot
+        column = snapshot.timekey if snapshot.timekey in spilled.columns else spilled.columns[0]
+        return replace(snapshot, frames=(spilled, *(frame for frame in snapshot.frames if frame.height)),
+                       rows=snapshot.rows + spilled.height, first_time=TimeStamp(spilled[column][0]),
+                       last_time=TimeStamp(spilled[column][-1]) if snapshot.is_empty else snapshot.last_time)
+
+    def _recoder(self, key: DataKey) -> DataRecoder:
         cache = self.get(key,None)
         if cache is None:
-            cache = DataFrameRecoder(pair=key.pair,timeframe=key.timeframe,marketType=key.marketType,datatype=key.datatype)
+            if (self.max_rows is not None or self.max_bytes is not None) and key.datatype in ("trades", "ohlcv"):
+                cache = RingBufferRecoder(pair=key.pair,timeframe=key.timeframe,marketType=key.marketType,datatype=key.datatype,
+                                          max_rows=self.max_rows,max_bytes=self.max_bytes)
+            elif self.tier_dir is not None and key.datatype in ("trades", "ohlcv"):
+                cache = TieredRecoder(pair=key.pair,timeframe=key.timeframe,marketType=key.marketType,datatype=key.datatype,
+                                      directory=self.tier_dir / _key_name(key),hot_rows=self.hot_rows)
+            else:
+                cache = DataFrameRecoder(pair=key.pair,timeframe=key.timeframe,marketType=key.marketType,datatype=key.datatype)
             self[key] = cache
+            # 新建的 key 从创建时开始计算空闲时间，不会在写入后立即被淘汰
+            self.last_read[key] = time.monotonic()
         return cache
        
+    def _reload(self, key: DataKey, recoder: DataRecoder):
+        """读回写入磁盘的数据，放在淘汰后新写入的数据之前"""
+        with self._spill_lock:
+            paths = self.spilled.pop(key)
+            data = pl.read_parquet(paths)
+            if not data.is_empty():
+                recoder.prepend(data)
+            for path in paths:
+                path.unlink(missing_ok=True)
+
+    def _spill_path(self, key: DataKey) -> Path:
+        if self.spill_dir is None:
+            self.spill_dir = Path(tempfile.mkdtemp(prefix="tradepulse-cache-"))
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._spill_seq += 1
+        return self.spill_dir / f"{_key_name(key)}-{self._spill_seq}.parquet"
+
+    def estimated_size(self) -> int:
+        return sum(recoder.estimated_size() for recoder in self.values() if isinstance(recoder, DataFrameRecoder))
+
+    def enforce_budget(self) -> int:
+        """
+        总内存超过 budget_bytes 时，按最久没有读取的顺序把 key 的数据写入 parquet 并清空
+        recoder 本身保留（实时订阅不受影响），读取后由写入方读回
+        """
+        if self.budget_bytes is None:
+            return 0
+        self.reload_reads()
+        total = self.estimated_size()
+        reclaimed = 0
+        now = time.monotonic()
+        # 没有记录的 key 最先淘汰，其余按最近读取（或创建）时间从早到晚
+        candidates = [key for key in self if key not in self.last_read] + list(self.last_read)
+        for key in candidates:
+            if total <= self.budget_bytes:
+                break
+            recoder = self.get(key)
+            if not isinstance(recoder, DataFrameRecoder) or recoder.is_empty:
+                continue
+            if now - self.last_read.get(key, float("-inf")) < self.min_idle:
+                continue
+            path = self._spill_path(key)
+            try:
+                recoder.rawdata.write_parquet(path)
+            except Exception as e:
+                # 写入失败的 key 保留在内存中，继续淘汰其他 key
+                logger.error(f"{key} spill error: {e}")
+                path.unlink(missing_ok=True)
+                continue
+            freed = recoder.estimated_size()
+            with self._spill_lock:
+                self.spilled.setdefault(key, []).append(path)
+                recoder.data = DataFrame()
+            total -= freed
+            reclaimed += freed
+            self.evictions += 1
+        self.reclaimed_bytes += reclaimed
+        return reclaimed
+
+    def reload_reads(self) -> int:
+        """取出 read 记录的读取，更新最近读取时间，被读取的已淘汰 key 读回内存"""
+        reloaded = 0
+        while self.pending_reads:
+            key, read_at = self.pending_reads.popleft()
+            self.last_read.pop(key, None)
+            self.last_read[key] = read_at
+            if key in self.spilled:
+                self._reload(key, self[key])
+                reloaded += 1
+        return reloaded
+
     def convert(self,data,datatype:DataType)->DataFrame:
         if isinstance(data,DataFrame): return data
-        match datatype:
-            case "trades":
-                schema  = TRADES_SCHEME
-            case _:
-                schema = CANDLES_SCHEME
-        
-        df= DataFrame(data,schema=schema)
-        return df
+        schema = SCHEMES.get(datatype)
+        if schema is None:
+            raise ValueError(f"不支持的数据类型: {datatype}")
+        return from_records(data, schema)
 
     def time_range(self,data:DataFrame)->tuple[int,int]:
         first  = data[0,0]
@@ -132,9 +385,9 @@ class CacheFactory():
     def set(cls,datatype:type,cache:type):
         cls.data_docker[datatype] = cache
     @classmethod
-    def get(cls,datatype:type|None=None) -> DataCache:
+    def get(cls,datatype:type|None=None,**kwargs) -> DataCache:
         if datatype in cls.data_docker: 
-            return  cls.data_docker[datatype]()
-        return cls.default_cache()
+            return  cls.data_docker[datatype](**kwargs)
+        return cls.default_cache(**kwargs)
    
 
@@ -1,5 +1,8 @@
 import logging
+import math
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from functools import cached_property
 from typing import MutableSequence, Sequence
 
 import polars as pl
@@ -10,27 +13,169 @@ from tradepulse.typenums import DataType, MarketType, TimeStamp
 
 logger = logging.getLogger(__name__)
 
+# Datetime 物理值（整数）每毫秒的单位数
+_UNITS_PER_MS = {"ns": 1_000_000, "us": 1_000, "ms": 1}
+
+
+def parse_time_index(index) -> tuple[float | int | None, float | int | None]:
+    """把 int/float/slice/tuple/list 形式的索引解析为 (start, end) 毫秒时间戳"""
+    start = None
+    end = None
+    if isinstance(index, slice):
+        # 处理切片：假设start/end为时间戳
+        start, end = index.start, index.stop
+    elif isinstance(index, (int, float)):
+        start = index
+    elif isinstance(index, (tuple, Sequence, MutableSequence)) and len(index) > 0:
+        start = index[0]
+        if len(index) >= 2:
+            end = index[1]
+    return start, end
+
+
+def _search_bounds(time: pl.Series, start: float | int | None, end: float | int | None) -> tuple[int, int]:
+    """在已排序的时间列上二分查找 [start, end] 对应的行范围，Datetime 按毫秒时间戳比较"""
+    factor = None
+    if time.dtype == pl.Datetime:
+        factor = _UNITS_PER_MS[time.dtype.time_unit]
+        # 物理值为整数，不复制数据
+        time = time.to_physical()
+    elif time.dtype.is_integer():
+        factor = 1
+    lo, hi = 0, time.len()
+    if start is not None:
+        bound = math.ceil(start) * factor if factor else start
+        lo = time.search_sorted(bound, side="left")
+    if end is not None:
+        # epoch_ms <= end 等价于 物理值 < (floor(end) + 1) * factor
+        hi = time.search_sorted((math.floor(end) + 1) * factor, side="left") if factor else time.search_sorted(end, side="right")
+    return lo, max(lo, hi)
+
+
+def _detach(df: DataFrame) -> DataFrame:
+    """复制数据，切片不再引用原来的数组，被删除的部分可以释放"""
+    return df.gather_every(1)
+
+
+def time_slice(df: DataFrame, timekey: str, start: float | int | None = None, end: float | int | None = None, limit: int | None = None) -> DataFrame:
+    """
+    取时间在 [start, end] 内的行
+    时间列带有升序标记时二分查找并返回零复制的 slice，否则逐行过滤
+    """
+    if df.is_empty() or (start is None and end is None):
+        return df if limit is None else df.head(limit)
+    time = df[timekey]
+    if time.flags["SORTED_ASC"]:
+        lo, hi = _search_bounds(time, start, end)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return df.slice(lo, hi - lo)
+
+    lazy_df = df.lazy()
+    time_col = pl.col(timekey)
+    # 时间列为 Datetime 时按毫秒时间戳比较
+    if time.dtype.is_temporal():
+        time_col = time_col.dt.epoch("ms")
+    if start is not None:
+        lazy_df = lazy_df.filter(time_col >= start)
+    if end is not None:
+        lazy_df = lazy_df.filter(time_col <= end)
+    if limit is not None:
+        lazy_df = lazy_df.limit(limit)
+    return lazy_df.collect()
+
+@dataclass(frozen=True, eq=False)
+class Snapshot:
+    """
+    recoder 某一版本的数据，发布后不再修改
+    写入方每次写入后发布新的 Snapshot（一次属性赋值），读取方取得 Snapshot 后不需要加锁，也不会看到写了一半的状态
+    """
+    version: int
+    frames: tuple[DataFrame, ...]
+    rows: int
+    first_time: TimeStamp
+    last_time: TimeStamp
+    timekey: str
+    sorted: bool
+
+    @cached_property
+    def data(self) -> DataFrame:
+        """把所有块拼成一个 DataFrame（不复制数据），数据有序时带有排序标记"""
+        if not self.frames:
+            return DataFrame()
+        data = self.frames[0] if len(self.frames) == 1 else pl.concat(self.frames, rechunk=False)
+        if self.sorted and self.timekey in data.columns:
+            data = data.with_columns(pl.col(self.timekey).set_sorted())
+        return data
+
+    @property
+    def is_empty(self) -> bool:
+        return self.rows == 0
+
+    def __getitem__(self, index) -> DataFrame:
+        start, end = parse_time_index(index)
+        return time_slice(self.data, self.timekey, start, end)
+
+
 class DataFrameRecoder(DataRecoder[DataFrame]):
-    
+    """
+    数据按块保存，append/prepend 只把数据块放入列表，不复制已有数据
+    同一层级的块达到 fanout 个时合并为上一层级的一个块，每行最多被复制 O(log n) 次，块数量为 O(fanout * log n)
+    每次写入后发布一个不可变的 Snapshot，读取（data、first_time、len 等）都来自当前的 Snapshot
+    只允许一个写入方（ExchangeUpdater 或 Exchange.update），读取方可以在其他线程中，需要多个值一致时先调用 snapshot()
+    """
+    # 同一层级的块达到该数量时合并
+    fanout = 32
+
     def __init__(self, pair: str, marketType: MarketType, datatype: DataType, timeframe="", data: DataFrame | None = None, timeout: timedelta = timedelta(minutes=10)):
+        self.chunks: list[DataFrame] = []
+        # 每个块的层级，与 chunks 一一对应
+        self.levels: list[int] = []
+        self.rows = 0
+        self.version = 0
+        self._published: Snapshot | None = None
+        # 写入时更新的首尾时间，读取时不需要查询数据
+        self._first_time = TimeStamp.empty()
+        self._last_time = TimeStamp.empty()
+        # 数据是否按时间列升序，为 True 时 data 带有排序标记，按时间查询使用二分查找
+        self.sorted = True
+        # 与 CANDLES_SCHEME / TRADES_SCHEME 的时间列一致
+        self.timekey = "date" if datatype == "ohlcv" else "timestamp"
         self.data= DataFrame() if data is None else data
 
         super().__init__(pair=pair, marketType=marketType, datatype=datatype, timeframe=timeframe,timeout_ms=timeout)
-        self.timekey = "timestamp"
     @property
     def first_time(self)->TimeStamp:
-        if self.data.is_empty( ):return TimeStamp.empty()
-        first_col_name = self.data.columns[0]
-       # 获取第一列的第一个值
-        first_value = self.data.select(pl.col(first_col_name).first()).item()
-        return TimeStamp(int( first_value))
+        return self.snapshot().first_time
     @property
     def last_time(self)->TimeStamp:
-        if self.data.is_empty( ):return TimeStamp.empty()
-        first_col_name = self.data.columns[0]
-        # 获取第一列的最后一个值
-        last_value =self.data.select(pl.col(first_col_name).last()).item()
-        return TimeStamp(int(last_value))
+        return self.snapshot().last_time
+
+    def snapshot(self) -> Snapshot:
+        """当前发布的数据版本"""
+        return self._published
+
+    def _frames(self) -> tuple[DataFrame, ...]:
+        return tuple(self.chunks)
+
+    def _total_rows(self) -> int:
+        return self.rows
+
+    def _publish(self):
+        """写入完成后发布新版本，只在写入方调用"""
+        self.version += 1
+        self._published = Snapshot(self.version, self._frames(), self._total_rows(), self._first_time, self._last_time,
+                                   self.timekey, self.sorted)
+
+    def _is_sorted(self, data: DataFrame) -> bool:
+        return self.timekey in data.columns and data[self.timekey].is_sorted()
+
+    def _edge_time(self, data: DataFrame, index: int) -> TimeStamp:
+        """data 第 index 行的时间，没有时间列时使用第一列"""
+        if data.is_empty():
+            return TimeStamp.empty()
+        column = self.timekey if self.timekey in data.columns else data.columns[0]
+        return TimeStamp(data[column][index])
     @staticmethod
     def Empty() -> DataFrame:
         return DataFrame()
@@ -41,12 +186,71 @@ class DataFrameRecoder(DataRecoder[DataFrame]):
 
     @property
     def is_empty(self) -> bool:
-        return self.data.is_empty()
+        return self.snapshot().rows == 0
      
 
     @property
     def empty(self)->DataFrame:
          return DataFrame()
+    @property
+    def data(self) -> DataFrame:
+        return self.snapshot().data
+
+    @data.setter
+    def data(self, data: DataFrame):
+        self.chunks = [data] if data.height > 0 else []
+        self.levels = [0] * len(self.chunks)
+        self.rows = data.height
+        self._first_time = self._edge_time(data, 0)
+        self._last_time = self._edge_time(data, -1)
+        self.sorted = data.is_empty() or self._is_sorted(data)
+        self._publish()
+
+    @property
+    def schema(self) -> pl.Schema | None:
+        return self.chunks[0].schema if self.chunks else None
+
+    def _check_schema(self, data: DataFrame):
+        # 与 pl.concat 相同的错误，但在写入时立即抛出
+        schema = self.schema
+        if schema is None or data.schema == schema:
+            return
+        if data.columns != list(schema.names()):
+            raise pl.exceptions.ShapeError(f"columns {data.columns} do not match {list(schema.names())}")
+        raise pl.exceptions.SchemaError(f"schema {data.schema} does not match {schema}")
+
+    @staticmethod
+    def _merge(chunks: list[DataFrame]) -> DataFrame:
+        return pl.concat(chunks, rechunk=True)
+
+    def _push_back(self, data: DataFrame):
+        self.chunks.append(data)
+        self.levels.append(0)
+        while len(self.levels) >= self.fanout and len(set(self.levels[-self.fanout:])) == 1:
+            level = self.levels[-1]
+            merged = self._merge(self.chunks[-self.fanout:])
+            del self.chunks[-self.fanout:], self.levels[-self.fanout:]
+            self.chunks.append(merged)
+            self.levels.append(level + 1)
+
+    def _push_front(self, data: DataFrame):
+        self.chunks.insert(0, data)
+        self.levels.insert(0, 0)
+        while len(self.levels) >= self.fanout and len(set(self.levels[:self.fanout])) == 1:
+            level = self.levels[0]
+            merged = self._merge(self.chunks[:self.fanout])
+            del self.chunks[:self.fanout], self.levels[:self.fanout]
+            self.chunks.insert(0, merged)
+            self.levels.insert(0, level + 1)
+
+    def estimated_size(self) -> int:
+        return sum(chunk.estimated_size() for chunk in self.chunks)
+
+    def compact(self):
+        """把所有块合并为一个连续的块"""
+        if len(self.chunks) > 1:
+            self.data = self._merge(self.chunks)
+
     def append(self, data: DataFrame, dt: datetime | int | float | None = None):
      
 
@@ -62,11 +266,22 @@ class DataFrameRecoder(DataRecoder[DataFrame]):
                 raise ValueError(f"未提供时间参数且数据缺少时间列 '{self.timekey}'")
 
         # 确保时间列格式正确
-        if not self.data.is_empty():
+        if self.chunks:
             data = self._ensure_time_format(data)
+            self._check_schema(data)
+        if data.height == 0:
+            return
 
-        
-        self.data = pl.concat([self.data, data])
+        first = self._edge_time(data, 0)
+        if not self.chunks:
+            self._first_time = first
+        else:
+            self.sorted = self.sorted and first >= self._last_time
+        self.sorted = self.sorted and self._is_sorted(data)
+        self._push_back(data)
+        self.rows += data.height
+        self._last_time = self._edge_time(data, -1)
+        self._publish()
   
      
 
@@ -86,10 +301,18 @@ class DataFrameRecoder(DataRecoder[DataFrame]):
         # if not self.data.is_empty():
         #     data = self._ensure_time_format(data)
 
-        if self.data.is_empty():
+        if not self.chunks:
             self.data = data
         else:
-            self.data = pl.concat([data, self.data])
+            self._check_schema(data)
+            if data.height == 0:
+                return
+            last = self._edge_time(data, -1)
+            self.sorted = self.sorted and last <= self._first_time and self._is_sorted(data)
+            self._push_front(data)
+            self.rows += data.height
+            self._first_time = self._edge_time(data, 0)
+            self._publish()
        
             
 
@@ -97,10 +320,11 @@ class DataFrameRecoder(DataRecoder[DataFrame]):
 
     def _ensure_time_format(self, data: DataFrame) -> DataFrame:
         """确保新数据的时间列格式与现有数据一致"""
-        if self.timekey not in data.columns or self.timekey not in self.data.columns:
+        schema = self.schema
+        if schema is None or self.timekey not in data.columns or self.timekey not in schema:
             return data
 
-        existing_dtype = self.data[self.timekey].dtype
+        existing_dtype = schema[self.timekey]
         new_dtype = data[self.timekey].dtype
 
         if existing_dtype != new_dtype:
@@ -117,46 +341,50 @@ class DataFrameRecoder(DataRecoder[DataFrame]):
 
     def prune_expired_data(self,td:timedelta|int|None = None):
         """删除超时的数据"""
-        if self.data.is_empty() or not hasattr(self, 'timekey') or not self.timekey or self.timekey not in self.data.columns:
-            return
-
-        # 计算截止时间
         cutoff = datetime.now(timezone.utc) - self.timeout
         try:
-            # 获取时间列表达式
-            time_expr = pl.col(self.timekey)
-
-            # 如果是整数时间戳，转换为datetime
-            if self.data[self.timekey].dtype in (pl.Int64, pl.Float64):
-                # 假设为毫秒级时间戳
-                time_expr = time_expr.cast(pl.Datetime(time_unit='ms', time_zone="UTC"))
-            # 过滤数据
-            self.data = self.data.filter(time_expr >= cutoff.timestamp()*1000)
+            self.trim(before=int(cutoff.timestamp() * 1000))
         except Exception as e:
             # 记录错误但继续运行
             logger.error(f"警告: 修剪过期数据时出错: {e}")
 
+    def trim(self, before: float | int | None = None, max_rows: int | None = None) -> int:
+        """
+        删除时间早于 before（毫秒）的行，并只保留最新的 max_rows 行，返回释放的字节数（估算）
+        数据有序时二分查找删除的行数，整块丢弃，只复制边界上的一个块
+        """
+        schema = self.schema
+        if schema is None or self.timekey not in schema:
+            return 0
+        size = self.estimated_size()
+        if before is not None and not self.sorted:
+            self.data = time_slice(self.data, self.timekey, start=before)
+            before = None
+        drop = 0
+        if before is not None:
+            drop, _ = _search_bounds(self.data[self.timekey], before, None)
+        if max_rows is not None:
+            drop = max(drop, self.rows - max_rows)
+        if drop > 0:
+            self._drop_front(drop)
+        return size - self.estimated_size()
+
+    def _drop_front(self, count: int):
+        """删除最旧的 count 行"""
+        if count >= self.rows:
+            self.data = DataFrame(schema=self.schema)
+            return
+        self.rows -= count
+        while self.chunks[0].height <= count:
+            count -= self.chunks[0].height
+            del self.chunks[0], self.levels[0]
+        if count:
+            self.chunks[0] = _detach(self.chunks[0].slice(count))
+        self._first_time = self._edge_time(self.chunks[0], 0)
+        self._publish()
+
     def __getitem__(self, index)->DataFrame:
-        """支持索引访问和切片"""
-        lazy_df = self.data.lazy()  # 转换为惰性Frame
-        start = None
-        end =None
-        if isinstance(index, slice):
-        # 处理切片：假设start/end为时间戳
-            start,end = index.start ,index.stop
-        elif isinstance(index, (int,float)) :
-            start = index
-        elif isinstance(index, (tuple,Sequence,MutableSequence)) and len(index)>0:
-            start = index[0]
-            if len(index) >= 2:
-                end = index[1]
-                
-            
-        if start is not None:
-            lazy_df = lazy_df.filter(pl.col(self.timekey) >= start)
-        if end is not None:
-            lazy_df = lazy_df.filter(pl.col(self.timekey) <= end)
-        df = lazy_df.collect()  # 一次性触发执行
-        return df
+        """支持索引访问和切片，按时间戳取 [start, end] 内的行"""
+        return self.snapshot()[index]
     def __len__(self) -> int:
-        return self.data.height
\ No newline at end of file
+        return self.snapshot().rows
\ No newline at end of file
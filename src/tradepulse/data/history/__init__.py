@@ -8,8 +8,7 @@ Includes:
 
 # flake8: noqa: F401
 from .datahandlers import get_datahandler
-from .history_utils import (convert_trades_to_ohlcv,  # download_data_main,
-                            get_timerange, load_data, load_pair_history,
-                            refresh_backtest_ohlcv_data,
-                            refresh_backtest_trades_data, refresh_data,
-                            validate_backtest_data)
+
+# load_data, refresh_data etc. live in history_utils, which depends on modules (pairlist plugins,
+# migrations, progress tracker) that are not part of this package. Import them from
+# tradepulse.data.history.history_utils where needed; the datahandlers are usable without it.
@@ -146,6 +146,17 @@ class IDataHandler(ABC):
         :return: DataFrame with ohlcv data, or empty DataFrame
         """
 
+    def _ohlcv_scan(
+        self, pair: str, timeframe: str, timerange: TimeRange | None, candle_type: CandleType
+    ) -> pl.LazyFrame:
+        """
+        Lazy version of _ohlcv_load.
+        Subclasses can override this to push the timerange down to the storage
+        and avoid loading the whole file.
+        :return: LazyFrame with ohlcv data
+        """
+        return self._ohlcv_load(pair, timeframe, timerange, candle_type).lazy()
+
     def ohlcv_purge(self, pair: str, timeframe: str, candle_type: CandleType) -> bool:
         """
         Remove data for this pair
@@ -262,6 +273,17 @@ class IDataHandler(ABC):
         :return: Dataframe containing trades
         """
 
+    def _trades_scan(
+        self, pair: str, trading_mode: TradingMode, timerange: TimeRange | None = None
+    ) -> pl.LazyFrame:
+        """
+        Lazy version of _trades_load.
+        Subclasses can override this to push the timerange down to the storage
+        and avoid loading the whole file.
+        :return: LazyFrame with trades
+        """
+        return self._trades_load(pair, trading_mode, timerange=timerange).lazy()
+
     def trades_store(self, pair: str, data: DataFrame, trading_mode: TradingMode) -> None:
         """
         Store trades data (list of Dicts) to file
@@ -1,6 +1,8 @@
 import logging
+from pathlib import Path
 
-from polars import DataFrame, read_parquet
+import polars as pl
+from polars import DataFrame, LazyFrame
 
 from  tradepulse.typenums import (CANDLES_SCHEME, TRADES_SCHEME, CandleType,
                        TradingMode)
@@ -10,6 +12,21 @@ from .idatahandler import IDataHandler
 logger = logging.getLogger(__name__)
 
 
+def _scan_timerange(filename: Path, timerange: TimeRange | None, time_col: str, schema: dict | None = None) -> LazyFrame:
+    """
+    Lazily scan a parquet file, pushing the timerange filter down to the reader
+    so only the matching row groups are read.
+    """
+    lazy_df = pl.scan_parquet(filename, schema=schema)
+    if timerange is None:
+        return lazy_df
+    if timerange.starttype == "date" and timerange.startdt is not None:
+        lazy_df = lazy_df.filter(pl.col(time_col) >= timerange.startdt)
+    if timerange.stoptype == "date" and timerange.stopdt is not None:
+        lazy_df = lazy_df.filter(pl.col(time_col) <= timerange.stopdt)
+    return lazy_df
+
+
 class ParquetDataHandler(IDataHandler):
 
     def ohlcv_store(
@@ -45,6 +62,23 @@ class ParquetDataHandler(IDataHandler):
         :param candle_type: Any of the enum CandleType (must match trading mode!)
         :return: DataFrame with ohlcv data, or empty DataFrame
         """
+        try:
+            return self._ohlcv_scan(pair, timeframe, timerange, candle_type).collect()
+        except Exception as e:
+            logger.exception(
+                f"Error loading data for {pair} {timeframe}. Exception: {e}. Returning empty dataframe."
+            )
+            return DataFrame(schema=CANDLES_SCHEME)
+
+    def _ohlcv_scan(
+        self, pair: str, timeframe: str, timerange: TimeRange | None, candle_type: CandleType
+    ) -> LazyFrame:
+        """
+        Lazy version of _ohlcv_load.
+        The timerange is applied as a filter on the "date" column and pushed down to the
+        parquet reader, so only the requested slice is read from disk.
+        :return: LazyFrame with ohlcv data, or an empty LazyFrame
+        """
         filename = self._pair_data_filename(self._datadir, pair, timeframe, candle_type=candle_type)
         if not filename.exists():
             # Fallback mode for 1M files
@@ -52,16 +86,8 @@ class ParquetDataHandler(IDataHandler):
                 self._datadir, pair, timeframe, candle_type=candle_type, no_timeframe_modify=True
             )
             if not filename.exists():
-                return DataFrame(schema = CANDLES_SCHEME)
-        try:
-            pairdata = read_parquet(filename,schema=CANDLES_SCHEME)
-          
-            return pairdata
-        except Exception as e:
-            logger.exception(
-                f"Error loading data from {filename}. Exception: {e}. Returning empty dataframe."
-            )
-            return DataFrame(schema=CANDLES_SCHEME)
+                return LazyFrame(schema=CANDLES_SCHEME)
+        return _scan_timerange(filename, timerange, "date", schema=CANDLES_SCHEME)
 
     def ohlcv_append(
         self, pair: str, timeframe: str, data: DataFrame, candle_type: CandleType
@@ -101,20 +127,27 @@ class ParquetDataHandler(IDataHandler):
         self, pair: str, trading_mode: TradingMode, timerange: TimeRange | None = None
     ) -> DataFrame:
         """
-        Load a pair from file, either .json.gz or .json
-        # TODO: respect timerange ...
+        Load a pair from file
         :param pair: Load trades for this pair
         :param trading_mode: Trading mode to use (used to determine the filename)
-        :param timerange: Timerange to load trades for - currently not implemented
+        :param timerange: Timerange to load trades for
         :return: List of trades
         """
+        return self._trades_scan(pair, trading_mode, timerange).collect()
+
+    def _trades_scan(
+        self, pair: str, trading_mode: TradingMode, timerange: TimeRange | None = None
+    ) -> LazyFrame:
+        """
+        Lazy version of _trades_load.
+        The timerange is applied as a filter on the "timestamp" column and pushed down
+        to the parquet reader.
+        :return: LazyFrame with trades, or an empty LazyFrame
+        """
         filename = self._pair_trades_filename(self._datadir, pair, trading_mode)
         if not filename.exists():
-            return DataFrame(schema=TRADES_SCHEME)
-
-        tradesdata = read_parquet(filename)
-
-        return tradesdata
+            return LazyFrame(schema=TRADES_SCHEME)
+        return _scan_timerange(filename, timerange, "timestamp")
 
     @classmethod
     def _get_file_extension(cls):
@@ -1,10 +1,55 @@
 
 
+import sys
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import List, Any
 from  tradepulse. data.protocol import DataRecoder
-from tradepulse. typenums import DataType, MarketType
+from tradepulse. typenums import DataType, MarketType, TimeStamp
 from bisect import bisect_left
+
+
+def _select(data: List[list], index) -> list:
+    """按时间戳（item[0]）索引或切片"""
+    if isinstance(index, slice):
+        start = index.start
+        end = index.stop
+        return [item for item in data 
+               if (start is None or item[0] >= start) and  # 根据实际索引调整
+               (end is None or item[0] <= end)]
+    
+    elif isinstance(index, (int, float)):
+        # 按时间戳查找（示例实现）
+        return [item for item in data 
+               if item[0] == index]  # 根据实际索引调整
+        
+    return []
+
+
+def _time(item: list) -> TimeStamp:
+    return TimeStamp(item[0])
+
+
+@dataclass(frozen=True, eq=False)
+class ListSnapshot:
+    """ListDataRecoder 某一版本数据的副本，接口与 DataFrameRecoder 的 Snapshot 一致"""
+    data: list
+    first_time: TimeStamp
+    last_time: TimeStamp
+    timekey: str
+
+    @property
+    def rows(self) -> int:
+        return len(self.data)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.data
+
+    def __getitem__(self, index) -> list:
+        return _select(self.data, index)
+
+
 class ListDataRecoder(DataRecoder[list]):
     def __init__(self, pair: str, marketType: MarketType, datatype: DataType, timeframe="", 
                 data: List[list] | None = None, timeout: timedelta = timedelta(minutes=10)):
@@ -28,6 +73,18 @@ class ListDataRecoder(DataRecoder[list]):
     @property
     def is_empty(self) -> bool:
         return len(self.data) == 0
+
+    @property
+    def first_time(self) -> TimeStamp:
+        return _time(self.data[0]) if self.data else TimeStamp.empty()
+
+    @property
+    def last_time(self) -> TimeStamp:
+        return _time(self.data[-1]) if self.data else TimeStamp.empty()
+
+    def snapshot(self) -> ListSnapshot:
+        """当前数据的浅拷贝，之后的 append/prepend 不会修改它"""
+        return ListSnapshot(list(self.data), self.first_time, self.last_time, self.timekey)
     
     def append(self, data: List[list], dt: datetime | int | float | None = None):
         if not data:
@@ -93,21 +150,26 @@ class ListDataRecoder(DataRecoder[list]):
             raise RuntimeError("数据清理过程中发生错误") from e
 # ... existing code ...
     
+    def estimated_size(self) -> int:
+        """列表和每一行的内存占用（不含行内元素）"""
+        return sys.getsizeof(self.data) + sum(sys.getsizeof(item) for item in self.data)
+
+    def trim(self, before: float | int | None = None, max_rows: int | None = None) -> int:
+        """删除时间早于 before（毫秒）的行，并只保留最新的 max_rows 行，返回释放的字节数（估算）"""
+        drop = 0
+        if before is not None:
+            drop = bisect_left(self.data, before, key=lambda item: item[0])
+        if max_rows is not None:
+            drop = max(drop, len(self.data) - max_rows)
+        if drop <= 0:
+            return 0
+        freed = sum(sys.getsizeof(item) for item in self.data[:drop])
+        self.data = self.data[drop:]
+        return freed
+
     def __getitem__(self, index) -> list:
         """支持索引访问和切片"""
-        if isinstance(index, slice):
-            start = index.start
-            end = index.stop
-            return [item for item in self.data 
-                   if (start is None or item[0] >= start) and  # 根据实际索引调整
-                   (end is None or item[0] <= end)]
-        
-        elif isinstance(index, (int, float)):
-            # 按时间戳查找（示例实现）
-            return [item for item in self.data 
-                   if item[0] == index]  # 根据实际索引调整
-            
-        return []
+        return _select(self.data, index)
     
     def __len__(self) -> int:
         return len(self.data)
\ No newline at end of file
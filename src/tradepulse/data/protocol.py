@@ -55,6 +55,17 @@ class DataRecoder[T](ABC):
         """删除超时的数据"""
         ...
     @abstractmethod
+    def snapshot(self):
+        """当前版本的数据，读取方不需要加锁"""
+        ...
+    def estimated_size(self) -> int:
+        """估算的内存占用（字节）"""
+        return 0
+    @abstractmethod
+    def trim(self, before: float | int | None = None, max_rows: int | None = None) -> int:
+        """删除时间早于 before（毫秒）的行，并只保留最新的 max_rows 行，返回释放的字节数"""
+        ...
+    @abstractmethod
     def __getitem__(self, index)->T:
         """支持索引访问和切片"""
         ...
@@ -0,0 +1,256 @@
+import logging
+import math
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import polars as pl
+from polars import DataFrame
+
+from tradepulse.data.dataframe_recoder import Snapshot
+from tradepulse.data.protocol import DataRecoder
+from tradepulse.typenums import CANDLES_SCHEME, TRADES_SCHEME, DataType, MarketType, TimeStamp
+
+logger = logging.getLogger(__name__)
+
+# 字符串列按对象数组保存，每个值按该字节数估算内存
+_OBJECT_BYTES = 64
+
+
+def _numpy_dtype(dtype: pl.DataType) -> np.dtype:
+    if dtype == pl.Datetime or dtype.is_integer():
+        return np.dtype(np.int64)
+    if dtype.is_float():
+        return np.dtype(np.float64)
+    return np.dtype(object)
+
+
+class RingBufferRecoder(DataRecoder[DataFrame]):
+    """
+    预分配固定容量的环形缓冲区，每列一个 NumPy 数组，列与 TRADES_SCHEME / CANDLES_SCHEME 一致
+    写满后新数据覆盖最旧的行，内存占用不随运行时间增长
+    时间列按毫秒时间戳（int64）保存；prepend 只写入空闲的位置，缓冲区已满时更早的数据被丢弃
+    数据原地写入，读取按版本号校验（seqlock）：写入前后 version 各加一，读取期间 version 变化则重试，读写都不加锁
+    """
+    def __init__(self, pair: str, marketType: MarketType, datatype: DataType, timeframe="",
+                 max_rows: int | None = None, max_bytes: int | None = None, timeout: timedelta = timedelta(minutes=10)):
+        super().__init__(pair=pair, marketType=marketType, datatype=datatype, timeframe=timeframe, timeout_ms=timeout)
+        self.schema: dict[str, pl.DataType] = TRADES_SCHEME if datatype == "trades" else CANDLES_SCHEME
+        self.timekey = "timestamp" if datatype == "trades" else "date"
+        dtypes = {name: _numpy_dtype(dtype) for name, dtype in self.schema.items()}
+        self.row_bytes = sum(_OBJECT_BYTES if dtype == object else dtype.itemsize for dtype in dtypes.values())
+        capacities = [n for n in (max_rows, max_bytes // self.row_bytes if max_bytes is not None else None) if n is not None]
+        if not capacities:
+            raise ValueError("max_rows 和 max_bytes 至少需要设置一个")
+        self.capacity = max(1, min(capacities))
+        self.columns = {name: np.empty(self.capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        # 最旧一行的位置和当前行数
+        self.head = 0
+        self.size = 0
+        # 被覆盖或丢弃的行数
+        self.dropped = 0
+        # 奇数表示正在写入
+        self.version = 0
+        self._published: Snapshot | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * self.row_bytes
+
+    def estimated_size(self) -> int:
+        return self.nbytes
+
+    def _read[R](self, func: Callable[[], R]) -> R:
+        """读取期间没有写入时返回 func() 的结果，否则重试"""
+        while True:
+            version = self.version
+            if version % 2 == 0:
+                try:
+                    result = func()
+                except Exception:
+                    if self.version == version:
+                        raise
+                else:
+                    if self.version == version:
+                        return result
+            time.sleep(0)
+
+    def _begin_write(self):
+        self.version += 1
+
+    def _end_write(self):
+        self.version += 1
+
+    def _first_time(self) -> TimeStamp:
+        if self.size == 0:
+            return TimeStamp.empty()
+        return TimeStamp(int(self.columns[self.timekey][self.head]))
+
+    def _last_time(self) -> TimeStamp:
+        if self.size == 0:
+            return TimeStamp.empty()
+        return TimeStamp(int(self.columns[self.timekey][(self.head + self.size - 1) % self.capacity]))
+
+    @property
+    def first_time(self) -> TimeStamp:
+        return self._read(self._first_time)
+
+    @property
+    def last_time(self) -> TimeStamp:
+        return self._read(self._last_time)
+
+    def snapshot(self) -> Snapshot:
+        """当前版本数据的副本，之后的写入不会修改它"""
+        published = self._published
+        if published is not None and published.version == self.version:
+            return published
+        published = self._read(self._build_snapshot)
+        self._published = published
+        return published
+
+    def _build_snapshot(self) -> Snapshot:
+        return Snapshot(self.version, (self._materialize(),), self.size, self._first_time(), self._last_time(), self.timekey, True)
+
+    @staticmethod
+    def Empty() -> DataFrame:
+        return DataFrame()
+
+    @property
+    def empty(self) -> DataFrame:
+        return DataFrame()
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def rawdata(self) -> DataFrame:
+        return self.snapshot().data
+
+    def _materialize(self) -> DataFrame:
+        if self.size == 0:
+            return DataFrame(schema=self.schema)
+        end = self.head + self.size
+        series = []
+        for name, dtype in self.schema.items():
+            column = self.columns[name]
+            if end <= self.capacity:
+                # 复制，之后原地写入不影响已经发布的数据
+                values = column[self.head:end].copy()
+            else:
+                values = np.concatenate([column[self.head:], column[:end - self.capacity]])
+            if dtype == pl.Datetime:
+                series.append(pl.Series(name, values, dtype=pl.Int64).cast(dtype))
+            else:
+                series.append(pl.Series(name, values, dtype=dtype))
+        df = DataFrame(series)
+        return df.with_columns(pl.col(self.timekey).set_sorted())
+
+    def _to_numpy(self, data: DataFrame) -> dict[str, np.ndarray]:
+        missing = [name for name in self.schema if name not in data.columns]
+        if missing:
+            raise ValueError(f"数据缺少列 {missing}")
+        arrays = {}
+        for name, dtype in self.schema.items():
+            column = data[name]
+            if column.dtype == pl.Datetime:
+                column = column.dt.epoch("ms")
+            arrays[name] = column.to_numpy().astype(self.columns[name].dtype, copy=False)
+        return arrays
+
+    def _write(self, start: int, arrays: dict[str, np.ndarray], n: int):
+        """从物理位置 start 开始写入 n 行，超过末尾时回绕到开头"""
+        first = min(n, self.capacity - start)
+        for name, values in arrays.items():
+            column = self.columns[name]
+            column[start:start + first] = values[:first]
+            if first < n:
+                column[:n - first] = values[first:]
+
+    def append(self, data: DataFrame, dt: datetime | int | float | None = None):
+        n = data.height
+        if n == 0:
+            return
+        arrays = self._to_numpy(data)
+        if n > self.capacity:
+            # 只保留最新的 capacity 行
+            arrays = {name: values[-self.capacity:] for name, values in arrays.items()}
+            self.dropped += n - self.capacity
+            n = self.capacity
+        overflow = max(0, self.size + n - self.capacity)
+        self._begin_write()
+        self._write((self.head + self.size) % self.capacity, arrays, n)
+        # 覆盖最旧的 overflow 行
+        self.head = (self.head + overflow) % self.capacity
+        self.size += n - overflow
+        self._end_write()
+        self.dropped += overflow
+
+    def prepend(self, data: DataFrame, dt: datetime | int | float | None = None):
+        n = min(data.height, self.capacity - self.size)
+        self.dropped += data.height - n
+        if n == 0:
+            return
+        # 空间不足时保留与现有数据相邻（最新）的行
+        arrays = {name: values[-n:] for name, values in self._to_numpy(data).items()}
+        self._begin_write()
+        self.head = (self.head - n) % self.capacity
+        self._write(self.head, arrays, n)
+        self.size += n
+        self._end_write()
+
+    def _search(self, value: int) -> int:
+        """第一个时间 >= value 的行的逻辑位置，两段有序数组上二分查找"""
+        time = self.columns[self.timekey]
+        end = self.head + self.size
+        first = time[self.head:min(end, self.capacity)]
+        index = int(np.searchsorted(first, value, side="left"))
+        if index < first.size or end <= self.capacity:
+            return index
+        return first.size + int(np.searchsorted(time[:end - self.capacity], value, side="left"))
+
+    def drop_before(self, cutoff: int) -> int:
+        """删除时间早于 cutoff（毫秒）的行，只移动 head，返回删除的行数"""
+        if self.size == 0:
+            return 0
+        return self._drop_front(self._search(cutoff))
+
+    def _drop_front(self, count: int) -> int:
+        if count:
+            self._begin_write()
+            # 释放被删除行中对象的引用
+            for name, column in self.columns.items():
+                if column.dtype == object:
+                    end = self.head + count
+                    column[self.head:min(end, self.capacity)] = None
+                    if end > self.capacity:
+                        column[:end - self.capacity] = None
+            self.head = (self.head + count) % self.capacity
+            self.size -= count
+            self._end_write()
+        return count
+
+    def trim(self, before: float | int | None = None, max_rows: int | None = None) -> int:
+        """
+        删除时间早于 before（毫秒）的行，并只保留最新的 max_rows 行
+        缓冲区是预分配的，返回的是腾出的容量（字节），不会归还给系统
+        """
+        count = 0
+        if before is not None:
+            count = self.drop_before(math.ceil(before))
+        if max_rows is not None and self.size > max_rows:
+            count += self._drop_front(self.size - max_rows)
+        return count * self.row_bytes
+
+    def prune_expired_data(self, td: timedelta | int | None = None):
+        """删除超时的数据"""
+        cutoff = datetime.now(timezone.utc) - self.timeout
+        self.drop_before(int(cutoff.timestamp() * 1000))
+
+    def __getitem__(self, index) -> DataFrame:
+        """支持索引访问和切片，按时间戳取 [start, end] 内的行"""
+        return self.snapshot()[index]
+
+    def __len__(self) -> int:
+        return self._read(lambda: self.size)
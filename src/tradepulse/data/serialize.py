@@ -1,101 +1,147 @@
 import io
+from typing import Literal
 
 import polars as pl
 import pyarrow as pa
 
+# 格式标识头
+POLARS_IPC = b"POLARS_IPC"
+ARROW_IPC = b"ARROW_IPC"
 
+type Buffer = bytes | memoryview | pa.Buffer
+# Arrow IPC 的 body 压缩方式，读取端会自动解压
+type Compression = Literal["uncompressed", "lz4", "zstd"]
 
-def serialize_dataframe(df: pl.DataFrame| pa.Table) -> bytes:
-    """发送 Polars DataFrame 或 Arrow Table"""
+
+def _write_options(compression: Compression) -> pa.ipc.IpcWriteOptions:
+    return pa.ipc.IpcWriteOptions(compression=None if compression == "uncompressed" else compression)
+
+def serialize_dataframe_frames(df: pl.DataFrame | pa.Table, compression: Compression = "uncompressed") -> tuple[bytes, Buffer]:
+    """
+    序列化为 (格式标识头, IPC 数据) 两帧
+    IPC 数据直接引用写入缓冲区，不复制，可作为独立的一帧发送
+    compression 为 IPC body 压缩，每个 buffer 单独压缩，格式标识头不变
+    """
     if isinstance(df, pl.DataFrame):
         # 使用 Polars 的 IPC 格式
         buf = io.BytesIO()
-        df.write_ipc(buf)
-        data = buf.getvalue()
-        # 添加格式标识头
-        return b"POLARS_IPC" + data
+        df.write_ipc(buf, compression=compression)
+        return POLARS_IPC, buf.getbuffer()
     elif isinstance(df, pa.Table):
         # 转换为 Arrow Stream 格式并序列化
         sink = pa.BufferOutputStream()
-        with pa.ipc.new_stream(sink, df.schema) as writer:
+        with pa.ipc.new_stream(sink, df.schema, options=_write_options(compression)) as writer:
             writer.write_table(df)
-        data = sink.getvalue().to_pybytes()
-        # 添加格式标识头
-        return b"ARROW_IPC" + data
+        return ARROW_IPC, sink.getvalue()
     else:
         raise ValueError("Unsupported serializer")
 
-def deserialize_dataframe(data: bytes) -> pl.DataFrame:
+def deserialize_dataframe_frames(header: bytes, payload: Buffer) -> pl.DataFrame:
     """
-    从字节流反序列化为 Polars DataFrame
+    serialize_dataframe_frames 的逆操作，直接从 payload 的缓冲区读取 IPC，不复制
     """
-    # 检查格式标识头
-    if data.startswith(b"POLARS_IPC"):
-        # 去除标识头后读取
-        return pl.read_ipc(source=data[len(b"POLARS_IPC"):])
-    elif data.startswith(b"ARROW_IPC"):
-        # 去除标识头后读取
-        reader = pa.ipc.open_stream(data[len(b"ARROW_IPC"):])
-        pa_data = reader.read_all()
-        df= pl.from_arrow(pa_data)
-        if isinstance(df, pl.DataFrame):
-            return df
-        return df.to_frame()
+    buf = pa.py_buffer(payload)
+    if header == POLARS_IPC:
+        table = pa.ipc.open_file(buf).read_all()
+    elif header == ARROW_IPC:
+        table = pa.ipc.open_stream(buf).read_all()
     else:
-        # 默认尝试作为 Polars IPC 读取
-        return pl.read_ipc(source=data)
-    
+        raise ValueError(f"Unsupported header {header!r}")
+    df = pl.from_arrow(table)
+    if isinstance(df, pl.DataFrame):
+        return df
+    return df.to_frame()
+
+def serialize_dataframe(df: pl.DataFrame| pa.Table, compression: Compression = "uncompressed") -> bytes:
+    """发送 Polars DataFrame 或 Arrow Table"""
+    header, payload = serialize_dataframe_frames(df, compression)
+    # 添加格式标识头，只在这里复制一次
+    return header + payload
+
+def deserialize_dataframe(data: Buffer) -> pl.DataFrame:
+    """
+    从字节流反序列化为 Polars DataFrame
+    """
+    view = memoryview(data)
+    # 检查格式标识头，切片 memoryview 不复制数据
+    for header in (POLARS_IPC, ARROW_IPC):
+        if view[:len(header)] == header:
+            return deserialize_dataframe_frames(header, view[len(header):])
+    # 默认尝试作为 Polars IPC 读取
+    return pl.read_ipc(source=bytes(data))
+
+
+def _to_record_batch(df: pl.DataFrame, schema: pa.Schema) -> pa.RecordBatch:
+    """把 DataFrame 合并为一个符合 schema 的 record batch"""
+    if df.width == 0:
+        return pa.RecordBatch.from_pylist([], schema=schema)
+    table = df.to_arrow()
+    if table.schema != schema:
+        table = table.cast(schema)
+    batches = table.combine_chunks().to_batches()
+    if not batches:
+        return pa.RecordBatch.from_pylist([], schema=schema)
+    return batches[0]
+
+def serialize_batches_frames(dfs: list[pl.DataFrame], compression: Compression = "uncompressed") -> tuple[bytes, Buffer]:
+    """多个同结构的 DataFrame 写入同一个 Arrow IPC stream，每个 DataFrame 一个 record batch，顺序不变"""
+    non_empty = [df for df in dfs if df.width > 0]
+    schema = non_empty[0].to_arrow().schema if non_empty else pa.schema([])
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema, options=_write_options(compression)) as writer:
+        for df in dfs:
+            writer.write_batch(_to_record_batch(df, schema))
+    return ARROW_IPC, sink.getvalue()
+
+def serialize_batches(dfs: list[pl.DataFrame], compression: Compression = "uncompressed") -> bytes:
+    header, payload = serialize_batches_frames(dfs, compression)
+    return header + payload
+
+def deserialize_batches(data: Buffer) -> list[pl.DataFrame]:
+    """serialize_batches 的逆操作，每个 record batch 还原为一个 DataFrame"""
+    view = memoryview(data)
+    if view[:len(ARROW_IPC)] == ARROW_IPC:
+        view = view[len(ARROW_IPC):]
+    reader = pa.ipc.open_stream(pa.py_buffer(view))
+    result = []
+    for batch in reader:
+        df = pl.from_arrow(batch)
+        result.append(df if isinstance(df, pl.DataFrame) else df.to_frame())
+    return result
+
 
 
 # ========================
 # DataFrame 传输实现
 # ========================
 class DataFrameTransport:
-  
-    compression_level = 6  # 默认压缩级别
 
-    @classmethod    
-    def _compress(cls, data: bytes) -> bytes:
-        """使用 LZ4 压缩算法"""
-        return pa.compress(data, method='lz4', compression_level=cls.compression_level)
-    @classmethod
-    def _decompress(cls, data: bytes) -> bytes:
-        """解压 LZ4 压缩数据"""
-        return pa.decompress(data)
+    # IPC body 压缩方式；polars 的 IPC 写入不支持压缩级别，只能选择算法
+    codec: Compression = "lz4"
+
     @classmethod
     def serialize_dataframe(cls, df: pl.DataFrame|pa.Table, compress: bool = True):
         """
          DataFrame
         """
-        # 1. 序列化
-        raw_data = serialize_dataframe(df)
-        
-        # 2. 压缩（可选）
-        if compress:
-            raw_data = cls._compress(raw_data)
-            
-        # 3. 发送数据（使用 multipart 消息包含元数据）
+        # 1. 序列化，压缩在 IPC 内部完成（可选）
+        compression: Compression = cls.codec if compress else "uncompressed"
+        raw_data = serialize_dataframe(df, compression)
+
+        # 2. 发送数据（使用 multipart 消息包含元数据）
         header = {
             'type': 'arrow',
-            'compression': 'lz4' if compress else 'none',
+            'compression': compression,
             'size': len(raw_data),
             'schema': str(df.schema)
         }
         return header,raw_data
-        
- 
-    
+
+
+
     def recv_dataframe(self, header,rawdata) -> pl.DataFrame:
         """
         通过 ZeroMQ 接收 DataFrame
         """
-        # 1. 接收 header
-        
-        raw_data = rawdata
-        
-        # 2. 解压数据
-        if header['compression'] == 'lz4':
-            raw_data = self._decompress(raw_data)
-            
-        # 3. 反序列化
-        return deserialize_dataframe(raw_data)
\ No newline at end of file
+        # IPC 读取时按 header 中记录的算法自动解压
+        return deserialize_dataframe(rawdata)
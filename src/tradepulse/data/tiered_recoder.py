@@ -0,0 +1,185 @@
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+from polars import DataFrame
+
+from tradepulse.data.dataframe_recoder import DataFrameRecoder, _detach, _search_bounds
+from tradepulse.typenums import DataType, MarketType, TimeStamp
+
+logger = logging.getLogger(__name__)
+
+
+class TieredRecoder(DataFrameRecoder):
+    """
+    两层存储：最新的 hot_rows 行作为热数据留在内存中，更早的块写入 directory 下的 Arrow IPC 文件（温数据）
+    温数据通过 pl.read_ipc(memory_map=True) 读回，查询更早的数据只会读到操作系统的页缓存，不占用堆内存
+    data / rawdata 按时间顺序拼接两层数据，按时间查询和切片同时覆盖两层
+    温数据不为空时热数据至少保留一个块；早于温数据的回补数据先留在内存中，累计到 hot_rows 行再写为一个温数据文件
+    删除的文件可能仍被旧的 Snapshot 映射（Windows 下不能删除），删除失败时留到之后重试
+    """
+    def __init__(self, pair: str, marketType: MarketType, datatype: DataType, directory: str | Path, timeframe="",
+                 hot_rows: int = 100_000, data: DataFrame | None = None, timeout: timedelta = timedelta(minutes=10)):
+        self.directory = Path(directory)
+        self.hot_rows = hot_rows
+        # 温数据，按时间从早到晚，与 segment_paths 一一对应；路径为 None 的是还没有写入文件的回补数据
+        self.segments: list[DataFrame] = []
+        self.segment_paths: list[Path | None] = []
+        self.warm_rows = 0
+        # 已经不用、但还没能删除的文件
+        self.retired: list[Path] = []
+        self._segment_seq = 0
+        super().__init__(pair=pair, marketType=marketType, datatype=datatype, timeframe=timeframe, data=data, timeout=timeout)
+
+    @property
+    def data(self) -> DataFrame:
+        return self.snapshot().data
+
+    @data.setter
+    def data(self, data: DataFrame):
+        # 整体替换时温数据一起丢弃，已经映射的数据在文件删除后仍然有效
+        self._drop_segments(len(self.segments))
+        DataFrameRecoder.data.fset(self, data)
+        self._unlink_retired()
+
+    def _frames(self) -> tuple[DataFrame, ...]:
+        return (*self.segments, *self.chunks)
+
+    def _total_rows(self) -> int:
+        return self.rows + self.warm_rows
+
+    def estimated_size(self) -> int:
+        # 还没有写入文件的回补数据在堆内存中
+        pending = sum(segment.estimated_size() for segment, path in zip(self.segments, self.segment_paths) if path is None)
+        return super().estimated_size() + pending
+
+    def _write_segment(self, data: DataFrame) -> tuple[Path, DataFrame]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segment_seq += 1
+        path = self.directory / f"{self._segment_seq:08d}.arrow"
+        # 不压缩，才能直接映射
+        data.write_ipc(path, compression="uncompressed")
+        return path, pl.read_ipc(path, memory_map=True)
+
+    def _drop_segments(self, count: int):
+        self.retired.extend(path for path in self.segment_paths[:count] if path is not None)
+        self.warm_rows -= sum(segment.height for segment in self.segments[:count])
+        del self.segments[:count], self.segment_paths[:count]
+
+    def _unlink_retired(self):
+        """删除不再使用的文件，在新的 Snapshot 发布之后调用；仍被映射而删除失败的文件留到下次"""
+        retired = []
+        for path in self.retired:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                retired.append(path)
+        self.retired = retired
+
+    def _coalesce(self):
+        """最前面还没有写入文件的回补数据累计到 hot_rows 行时，合并写为一个文件"""
+        count = rows = 0
+        while count < len(self.segments) and self.segment_paths[count] is None:
+            rows += self.segments[count].height
+            count += 1
+        if rows < self.hot_rows:
+            return
+        path, segment = self._write_segment(pl.concat(self.segments[:count]))
+        self.segments[:count] = [segment]
+        self.segment_paths[:count] = [path]
+
+    def _append_segment(self, chunks: list[DataFrame]):
+        path, segment = self._write_segment(chunks[0] if len(chunks) == 1 else pl.concat(chunks))
+        self.segments.append(segment)
+        self.segment_paths.append(path)
+        self.warm_rows += segment.height
+
+    def flush(self):
+        """
+        热数据超过 hot_rows 时，把最旧的块写入温数据，至少保留最新的一个块
+        一次移出的块合并写为约 hot_rows 行的文件，全部写完后只发布一次
+        """
+        pending: list[DataFrame] = []
+        pending_rows = 0
+        moved = False
+        while self.rows > self.hot_rows and len(self.chunks) > 1:
+            chunk = self.chunks.pop(0)
+            del self.levels[0]
+            self.rows -= chunk.height
+            pending.append(chunk)
+            pending_rows += chunk.height
+            moved = True
+            if pending_rows >= self.hot_rows:
+                self._append_segment(pending)
+                pending, pending_rows = [], 0
+        if pending:
+            self._append_segment(pending)
+        if moved:
+            self._publish()
+        self._unlink_retired()
+
+    def append(self, data: DataFrame, dt: datetime | int | float | None = None):
+        super().append(data, dt)
+        self.flush()
+
+    def prepend(self, data: DataFrame, dt: datetime | int | float | None = None):
+        if not self.segments:
+            super().prepend(data, dt)
+            self.flush()
+            return
+        self._check_schema(data)
+        if data.height == 0:
+            return
+        last = self._edge_time(data, -1)
+        self.sorted = self.sorted and last <= self._first_time and self._is_sorted(data)
+        # 回补的数据更早，放在最前面；每次回补的数据较少，先留在内存中，避免大量小文件和映射
+        self.segments.insert(0, data)
+        self.segment_paths.insert(0, None)
+        self.warm_rows += data.height
+        self._coalesce()
+        self._first_time = self._edge_time(data, 0)
+        self._publish()
+
+    def trim(self, before: float | int | None = None, max_rows: int | None = None) -> int:
+        """
+        先删除温数据：整个文件过期时删除文件，部分过期时只保留文件中较新部分的映射
+        温数据删完后再裁剪热数据，返回释放的堆内存字节数（已经写入文件的温数据不占用堆内存）
+        """
+        if not self.segments or not self._is_sorted_time():
+            return super().trim(before=before, max_rows=max_rows)
+        excess = 0 if max_rows is None else max(0, len(self) - max_rows)
+        freed = 0
+        while self.segments:
+            segment = self.segments[0]
+            count = excess
+            if before is not None:
+                count = max(count, _search_bounds(segment[self.timekey], before, None)[0])
+            if count == 0:
+                break
+            if count < segment.height:
+                if self.segment_paths[0] is None:
+                    # 内存中的回补数据复制剩下的部分，被删除的部分才能释放
+                    remaining = _detach(segment.slice(count))
+                    freed += segment.estimated_size() - remaining.estimated_size()
+                else:
+                    remaining = segment.slice(count)
+                self.segments[0] = remaining
+                self.warm_rows -= count
+                break
+            if self.segment_paths[0] is None:
+                freed += segment.estimated_size()
+            self._drop_segments(1)
+            excess = max(0, excess - segment.height)
+        if self.segments:
+            self._first_time = self._edge_time(self.segments[0], 0)
+        else:
+            self._first_time = self._edge_time(self.chunks[0], 0) if self.chunks else TimeStamp.empty()
+        self._publish()
+        self._unlink_retired()
+        if self.segments:
+            return freed
+        return freed + super().trim(before=before, max_rows=None if max_rows is None else self.rows - excess)
+
+    def _is_sorted_time(self) -> bool:
+        return self.sorted and self.schema is not None and self.timekey in self.schema
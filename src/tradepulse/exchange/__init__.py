@@ -1,11 +1,13 @@
 from .exchange_factory import ExchangeFactory
 from .ccxtexchange_factory import CCXTExchangeFactory,ExchangeConifg
 from .protocol import CCXTExchangeProtocol, ExchangeABC
+from .updater import ExchangeUpdater
 
 __all__ = [
     "ExchangeABC",
     "CCXTExchangeFactory",
     "CCXTExchangeProtocol",
     "ExchangeFactory",
+    "ExchangeUpdater",
     "ExchangeConifg"
 ]
\ No newline at end of file
@@ -1,10 +1,12 @@
 import asyncio
 import logging
+import time
 from collections.abc import Callable
 from datetime import datetime, timedelta
 from typing import Any, NamedTuple, TypeVar
 
 from ccxt import pro
+from ccxt.base.errors import DDoSProtection, RateLimitExceeded
 
 from tradepulse. data import CacheFactory, DataKey
 
@@ -13,6 +15,7 @@ from tradepulse. typenums import MarketType, State, TimeFrame, TimeStamp
 from tradepulse.util import (
     clamp,
     dt_now,
+    timeframe_to_msecs,
     timeframe_to_seconds,
     timeframe_to_timedelta,
     timestamp_to_timestamp,
@@ -20,10 +23,28 @@ from tradepulse.util import (
 
 from .ccxtexchange_factory import CCXTExchangeFactory
 from .protocol import CCXTExchangeProtocol, ExchangeABC
+from .scheduler import RateLimiter
+from .stats import LatencyStats
 
 logger = logging.getLogger(__name__)
 
 
+def _row_time(row) -> float|int:
+    """ccxt 返回行的时间戳：OHLCV 为列表第一个元素，trades 等为字典的 timestamp"""
+    return row["timestamp"] if isinstance(row, dict) else row[0]
+
+
+def _row_id(row):
+    """去重用的行标识：trades 为成交 id，没有 id 时与 OHLCV 等一样按时间戳"""
+    if isinstance(row, dict):
+        return row["id"] if row.get("id") is not None else row["timestamp"]
+    return row[0]
+
+
+# batch == 0 时最新一段的长度（毫秒），之后每段约为一页
+_FIRST_SEGMENT_MS = 60_000
+
+
 TimeMarkerMinGap= NamedTuple("TimeMarkerMinGap", [("time_marker", TimeStamp),("internal", timedelta) ])
 
 class Exchange[T](ExchangeABC[T]):
@@ -44,7 +65,35 @@ class Exchange[T](ExchangeABC[T]):
         
         self.data_internal_ratio = 10
         self.rateLimit=self.exchange.rateLimit
-        self._cache = CacheFactory.get(type(T))
+        # 设置 cache_max_rows / cache_max_bytes 时每个 key 使用固定容量的环形缓冲区
+        # cache_budget_bytes: 所有 key 的内存上限，超出时最久没有读取的 key 写入 cache_spill_dir 下的 parquet
+        # cache_tier_dir: 每个 key 最新的 cache_hot_rows 行在内存中，更早的数据映射自该目录下的 Arrow IPC 文件
+        self._cache = CacheFactory.get(type(T), max_rows=config.get("cache_max_rows"), max_bytes=config.get("cache_max_bytes"),
+                                       budget_bytes=config.get("cache_budget_bytes"), spill_dir=config.get("cache_spill_dir"),
+                                       tier_dir=config.get("cache_tier_dir"), hot_rows=config.get("cache_hot_rows", 100_000))
+        # 缓存保留策略（秒 / 行数），由 ExchangeUpdater 定期执行
+        if config.get("retention_max_age") is not None or config.get("retention_max_rows") is not None:
+            max_age = config.get("retention_max_age")
+            self._cache.set_retention(max_age=None if max_age is None else timedelta(seconds=max_age), max_rows=config.get("retention_max_rows"))
+        # 同时进行的 watch_* 调用上限，以及每轮等待单个 key 的最长时间（秒）
+        self.max_concurrency: int = config.get("max_concurrency", 32)
+        self.watch_timeout: float = config.get("watch_timeout", 1.0)
+        # 多路复用：同一 marketType 的 key 合并为 watch_*_for_symbols 订阅，每个订阅最多 multiplex_size 个 key
+        self.multiplex: bool = config.get("multiplex", False)
+        self.multiplex_size: int = config.get("multiplex_size", 100)
+        # 每个 key 的 watch_* 耗时统计
+        self.latency: dict[DataKey, LatencyStats] = {}
+        # 已经订阅过的 key，新订阅之间至少间隔 rateLimit 毫秒
+        self.subscribed: set[DataKey] = set()
+        self._subscribe_lock = asyncio.Lock()
+        self._next_subscribe = 0.0
+        # 历史回补的 REST 请求都经过同一个 ccxt 实例共用的限速器
+        self.limiter = RateLimiter.shared(self.exchange, self.rateLimit, burst=config.get("rate_burst", 1))
+        # OHLCV 回补按固定窗口并发请求 [since, first_time)，窗口大小为 timeframe * 单次请求上限
+        self.windowed_backfill: bool = config.get("windowed_backfill", False)
+        self.backfill_concurrency: int = config.get("backfill_concurrency", 8)
+        # 由 ExchangeUpdater 设置，实时数据经该队列写入缓存
+        self.live_queue: asyncio.Queue[tuple[DataKey, Any, float]] | None = None
 
           
        
@@ -74,7 +123,8 @@ class Exchange[T](ExchangeABC[T]):
         self.set_until(key=key,until=until,internal=timeframe)
     async def update(self) -> None:
         """请无限循环运行该函数
-        持续更新最新的交易数据"""
+        持续更新最新的交易数据
+        长期运行的服务请使用 ExchangeUpdater，各部分在独立的任务中运行，互不阻塞"""
         try:
             
             # 先处理需要停止的until数据
@@ -82,7 +132,7 @@ class Exchange[T](ExchangeABC[T]):
             
             await self._update_newest_data()
             # 分批次补齐历史数据
-            await self._update_history_data()
+            await self._update_history_data(dt_now())
                 
         except Exception as e:
             logger.error(f"Background update error: {e}")
@@ -90,7 +140,8 @@ class Exchange[T](ExchangeABC[T]):
     
     async def _check_and_unwatch_data(self):
         """检查until时间，停止不再需要的数据流"""
-        current_time =dt_now().timestamp()
+        # until 为毫秒时间戳
+        current_time =dt_now().timestamp() * 1000
         
         for key in list(self.until.keys()):
             if self.until[key].time_marker < current_time:
@@ -111,13 +162,20 @@ class Exchange[T](ExchangeABC[T]):
        
       
             
+        self.subscribed.discard(key)
         try:
             if key.datatype == "trades":
                 # 停止交易数据流的逻辑
-                await self.exchange.un_watch_trades(key.pair)
+                if self._multiplexed(key):
+                    await self.exchange.un_watch_trades_for_symbols([key.pair])
+                else:
+                    await self.exchange.un_watch_trades(key.pair)
             elif key.datatype == "ohlcv":
                 # 停止K线数据流的逻辑
-                await self.exchange.un_watch_ohlcv(key.pair, key.timeframe)
+                if self._multiplexed(key):
+                    await self.exchange.un_watch_ohlcv_for_symbols([[key.pair, key.timeframe]])
+                else:
+                    await self.exchange.un_watch_ohlcv(key.pair, key.timeframe)
             # 添加其他数据类型的处理
             else:
                 logger.warning(f"Unsupported data type for unwatch: {key.datatype}")
@@ -125,34 +183,155 @@ class Exchange[T](ExchangeABC[T]):
         except Exception as e:
             logger.error(f"Error in _unwatch_data_stream for {key}: {e}")
 
-    async def _update_newest_data(self) -> None:
-        """获取最新的交易数据并更新缓存"""
-        
-        for key, df in self.cache.items():
-           
-            
-            if df.state == State.RUNNING or df.state == State.PAUSED:
-                # 计算时间窗口
-                try:
-                    # 根据数据类型获取最新数据
-                    new_data = None
-                    
-                    if key.datatype == "trades":
-                        new_data = await self.exchange.watch_trades(
-                            symbol=key.pair, 
-                            # since=df.last_datetime - 1
-                        )
-                    elif key.datatype == "ohlcv":
-                        new_data = await self.exchange.watch_ohlcv(symbol=key.pair, timeframe=key.timeframe)
-            
-                    
-                    # 更新缓存
-                    if new_data:
-                        self.cache.append(key=key,data=new_data)
-                            
-                except Exception as e:
-                    logger.error(f"Error fetching newest data for {key}: {e}")
-                    continue
+    async def _update_newest_data(self) -> bool:
+        """
+        并发获取每个 key 的最新数据，最多 max_concurrency 个同时进行
+        每个 key 的数据到达后立即写入缓存；没有新数据的 key 最多等待 watch_timeout 秒，不会拖住其他 key
+        返回是否有 key 的 watch 没有出错（收到数据或等待超时）；没有 key 或全部出错时返回 False
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        keys = [key for key, df in list(self.cache.items()) if df.state == State.RUNNING or df.state == State.PAUSED]
+        tasks: list[asyncio.Task[bool]] = []
+        async with asyncio.TaskGroup() as tg:
+            for group in self._multiplex_groups([key for key in keys if self._multiplexed(key)]):
+                tasks.append(tg.create_task(self._update_newest_group(group, semaphore)))
+            for key in keys:
+                if not self._multiplexed(key):
+                    tasks.append(tg.create_task(self._update_newest_key(key, semaphore)))
+        return any(task.result() for task in tasks)
+
+    async def _deliver_newest(self, key: DataKey, data) -> None:
+        """有 live_queue 时放入队列由 ExchangeUpdater 写入缓存，队列满时等待（背压），否则直接写入"""
+        if self.live_queue is not None:
+            await self.live_queue.put((key, data, time.perf_counter()))
+        else:
+            self._append_newest(key, data)
+
+    def _append_newest(self, key: DataKey, data) -> None:
+        try:
+            self.cache.append(key=key,data=data)
+        except Exception as e:
+            logger.error(f"Error appending newest data for {key}: {e}")
+
+    def _multiplexed(self, key: DataKey) -> bool:
+        """key 是否通过 watch_*_for_symbols 订阅"""
+        if not self.multiplex:
+            return False
+        match key.datatype:
+            case "trades":
+                return bool(self.exchange.has.get("watchTradesForSymbols"))
+            case "ohlcv":
+                return bool(self.exchange.has.get("watchOHLCVForSymbols"))
+        return False
+
+    def _multiplex_groups(self, keys: list[DataKey]) -> list[list[DataKey]]:
+        """按 (datatype, marketType) 分组，每组最多 multiplex_size 个 key"""
+        groups: dict[tuple, list[DataKey]] = {}
+        for key in keys:
+            groups.setdefault((key.datatype, key.marketType), []).append(key)
+        return [
+            group[i:i + self.multiplex_size]
+            for group in groups.values()
+            for i in range(0, len(group), self.multiplex_size)
+        ]
+
+    def _unified_symbol(self, pair: str) -> str:
+        # 返回数据中的 symbol 是 ccxt 统一格式，如 BTC/USDT:USDT
+        try:
+            return self.exchange.market(pair)["symbol"]
+        except Exception:
+            return pair
+
+    async def _watch_newest_group(self, keys: list[DataKey]) -> dict[DataKey, list]:
+        """一次 watch_*_for_symbols 调用，按 symbol 拆分到各个 key"""
+        lookup = {}
+        for key in keys:
+            lookup[(key.pair, key.timeframe)] = key
+            lookup[(self._unified_symbol(key.pair), key.timeframe)] = key
+        result: dict[DataKey, list] = {}
+        if keys[0].datatype == "trades":
+            trades = await self.exchange.watch_trades_for_symbols([key.pair for key in keys])
+            for trade in trades:
+                key = lookup.get((trade["symbol"], ""))
+                if key is not None:
+                    result.setdefault(key, []).append(trade)
+        else:
+            ohlcvs = await self.exchange.watch_ohlcv_for_symbols([[key.pair, key.timeframe] for key in keys])
+            for symbol, timeframes in ohlcvs.items():
+                for timeframe, candles in timeframes.items():
+                    key = lookup.get((symbol, timeframe))
+                    if key is not None:
+                        result[key] = candles
+        return result
+
+    async def _update_newest_group(self, keys: list[DataKey], semaphore: asyncio.Semaphore) -> bool:
+        """多路复用订阅，收到的数据按 key 写入缓存；出错时返回 False"""
+        stats = [self.latency.setdefault(key, LatencyStats()) for key in keys]
+        async with semaphore:
+            if any(key not in self.subscribed for key in keys):
+                await self._throttle_subscribe()
+            start = time.perf_counter()
+            try:
+                async with asyncio.timeout(self.watch_timeout):
+                    new_data = await self._watch_newest_group(keys)
+            except TimeoutError:
+                for stat in stats:
+                    stat.timeouts += 1
+                return True
+            except Exception as e:
+                for stat in stats:
+                    stat.errors += 1
+                logger.error(f"Error fetching newest data for {len(keys)} {keys[0].datatype} keys: {e}")
+                return False
+            finally:
+                self.subscribed.update(keys)
+            elapsed = time.perf_counter() - start
+        for key, data in new_data.items():
+            self.latency[key].record(elapsed)
+            if data:
+                await self._deliver_newest(key, data)
+        return True
+
+    async def _throttle_subscribe(self) -> None:
+        """新订阅会向交易所发送请求，按 rateLimit 间隔发出"""
+        async with self._subscribe_lock:
+            loop = asyncio.get_running_loop()
+            wait = self._next_subscribe - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_subscribe = loop.time() + self.rateLimit / 1000
+
+    async def _watch_newest(self, key: DataKey):
+        if key.datatype == "trades":
+            return await self.exchange.watch_trades(symbol=key.pair)
+        elif key.datatype == "ohlcv":
+            return await self.exchange.watch_ohlcv(symbol=key.pair, timeframe=key.timeframe)
+        return None
+
+    async def _update_newest_key(self, key: DataKey, semaphore: asyncio.Semaphore) -> bool:
+        """订阅单个 key，收到的数据写入缓存；出错时返回 False"""
+        stats = self.latency.setdefault(key, LatencyStats())
+        async with semaphore:
+            if key not in self.subscribed:
+                await self._throttle_subscribe()
+            start = time.perf_counter()
+            try:
+                async with asyncio.timeout(self.watch_timeout):
+                    new_data = await self._watch_newest(key)
+            except TimeoutError:
+                stats.timeouts += 1
+                return True
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"Error fetching newest data for {key}: {e}")
+                return False
+            finally:
+                self.subscribed.add(key)
+            stats.record(time.perf_counter() - start)
+        # 更新缓存
+        if new_data:
+            await self._deliver_newest(key, new_data)
+        return True
 
 
     async def _fetch_history_data(self, key: DataKey, since: float|int, 
@@ -162,43 +341,169 @@ class Exchange[T](ExchangeABC[T]):
         """
         通用历史数据获取方法
         batch == 0 一直运行到获取所有数据为止
-        
+        每次请求前从限速器获取令牌，离现在越近的数据优先级越高
+        从缓存最早的时间向前分段获取，每段完整获取后立即前置到缓存；某一段失败时停止，前置的数据始终与缓存相连
         """
-        current_first_time = self.cache.get_recoder(key=key).first_time
+        recoder = self.cache.get_recoder(key=key)
+        # 缓存为空时 first_time 为 NaN，从现在开始向前获取
+        current_first_time = dt_now().timestamp() * 1000 if recoder.is_empty else recoder.first_time
         
         if current_first_time is None or since >= current_first_time:
             return
             
-        result = []
         if isinstance(batch,timedelta):
             batch = batch.total_seconds()*1000
 
         start_time = current_first_time - batch if batch > 0 else since
         start_time = max(since,start_time)
+        end = float(current_first_time)
+        span = batch if batch > 0 else _FIRST_SEGMENT_MS
+        while end > start_time:
+            segment_start = max(start_time, end - span)
+            rows, page_span = await self._fetch_segment(key, segment_start, end, fetch_func, *args, **kwargs)
+            if rows is None:
+                logger.error(f"Giving up on {key} history before {end}")
+                return
+            if rows:
+                self.cache.prepend(key=key, data=self.cache.convert(rows, key.datatype))
+            end = segment_start
+            # 下一段约为一页：一页取不完时按第一页覆盖的时间，否则加倍
+            span = page_span if page_span > 0 else span * 2
+
+    async def _fetch_segment(self, key: DataKey, start: float|int, end: float|int,
+                             fetch_func: Callable[..., Any], *args, **kwargs) -> tuple[list | None, float]:
+        """
+        从 start 开始向后翻页，返回 [start, end) 内的行，重试用完时返回 None
+        同时返回第一页覆盖的时间，第一页已经到达 end 时为 0
+        since 包含边界，从上一页最后的时间戳继续，同一毫秒内已经取到的行按 _row_id 去掉
+        """
         max_retries = 5
         retries = 0
-        
-        while start_time < current_first_time and retries < max_retries:
-            try:
-              
-                _result = await fetch_func(start_time, *args, **kwargs)
-                
-                if not _result:
-                    retries += 1
-                    await asyncio.sleep(retries)
-                    continue
-                
-                result.extend(_result)
-                start_time = _result[-1][0]
-                retries = 0
-                
-            except Exception as e:
-                logger.error(f"Error fetching old {key} data error: {e}")
+        rows: list = []
+        # 时间戳 cursor 上已经取到的行
+        seen: set = set()
+        cursor = start
+        span = None
+        while cursor < end:
+            _result = await self._fetch_page(key, cursor, retries, fetch_func, *args, **kwargs)
+            if _result is None:
                 retries += 1
-                await asyncio.sleep(1)
-        
-        if result:
-            self.cache.prepend(key=key, data=result)
+                if retries >= max_retries:
+                    return None, 0
+                continue
+            retries = 0
+            if not _result:
+                # cursor 之后没有数据，缓存为空时最新一段在到达现在之前就会取完
+                break
+            last = _row_time(_result[-1])
+            if span is None:
+                span = 0 if last >= end else last - start
+            added = False
+            for row in _result:
+                row_time = _row_time(row)
+                if row_time < cursor or row_time >= end or (row_time == cursor and _row_id(row) in seen):
+                    continue
+                rows.append(row)
+                added = True
+            if last > cursor:
+                seen.clear()
+            seen.update(_row_id(row) for row in _result if _row_time(row) == last)
+            if not added and last <= cursor:
+                # 整页都在同一毫秒内，继续请求只会得到同一页，只能跳过该毫秒剩下的行
+                logger.warning(f"{key} page is full at {last}, skipping the rest of this millisecond")
+                last += 1
+            cursor = last
+        return rows, span or 0
+
+    async def _fetch_page(self, key: DataKey, start_time: float|int, retries: int, fetch_func: Callable[..., Any], *args, **kwargs):
+        """
+        从限速器获取令牌后请求一页，离现在越近优先级越高
+        出错时返回 None；被交易所限速时所有回补请求一起退避
+        """
+        try:
+            await self.limiter.acquire(priority=dt_now().timestamp() * 1000 - start_time)
+            return await fetch_func(start_time, *args, **kwargs)
+        except (RateLimitExceeded, DDoSProtection) as e:
+            logger.warning(f"Rate limited fetching old {key} data, backoff {2 ** (retries + 1)}s: {e}")
+            self.limiter.pause(2 ** (retries + 1))
+        except Exception as e:
+            logger.error(f"Error fetching old {key} data error: {e}")
+        return None
+
+    def _ohlcv_page_limit(self, key: DataKey) -> int:
+        """单次 fetch_ohlcv 最多返回的 K 线数量"""
+        if "ohlcv_limit" in self.config:
+            return self.config["ohlcv_limit"]
+        try:
+            market = "spot" if key.marketType == "spot" else "swap"
+            features = self.exchange.features[market]
+            features = features.get("linear", features) or features
+            return int(features["fetchOHLCV"]["limit"])
+        except Exception:
+            return 500
+
+    async def _fetch_history_windows(self, key: DataKey, since: float|int, until: float|int, timeframe_ms: int,
+                                     page_limit: int, fetch_func: Callable[[int, int], Any]) -> list:
+        """
+        [since, until) 按 timeframe_ms * page_limit 切分为固定窗口，在限速器下并发请求
+        每个窗口翻页到窗口结束，只保留窗口内的数据并按时间戳去重；从最新的窗口开始，与缓存相连的窗口完成后立即前置到缓存
+        返回写入的行数
+        """
+        window = timeframe_ms * page_limit
+        start = int(since) // timeframe_ms * timeframe_ms
+        windows = [(t, min(t + window, int(until))) for t in range(start, int(until), window)]
+        semaphore = asyncio.Semaphore(self.backfill_concurrency)
+        # 已完成但还不能前置的窗口（更新的窗口尚未完成）
+        ready: dict[int, list] = {}
+        next_commit = len(windows) - 1
+        committed = 0
+
+        def commit(index: int, rows: list | None):
+            nonlocal next_commit, committed
+            ready[index] = rows
+            while next_commit in ready:
+                rows = ready.pop(next_commit)
+                if rows is None:
+                    # 窗口失败，更早的窗口不再前置，避免缓存中间出现缺口
+                    next_commit = -1
+                    break
+                if rows:
+                    self.cache.prepend(key=key, data=self.cache.convert(rows, key.datatype))
+                    committed += len(rows)
+                next_commit -= 1
+
+        async def fetch_window(index: int, w_start: int, w_end: int):
+            # 交易所单次返回的行数可能少于 page_limit，在窗口内继续翻页直到 w_end
+            rows: list | None = []
+            cursor = w_start
+            last = None
+            retries = 0
+            async with semaphore:
+                while cursor < w_end:
+                    page = await self._fetch_page(key, cursor, retries, fetch_func, page_limit)
+                    if page is None:
+                        retries += 1
+                        if retries >= 5:
+                            logger.error(f"Giving up on {key} window {w_start}-{w_end}")
+                            rows = None
+                            break
+                        continue
+                    retries = 0
+                    for row in page:
+                        if cursor <= row[0] < w_end and (last is None or row[0] > last):
+                            rows.append(row)
+                            last = row[0]
+                    # since 包含边界，从本页最后的时间戳继续；没有更新的数据时窗口结束
+                    if not page or page[-1][0] <= cursor:
+                        break
+                    cursor = page[-1][0]
+            commit(index, rows)
+
+        # 从最新的窗口开始创建任务，信号量按先到先得放行，与缓存相连的窗口最先完成并前置，ready 中只暂存少量窗口
+        async with asyncio.TaskGroup() as tg:
+            for index in reversed(range(len(windows))):
+                tg.create_task(fetch_window(index, *windows[index]))
+        return committed
 
     async def _fetch_history_trades(self, key: DataKey, since: float|int) -> None:
         async def fetch_data(lsince:float|int):
@@ -213,9 +518,18 @@ class Exchange[T](ExchangeABC[T]):
 
     async def _fetch_history_ohlcv(self, key: DataKey, since: float|int) -> None:
         """获取比当前缓存更早的K线数据"""
-        async def fetch_data(lsince:float|int):
+        async def fetch_data(lsince:float|int, limit: int|None = None):
             lsince = int( timestamp_to_timestamp(lsince))
-            return await self.exchange.fetch_ohlcv(symbol=key.pair,timeframe=key.timeframe,since=lsince)
+            return await self.exchange.fetch_ohlcv(symbol=key.pair,timeframe=key.timeframe,since=lsince,limit=limit)
+        if self.windowed_backfill:
+            recoder = self.cache.get_recoder(key=key)
+            until = dt_now().timestamp() * 1000 if recoder.is_empty else recoder.first_time
+            if since >= until:
+                return
+            await self._fetch_history_windows(
+                key, since, until, timeframe_to_msecs(key.timeframe), self._ohlcv_page_limit(key), fetch_data
+            )
+            return
         time_delta=timedelta(seconds= timeframe_to_seconds(key.timeframe)*self.data_internal_ratio)
         await self._fetch_history_data(
             key=key, since=since, batch=time_delta,
@@ -248,16 +562,13 @@ class Exchange[T](ExchangeABC[T]):
                 since,internal = self.since[key]
 
                 df = self.cache.get_recoder(key=key)
-                first_time =df.first_time
-                last_time =df.last_time
-              
-                current_first_time = df.first_time
                 pair, timeframe, marketType, datatype = key
-                if  since >= current_first_time:
+                # 缓存为空时没有 first_time / last_time，直接回补（窗口回补从当前时间开始）
+                if not df.is_empty and since >= df.first_time:
                     removelist.append(key)
                 since = clamp(interval=internal.total_seconds(),dt=since)
-                if not self._chekc_update_is_time(last_time.to_datetime_utc(),current_time,internal):
-                            continue
+                if not df.is_empty and not self._chekc_update_is_time(df.last_time.to_datetime_utc(),current_time,internal):
+                    continue
                 match datatype:
                     case "trades":
                         
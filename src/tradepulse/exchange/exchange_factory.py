@@ -1,4 +1,3 @@
-from collections.abc import MutableSequence, Sequence
 from datetime import timedelta
 from typing import TypeVar
 
@@ -6,6 +5,7 @@ import polars as pl
 
 from tradepulse.data import DataRecoder
 from tradepulse.data.cache_data import DataCache
+from tradepulse.data.dataframe_recoder import parse_time_index, time_slice
 
 from .exchange import DataKey, Exchange, MarketType
 from .protocol import ExchangeABC
@@ -15,36 +15,17 @@ T= TypeVar("T", bound=pl.DataFrame|list)
 
 class DataFrameExchange(Exchange[pl.DataFrame]) :
     
-    def _get_data(self,lazy_df: pl.LazyFrame,timekey:str, index: int|float|slice|tuple|list|None = None,limit=None) -> pl.DataFrame:
-        start = None
-        end =None
-        if isinstance(index, slice):
-        # 处理切片：假设start/end为时间戳
-            start,end = index.start ,index.stop
-        elif isinstance(index, (int,float)) :
-            start = index
-        elif isinstance(index, (tuple,Sequence,MutableSequence)) and len(index)>0:
-            start = index[0]
-            if len(index) >= 2:
-                end = index[1]
-                
-            
-        if start is not None:
-            lazy_df = lazy_df.filter(pl.col(timekey) >= start)
-        if end is not None:
-            lazy_df = lazy_df.filter(pl.col(timekey) <= end)
-        if limit is not None:
-            lazy_df = lazy_df.limit(limit)
-        df = lazy_df.collect()  # 一次性触发执行
-        return df
+    def _get_data(self,df: pl.DataFrame,timekey:str, index: int|float|slice|tuple|list|None = None,limit=None) -> pl.DataFrame:
+        start,end = parse_time_index(index)
+        return time_slice(df,timekey,start,end,limit)
     def trades(self, symbol: str, since:float|int,marketType: MarketType = "future",limit=None, params=None)->pl.DataFrame:
             key = DataKey(symbol,timeframe="", marketType=marketType,datatype= "trades")
        
             
-            datarecoder:DataRecoder[pl.DataFrame]  = self.cache.get_recoder(key=key)
-
-            if datarecoder and datarecoder.first_time <= since:
-                self._get_data(lazy_df=datarecoder.rawdata.lazy(),timekey="datetime",index=since,limit=limit)
+            # 只读取同一个版本，不会看到写入到一半的数据；查询不修改缓存，key 由回补任务创建
+            snapshot = self.cache.read(key)
+            if snapshot is not None and not snapshot.is_empty and snapshot.first_time <= since:
+                return self._get_data(df=snapshot.data,timekey=snapshot.timekey,index=since,limit=limit)
             
             self.set_since(key=key,since=since,internal = timedelta(minutes=1))
             return self.cache.empty()
@@ -60,11 +41,10 @@ class DataFrameExchange(Exchange[pl.DataFrame]) :
            
        
             # 先尝试从缓存获取数据
-            if key in self.cache:
-                datarecoder:DataRecoder[pl.DataFrame]  = self.cache.get_recoder(key=key)
-                if datarecoder and datarecoder.first_time < since:
-                    # 返回缓存数据
-                    self._get_data(lazy_df=datarecoder.rawdata.lazy(),timekey="datetime",index=since,limit=limit)
+            snapshot = self.cache.read(key)
+            if snapshot is not None and not snapshot.is_empty and snapshot.first_time <= since:
+                # 返回缓存数据
+                return self._get_data(df=snapshot.data,timekey=snapshot.timekey,index=since,limit=limit)
             self.set_since(key=key,since=since,internal=timeframe)
             return self.cache.empty()
             
@@ -81,15 +61,13 @@ class DataFrameExchange(Exchange[pl.DataFrame]) :
                 datatype="funding_rate"
             )
            
-        datarecoder:DataRecoder[pl.DataFrame]  = self.cache.get_recoder(key=key)
         # 先尝试从缓存获取数据
-        if key in self.cache:
-            
-            if datarecoder and datarecoder.first_time < since:
-                # 返回缓存数据
-                self._get_data(lazy_df=datarecoder.rawdata.lazy(),timekey="datetime",index=since,limit=limit)
-        else:
-            self.set_since(key=key,since=since,internal="")
+        snapshot = self.cache.read(key)
+        if snapshot is not None and not snapshot.is_empty and snapshot.first_time <= since:
+            # 返回缓存数据
+            return self._get_data(df=snapshot.data,timekey=snapshot.timekey,index=since,limit=limit)
+        # 资金费率每 8 小时结算一次
+        self.set_since(key=key,since=since,internal=timedelta(hours=8))
         return self.cache.empty() 
             
     def tickers(self, symbol:str, since:float|int,marketType: MarketType = "future",limit=None,  params=None)->pl.DataFrame:...
@@ -0,0 +1,82 @@
+import asyncio
+import heapq
+import itertools
+import weakref
+
+
+class RateLimiter:
+    """
+    带优先级的令牌桶，每 rate_limit 毫秒生成一个令牌，最多累积 burst 个
+    等待中的请求按 priority 从小到大获得令牌，priority 相同时先到先得
+    """
+    _shared: weakref.WeakKeyDictionary[object, "RateLimiter"] = weakref.WeakKeyDictionary()
+
+    def __init__(self, rate_limit: float, burst: int = 1):
+        self.interval = rate_limit / 1000
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated: float | None = None
+        # 暂停到该时间（事件循环时间）之前不发放令牌
+        self.paused_until = 0.0
+        self.waiters: list[tuple[float, int, asyncio.Future]] = []
+        self.counter = itertools.count()
+        self.dispatcher: asyncio.Task | None = None
+
+    @classmethod
+    def shared(cls, owner: object, rate_limit: float, burst: int = 1) -> "RateLimiter":
+        """同一个 owner（ccxt 实例）共用一个限速器"""
+        limiter = cls._shared.get(owner)
+        if limiter is None:
+            limiter = cls(rate_limit, burst)
+            cls._shared[owner] = limiter
+        return limiter
+
+    @property
+    def pending(self) -> int:
+        return len(self.waiters)
+
+    def _refill(self, now: float):
+        if self.updated is None or self.interval <= 0:
+            self.tokens = float(self.burst)
+        else:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+
+    async def acquire(self, priority: float = 0) -> None:
+        """等待并消耗一个令牌"""
+        loop = asyncio.get_running_loop()
+        if self.dispatcher is not None and self.dispatcher.get_loop() is not loop:
+            # 换了事件循环，旧循环的等待者已经无效
+            self.waiters.clear()
+            self.dispatcher = None
+        future = loop.create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    def pause(self, seconds: float) -> None:
+        """收到 429 等限速错误时暂停发放令牌"""
+        loop = asyncio.get_running_loop()
+        self.paused_until = max(self.paused_until, loop.time() + seconds)
+        # 暂停结束后重新开始累积令牌
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self.waiters:
+            now = loop.time()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill(now)
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) * self.interval)
+                continue
+            _, _, future = heapq.heappop(self.waiters)
+            # 已取消的等待者不消耗令牌
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
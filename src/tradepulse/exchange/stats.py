@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class LatencyStats:
+    """单个 DataKey 的 watch_* 调用耗时统计（秒）"""
+    count: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    last: float = 0.0
+    total: float = 0.0
+    max: float = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.last = seconds
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass
+class UpdaterStats:
+    """ExchangeUpdater 的运行统计，lag 为实时数据从入队到写入缓存的时间（秒）"""
+    appended: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    total_lag: float = 0.0
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def record_lag(self, seconds: float):
+        self.appended += 1
+        self.last_lag = seconds
+        self.total_lag += seconds
+        self.max_lag = max(self.max_lag, seconds)
+
+    def record_error(self, name: str):
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    @property
+    def mean_lag(self) -> float:
+        return self.total_lag / self.appended if self.appended else 0.0
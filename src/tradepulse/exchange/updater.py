@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from tradepulse.util import dt_now
+
+from .exchange import Exchange
+from .stats import UpdaterStats
+
+logger = logging.getLogger(__name__)
+
+
+class ExchangeUpdater:
+    """
+    后台更新服务，代替循环调用 Exchange.update()
+    实时数据、写入缓存、历史回补、清理各自在独立的任务中运行，一个出错或变慢不会拖住其他任务
+    实时数据经有界队列写入缓存，队列满时 watch 暂停（背压），历史回补不会占用实时数据的队列
+    缓存按保留策略每 retention_interval 秒裁剪一次，读取到已淘汰的数据时立即读回
+    """
+    def __init__(self, exchange: Exchange, queue_size: int = 1024, history_interval: float = 1.0,
+                 housekeeping_interval: float = 1.0, idle_interval: float = 0.1, retention_interval: float = 60.0,
+                 max_idle_interval: float = 5.0):
+        self.exchange = exchange
+        self.queue_size = queue_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.history_interval = history_interval
+        self.housekeeping_interval = housekeeping_interval
+        # 没有需要更新的 key 或所有 key 都出错时实时任务的等待时间，连续出现时加倍，最多 max_idle_interval
+        self.idle_interval = idle_interval
+        self.max_idle_interval = max_idle_interval
+        self.live_backoff = idle_interval
+        self.retention_interval = retention_interval
+        self.stats = UpdaterStats()
+        self.tasks: list[asyncio.Task] = []
+        # 缓存读取到已淘汰的数据时设置，由 reload 任务读回
+        self.reload_wanted = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self.tasks)
+
+    def start(self):
+        if self.running:
+            return
+        self.exchange.live_queue = self.queue
+        # 读取可能在其他线程中进行
+        loop = asyncio.get_running_loop()
+        self.exchange.cache.on_spilled_read = lambda: loop.call_soon_threadsafe(self.reload_wanted.set)
+        self.tasks = [
+            asyncio.create_task(self._loop("live", self._live, 0)),
+            asyncio.create_task(self._append()),
+            asyncio.create_task(self._loop("history", lambda: self.exchange._update_history_data(dt_now()), self.history_interval)),
+            asyncio.create_task(self._loop("housekeeping", self.exchange._check_and_unwatch_data, self.housekeeping_interval)),
+            asyncio.create_task(self._loop("retention", self.exchange.cache.housekeeping, self.retention_interval)),
+            asyncio.create_task(self._loop("reload", self._reload, 0)),
+        ]
+
+    async def stop(self):
+        """停止所有任务，队列中剩余的数据写入缓存"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.exchange.live_queue = None
+        self.exchange.cache.on_spilled_read = None
+        while not self.queue.empty():
+            self._apply(*self.queue.get_nowait())
+
+    async def run(self):
+        """启动并一直运行，直到被取消"""
+        self.start()
+        try:
+            await asyncio.gather(*self.tasks)
+        finally:
+            await self.stop()
+
+    async def _live(self):
+        if await self.exchange._update_newest_data():
+            self.live_backoff = self.idle_interval
+            return
+        await asyncio.sleep(self.live_backoff)
+        self.live_backoff = min(self.live_backoff * 2, self.max_idle_interval)
+
+    async def _reload(self):
+        await self.reload_wanted.wait()
+        self.reload_wanted.clear()
+        self.exchange.cache.reload_reads()
+
+    async def _loop(self, name: str, func: Callable[[], Awaitable], interval: float):
+        while True:
+            try:
+                await func()
+            except Exception as e:
+                self.stats.record_error(name)
+                logger.error(f"{name} update error: {e}")
+            await asyncio.sleep(interval)
+
+    def _apply(self, key, data, enqueued: float):
+        self.exchange._append_newest(key, data)
+        self.stats.record_lag(time.perf_counter() - enqueued)
+
+    async def _append(self):
+        while True:
+            key, data, enqueued = await self.queue.get()
+            self._apply(key, data, enqueued)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue_size,
+            "appended": self.stats.appended,
+            "lag_last": self.stats.last_lag,
+            "lag_mean": self.stats.mean_lag,
+            "lag_max": self.stats.max_lag,
+            "errors": dict(self.stats.errors),
+            "reclaimed_bytes": self.exchange.cache.reclaimed_bytes,
+        }
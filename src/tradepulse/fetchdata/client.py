@@ -1,5 +1,6 @@
-import asyncio
+import itertools
 import logging
+from collections.abc import AsyncIterator
 
 import polars as pl
 from communication import CommunicationProtocol
@@ -7,40 +8,80 @@ from communication.zeromq.factory import Factory
 from google.protobuf.json_format import ParseDict
 
 from tradepulse.data import cache_data
-from tradepulse.data.serialize import deserialize_dataframe
+from tradepulse.data.protocol import DataKey
+from tradepulse.data.serialize import Compression, deserialize_batches, deserialize_dataframe_frames
 from tradepulse.exchange import ExchangeABC
 from tradepulse.message.google.protobuf.struct_pb2 import Struct
-from tradepulse.message.methodid_pb2 import InvokeMethod, MethodID
+from tradepulse.message.methodid_pb2 import InvokeMethod, MethodID, Reply
 
 # from exceptions import *  
-from tradepulse.typenums import MarketType, TimeFrame
-
-from .method_invoke import create_invoke_method
+from tradepulse.typenums import DataType, MarketType, TimeFrame
+
+from .method_invoke import (
+    compression_to_id,
+    create_batch_invoke_method,
+    create_history_invoke_method,
+    create_invoke_method,
+    create_ohlcv_invoke_method,
+    create_trades_invoke_method,
+)
+from .pool import RequestPool
 
 logger = logging.getLogger(__name__)
 
 
+def _epoch_ms(df: pl.DataFrame) -> pl.Expr:
+    """第一列为时间列，统一为毫秒时间戳表达式"""
+    col = pl.col(df.columns[0])
+    return col.dt.epoch("ms") if df.schema[df.columns[0]].is_temporal() else col
 
 
 class Client(ExchangeABC[pl.DataFrame]):
     @staticmethod
     def serailize(object: InvokeMethod) -> bytes:
         return object.SerializeToString()
-    
+    @staticmethod
+    def deserialize(data: bytes) -> Reply:
+        return Reply.FromString(data)
         
-    def __init__(self, address: str = "localhost:6102",protocol: CommunicationProtocol = "inproc"):
-        self.request = Factory.create_Resquest(protocol=protocol, address=address)
-        self.lock = asyncio.Lock()
-        self.last_trades_sendtime = {}
-        self.last_ohlcv_sendtime = {}
+    def __init__(self, address: str = "localhost:6102",protocol: CommunicationProtocol = "inproc",
+                 accept_compression: tuple[Compression, ...] | None = None, incremental: bool = True, pool_size: int = 1):
+        # pool_size 个 REQ socket，最多 pool_size 个请求同时在途，回复按 request_id 校验
+        self.request = RequestPool(lambda: Factory.create_Resquest(protocol=protocol, address=address), size=pool_size)
+        # 可以接受的压缩方式，按优先顺序；inproc 不经过网络，默认不压缩
+        if accept_compression is None:
+            accept_compression = () if protocol == "inproc" else ("lz4", "zstd")
+        self.accept_compression = [compression_to_id(c) for c in accept_compression if c != "uncompressed"]
+        self.request_ids = itertools.count(1)
+        # 增量请求：按 DataKey 缓存 (覆盖的起始时间, 已收到的数据) 和最后一条的时间戳(ms)，之后只请求该时间之后的数据
+        self.incremental = incremental
+        self.data_cache: dict[DataKey, tuple[int, pl.DataFrame]] = {}
+        self.last_trades_sendtime: dict[DataKey, int] = {}
+        self.last_ohlcv_sendtime: dict[DataKey, int] = {}
         self.last_orderbook_sendtime = {}
         self.symbols_cache = None
         self.active_symbols_cache = None
 
-    async def  send(self, method: MethodID, params: dict) -> bytes:
+    @staticmethod
+    def to_dataframe(reply: Reply) -> pl.DataFrame:
+        if not reply.data:
+            return pl.DataFrame()
+        return deserialize_dataframe_frames(reply.header, reply.data)
+
+    async def  send(self, method: MethodID, params: dict) -> Reply:
         """Send a request with MethodID and parameters"""
-        invoke = create_invoke_method(method, params)
-        return await self.request.send(invoke, serializer=Client.serailize)
+        return await self.send_invoke(create_invoke_method(method, params))
+
+    async def send_invoke(self, invoke: InvokeMethod) -> Reply:
+        """Send a prepared InvokeMethod, return the reply"""
+        request_id = next(self.request_ids)
+        invoke.request_id = request_id
+        invoke.accept_compression[:] = self.accept_compression
+        response = await self.request.send(invoke, serializer=Client.serailize)
+        reply = Client.deserialize(response)
+        if reply.request_id != request_id:
+            raise ValueError(f"reply {reply.request_id} does not match request {request_id}")
+        return reply
        
   
     
@@ -53,26 +94,109 @@ class Client(ExchangeABC[pl.DataFrame]):
     async def _trades(self, symbol: str, since:float|int,marketType: MarketType = "future",  limit=None, params=None)->pl.DataFrame:
      
         """Get trades data"""
-        _params:dict = {
-            "symbol": symbol,
-        }
-        if since > 0:
-            _params["since"] = since
-        if params is not None:
-            _params.update(params)
-        response = await self.send(MethodID.TRADES, _params)
-        return deserialize_dataframe(response)
+        key = DataKey(symbol, "", marketType, "trades")
+        return await self._incremental(key, since, limit, self.last_trades_sendtime,
+            lambda since: create_trades_invoke_method(symbol, since=max(since, 0), limit=limit, market_type=marketType))
     async def _ohlcv(self, symbol: str,timeframe: str, since:float|int,marketType: MarketType = "future",limit=None,  params=None)->pl.DataFrame:
         """Get OHLCV data"""
-        _params: dict = {
-            "symbol": symbol,
-            "timeframe": timeframe,
-        }
-        if since>0:
-            _params["since"] = since
-        
-        response = await self.send(MethodID.OHLCV, _params)
-        return deserialize_dataframe(response)
+        key = DataKey(symbol, timeframe, marketType, "ohlcv")
+        return await self._incremental(key, since, limit, self.last_ohlcv_sendtime,
+            lambda since: create_ohlcv_invoke_method(symbol, timeframe, since=max(since, 0), limit=limit, market_type=marketType))
+
+    async def _incremental(self, key: DataKey, since: float | int, limit, last_sendtime: dict[DataKey, int], create) -> pl.DataFrame:
+        """
+        缓存覆盖 since 时只请求最后一条时间戳之后（含）的数据，再与缓存合并
+        最后一个时间戳的数据会被重新请求并替换：K 线可能尚未收盘，同一毫秒的成交可能还没收全
+        指定 limit 时结果不完整，不使用也不更新缓存
+        """
+        since = int(since)
+        if not self.incremental or limit is not None:
+            return Client.to_dataframe(await self.send_invoke(create(since)))
+        cached_since, cached = self.data_cache.get(key, (since, None))
+        if cached is None or key not in last_sendtime or cached_since > since:
+            df = Client.to_dataframe(await self.send_invoke(create(since)))
+        else:
+            delta = Client.to_dataframe(await self.send_invoke(create(max(since, last_sendtime[key]))))
+            if delta.is_empty():
+                df = cached
+            else:
+                time_col = cached.columns[0]
+                df = pl.concat([cached.filter(pl.col(time_col) < delta[0, time_col]), delta], how="vertical_relaxed")
+        if df.is_empty():
+            return df
+        # 只保留 since 之后的数据，缓存大小跟随调用方的窗口
+        df = df.filter(_epoch_ms(df) >= since)
+        if not df.is_empty():
+            self.data_cache[key] = (since, df)
+            last_sendtime[key] = df.select(_epoch_ms(df).last()).item()
+        return df
+
+    def clear_cache(self, datatype: DataType | None = None):
+        """清除增量缓存，datatype 为空时全部清除"""
+        for key in [k for k in self.data_cache if datatype is None or k.datatype == datatype]:
+            del self.data_cache[key]
+            self.last_ohlcv_sendtime.pop(key, None)
+            self.last_trades_sendtime.pop(key, None)
+
+    async def batch_ohlcv(self, keys: list[tuple], marketType: MarketType = "future") -> dict[tuple[str, str], pl.DataFrame]:
+        """
+        一次请求获取多个 symbol 的 OHLCV
+        keys: (symbol, timeframe, since[, limit]) 列表
+        返回以 (symbol, timeframe) 为键的 DataFrame 字典
+        """
+        if not keys:
+            return {}
+        invoke = create_batch_invoke_method(MethodID.BATCH_OHLCV, keys, market_type=marketType)
+        reply = await self.send_invoke(invoke)
+        dfs = deserialize_batches(reply.data) if reply.data else []
+        return {(key[0], key[1]): df for key, df in zip(keys, dfs)}
+
+    async def batch_trades(self, keys: list[tuple], marketType: MarketType = "future") -> dict[str, pl.DataFrame]:
+        """
+        一次请求获取多个 symbol 的 trades
+        keys: (symbol, since[, limit]) 列表
+        返回以 symbol 为键的 DataFrame 字典
+        """
+        if not keys:
+            return {}
+        invoke = create_batch_invoke_method(MethodID.BATCH_TRADES, [(key[0], "", *key[1:]) for key in keys], market_type=marketType)
+        reply = await self.send_invoke(invoke)
+        dfs = deserialize_batches(reply.data) if reply.data else []
+        return {key[0]: df for key, df in zip(keys, dfs)}
+
+    async def _history(self, method: MethodID, symbol: str, timeframe: str, since: float | int, until: float | int, marketType: MarketType, chunk_rows: int) -> AsyncIterator[pl.DataFrame]:
+        # 按时间游标分块：since 推进到上一块最后的时间戳，offset 为该时间戳上已经收到的行数
+        offset = 0
+        while True:
+            invoke = create_history_invoke_method(method, symbol, timeframe, since=since, until=until, market_type=marketType, chunk_rows=chunk_rows, offset=offset)
+            reply = await self.send_invoke(invoke)
+            df = Client.to_dataframe(reply)
+            if df.height > 0:
+                yield df
+            if not reply.has_more or df.height == 0:
+                break
+            times = df.select(_epoch_ms(df)).to_series()
+            last = times[-1]
+            count = (times == last).sum()
+            if last == since:
+                offset += count
+            else:
+                since, offset = last, count
+
+    def history_ohlcv(self, symbol: str, timeframe: str, since: float | int, until: float | int = 0, marketType: MarketType = "future", chunk_rows: int = 0) -> AsyncIterator[pl.DataFrame]:
+        """
+        分块获取历史 OHLCV，每块最多 chunk_rows 行（0 使用服务端默认值）
+        async for df in client.history_ohlcv(...)
+        """
+        return self._history(MethodID.HISTORY_OHLCV, symbol, timeframe, since, until, marketType, chunk_rows)
+
+    def history_trades(self, symbol: str, since: float | int, until: float | int = 0, marketType: MarketType = "future", chunk_rows: int = 0) -> AsyncIterator[pl.DataFrame]:
+        """
+        分块获取历史 trades，每块最多 chunk_rows 行（0 使用服务端默认值）
+        async for df in client.history_trades(...)
+        """
+        return self._history(MethodID.HISTORY_TRADES, symbol, "", since, until, marketType, chunk_rows)
+
     async def _tickers(self, symbol:str, since:float|int,marketType: MarketType = "future",limit=None,  params=None)->pl.DataFrame:...
 
 
@@ -1,25 +1,44 @@
+import polars as pl
 
+from tradepulse.data import cache_data
+from tradepulse.exchange import ExchangeABC, ExchangeFactory
 
-from tradepulse.exchange import ExchangeABC
-from .client import Client
-from .server import Server
-import asyncio
+# from exceptions import *
+from tradepulse.typenums import MarketType, TimeFrame
 
-import polars as pl
-from communication.zeromq.factory import Factory
 
-from tradepulse.message.methodid_pb2 import InvokeMethod, MethodID
+class InProc(ExchangeABC[pl.DataFrame]):
+    """
+    同进程内直接调用服务端的 DataFrameExchange，不经过 protobuf、Arrow IPC 和 socket
+    返回的 DataFrame 与缓存共享内存，调用方不要原地修改
+    """
+    def __init__(self, exchange: ExchangeABC[pl.DataFrame] | None = None, config: dict = {}):
+        self.exchange = ExchangeFactory.get_exchange(config=config) if exchange is None else exchange
 
+    async def un_watch_trades(self, pair: str, until: float | int = 0, marketType: MarketType = "future") -> None:
+        await self.exchange.un_watch_trades(pair, until=until, marketType=marketType)
 
-# from exceptions import *  
-from tradepulse.typenums import MarketType,TimeFrame
-from communication import CommunicationProtocol
-from tradepulse.data.serialize import deserialize_dataframe
-from .method_invoke import create_invoke_method
+    async def un_watch_ohlcv(self, pair: str, timeframe: TimeFrame, until: float | int = 0, marketType: MarketType = "future") -> None:
+        await self.exchange.un_watch_ohlcv(pair, timeframe, until=until, marketType=marketType)
 
-class InProc(ExchangeABC[pl.DataFrame]):
-    def __init__(self, address: str = "localhost:6102"):
-        self.server = Server(address)
-        self.client = Client(address)
+    async def update(self) -> None:
+        await self.exchange.update()
+
+    def ohlcv(self, symbol: str, timeframe: str, since: float | int, marketType: MarketType = "future", limit=None, params=None) -> pl.DataFrame:
+        return self.exchange.ohlcv(symbol, timeframe, since, marketType=marketType, limit=limit, params=params)
+
+    def trades(self, symbol: str, since: float | int, marketType: MarketType = "future", limit=None, params=None) -> pl.DataFrame:
+        return self.exchange.trades(symbol, since, marketType=marketType, limit=limit, params=params)
+
+    def tickers(self, symbol: str, since: float | int, marketType: MarketType = "future", limit=None, params=None) -> pl.DataFrame:
+        return self.exchange.tickers(symbol, since, marketType=marketType, limit=limit, params=params)
+
+    def funding_rate(self, symbol: str, since: float | int, limit=None, params={}) -> pl.DataFrame:
+        return self.exchange.funding_rate(symbol, since, limit=limit, params=params)
+
+    def funding_rate_history(self, symbol: str, since: float | int, limit=None, params={}) -> pl.DataFrame:
+        return self.exchange.funding_rate_history(symbol, since, limit=limit, params=params)
 
- 
+    @property
+    def cache(self) -> cache_data.DataCache[pl.DataFrame]:
+        return self.exchange.cache
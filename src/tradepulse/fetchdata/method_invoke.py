@@ -1,23 +1,144 @@
 
 
+import asyncio
+import inspect
 import logging
+from typing import NamedTuple
+
+import polars as pl
 
 from google.protobuf.json_format import ParseDict
 
 from tradepulse.message.google.protobuf.struct_pb2 import Struct
-from tradepulse.message.methodid_pb2 import InvokeMethod, MethodID
+from tradepulse.message.methodid_pb2 import (
+    BatchKey,
+    BatchRequest,
+    CompressionID,
+    HistoryRequest,
+    InvokeMethod,
+    MarketTypeID,
+    MethodID,
+    OhlcvRequest,
+    TradesRequest,
+)
+from tradepulse.data import TimeRange
+from tradepulse.data.serialize import Compression
+from tradepulse.data.history.datahandlers import IDataHandler
 from tradepulse.exchange import ExchangeABC 
 
 
 # from exceptions import *  
-from tradepulse.typenums import MarketType
+from tradepulse.typenums import CandleType, MarketType, TradingMode
 
 from typing import cast
 from tradepulse.message.google.protobuf.struct_pb2 import Struct
-  
-async def invoke_method(invoke_method: InvokeMethod,ex:ExchangeABC)  :
+
+# HistoryRequest 未指定 chunk_rows 时每块的行数
+DEFAULT_CHUNK_ROWS = 100_000
+
+class HistoryChunk(NamedTuple):
+    data: pl.DataFrame
+    has_more: bool
+
+async def _resolve(result):
+    # ExchangeABC 的实现既可能是同步也可能是异步
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+def market_type_to_id(market_type: MarketType) -> MarketTypeID:
+    return MarketTypeID.Value(market_type.upper())
+
+def market_type_from_id(market_type: MarketTypeID) -> MarketType:
+    # 未设置时与 ExchangeABC 的默认值一致
+    if market_type == MarketTypeID.MARKET_UNDEFINED:
+        return "future"
+    return cast(MarketType, MarketTypeID.Name(market_type).lower())
+
+def compression_to_id(compression: Compression) -> CompressionID:
+    if compression == "uncompressed":
+        return CompressionID.COMPRESSION_NONE
+    return CompressionID.Value(f"COMPRESSION_{compression.upper()}")
+
+def compression_from_id(compression: CompressionID) -> Compression:
+    if compression == CompressionID.COMPRESSION_NONE:
+        return "uncompressed"
+    return cast(Compression, CompressionID.Name(compression).removeprefix("COMPRESSION_").lower())
+
+async def _invoke_batch(method: MethodID, batch: BatchRequest, ex: ExchangeABC) -> list:
+    """并发执行批量请求，结果顺序与 batch.keys 一致"""
+    marktype = market_type_from_id(batch.market_type)
+    calls = []
+    for key in batch.keys:
+        limit = key.limit if key.limit > 0 else None
+        if method == MethodID.BATCH_OHLCV:
+            calls.append(_resolve(ex.ohlcv(symbol=key.symbol,timeframe=key.timeframe,marketType=marktype,since=key.since,limit=limit)))
+        else:
+            calls.append(_resolve(ex.trades(symbol=key.symbol,since=key.since,marketType=marktype,limit=limit)))
+    return list(await asyncio.gather(*calls))
+
+def _history_from_datahandler(method: MethodID, req: HistoryRequest, datahandler: IDataHandler) -> pl.LazyFrame:
+    """从本地 parquet 惰性读取，时间范围下推到读取器，只读取请求的部分"""
+    marktype = market_type_from_id(req.market_type)
+    timerange = TimeRange(
+        starttype="date" if req.since > 0 else None,
+        stoptype="date" if req.until > 0 else None,
+        startts=req.since,
+        stopts=req.until,
+    )
+    match method:
+        case MethodID.HISTORY_OHLCV:
+            candle_type = CandleType.SPOT if marktype in ("spot", "margin") else CandleType.FUTURES
+            return datahandler._ohlcv_scan(req.symbol, req.timeframe, timerange, candle_type)
+        case MethodID.HISTORY_TRADES:
+            trading_mode = TradingMode.SPOT if marktype == "spot" else TradingMode.MARGIN if marktype == "margin" else TradingMode.FUTURES
+            return datahandler._trades_scan(req.symbol, trading_mode, timerange)
+        case _:
+            # HISTORY_TICKERS / HISTORY_ORDERBOOK 尚无本地存储
+            return pl.LazyFrame()
+
+async def _history_source(method: MethodID, req: HistoryRequest, ex: ExchangeABC, datahandler: IDataHandler | None = None) -> pl.LazyFrame:
+    """历史数据的惰性查询，按 [since, until] 过滤"""
+    if datahandler is not None:
+        return _history_from_datahandler(method, req, datahandler)
+    marktype = market_type_from_id(req.market_type)
+    match method:
+        case MethodID.HISTORY_OHLCV:
+            df = await _resolve(ex.ohlcv(symbol=req.symbol,timeframe=req.timeframe,marketType=marktype,since=req.since))
+        case MethodID.HISTORY_TRADES:
+            df = await _resolve(ex.trades(symbol=req.symbol,marketType=marktype,since=req.since))
+        case _:
+            return pl.LazyFrame()
+    lazy_df = df.lazy()
+    if req.until > 0 and df.width > 0:
+        lazy_df = lazy_df.filter(pl.col(df.columns[0]) <= req.until)
+    return lazy_df
+
+async def _invoke_history(method: MethodID, req: HistoryRequest, ex: ExchangeABC, datahandler: IDataHandler | None = None) -> HistoryChunk:
+    """
+    取出从 since 开始的一块数据，跳过 since 时间戳上已经返回的 offset 行，多取一行用来判断是否还有后续
+    since 下推到数据源，每块只读取 since 之后的数据，保留策略删除更早的数据也不影响后续分块
+    """
+    chunk_rows = req.chunk_rows or DEFAULT_CHUNK_ROWS
+    lazy_df = await _history_source(method, req, ex, datahandler)
+    df = lazy_df.slice(req.offset, chunk_rows + 1).collect()
+    return HistoryChunk(data=df.head(chunk_rows), has_more=df.height > chunk_rows)
+
+async def invoke_method(invoke_method: InvokeMethod,ex:ExchangeABC,datahandler:IDataHandler|None=None)  :
     
     method,params = invoke_method.method_id,invoke_method.params
+    match invoke_method.WhichOneof("request"):
+        case "batch":
+            return await _invoke_batch(method, invoke_method.batch, ex)
+        case "ohlcv":
+            req = invoke_method.ohlcv
+            return await _resolve(ex.ohlcv(symbol=req.symbol,timeframe=req.timeframe,marketType=market_type_from_id(req.market_type),since=req.since,limit=req.limit or None))
+        case "trades":
+            req = invoke_method.trades
+            return await _resolve(ex.trades(symbol=req.symbol,marketType=market_type_from_id(req.market_type),since=req.since,limit=req.limit or None))
+        case "history":
+            return await _invoke_history(method, invoke_method.history, ex, datahandler)
+    # 通用 Struct 参数
     para = params.fields
     symbol = para["symbol"].string_value
     marktype = cast(MarketType, para["marktype"].string_value)
@@ -26,22 +147,43 @@ async def invoke_method(invoke_method: InvokeMethod,ex:ExchangeABC)  :
     match method:
         case MethodID.OHLCV:
             timeframe = para["timeframe"].string_value
-            return await ex.ohlcv(symbol=symbol,timeframe=timeframe,marketType=marktype,since=since)
+            return await _resolve(ex.ohlcv(symbol=symbol,timeframe=timeframe,marketType=marktype,since=since))
         # case method_enum.orderbook:
         #     return ex.orderbook
         # case MethodID.TICKERS:
         #     return ex.tickers
         case MethodID.TRADES:
-             return await ex.trades(symbol=symbol,since=since,marketType=marktype) 
+             return await _resolve(ex.trades(symbol=symbol,since=since,marketType=marktype))
         case _:
             return None
 
 
 
 
-def create_invoke_method( method_id: MethodID, params: dict) -> InvokeMethod:
+def create_invoke_method( method_id: MethodID, params: dict,request_id:int=0) -> InvokeMethod:
           # Convert dict to protobuf Struct
         struct = Struct()
         ParseDict(js_dict=params, message=struct)
-        invoke = InvokeMethod(method_id=method_id, params=struct)   # type: ignore
-        return invoke
\ No newline at end of file
+        invoke = InvokeMethod(method_id=method_id, params=struct,request_id=request_id)   # type: ignore
+        return invoke
+
+def create_batch_invoke_method(method_id: MethodID, keys: list[tuple], market_type: MarketType = "future", request_id: int = 0) -> InvokeMethod:
+    """keys 为 (symbol, timeframe, since[, limit]) 元组列表"""
+    batch = BatchRequest(market_type=market_type_to_id(market_type))
+    for key in keys:
+        symbol, timeframe, since, *rest = key
+        limit = rest[0] if rest and rest[0] is not None else 0
+        batch.keys.append(BatchKey(symbol=symbol, timeframe=timeframe, since=int(since), limit=limit))
+    return InvokeMethod(method_id=method_id, batch=batch, request_id=request_id)
+
+def create_ohlcv_invoke_method(symbol: str, timeframe: str, since: float | int = 0, limit: int | None = None, market_type: MarketType = "future", request_id: int = 0) -> InvokeMethod:
+    request = OhlcvRequest(symbol=symbol, timeframe=timeframe, since=int(since), limit=limit or 0, market_type=market_type_to_id(market_type))
+    return InvokeMethod(method_id=MethodID.OHLCV, ohlcv=request, request_id=request_id)
+
+def create_trades_invoke_method(symbol: str, since: float | int = 0, limit: int | None = None, market_type: MarketType = "future", request_id: int = 0) -> InvokeMethod:
+    request = TradesRequest(symbol=symbol, since=int(since), limit=limit or 0, market_type=market_type_to_id(market_type))
+    return InvokeMethod(method_id=MethodID.TRADES, trades=request, request_id=request_id)
+
+def create_history_invoke_method(method_id: MethodID, symbol: str, timeframe: str = "", since: float | int = 0, until: float | int = 0, market_type: MarketType = "future", chunk_rows: int = 0, offset: int = 0, request_id: int = 0) -> InvokeMethod:
+    request = HistoryRequest(symbol=symbol, timeframe=timeframe, since=int(since), until=int(until), market_type=market_type_to_id(market_type), chunk_rows=chunk_rows, offset=offset)
+    return InvokeMethod(method_id=method_id, history=request, request_id=request_id)
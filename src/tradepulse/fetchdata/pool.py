@@ -0,0 +1,71 @@
+import asyncio
+import inspect
+import logging
+from collections.abc import Callable
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Request(Protocol):
+    async def start(self): ...
+    async def send(self, message, serializer) -> Any: ...
+
+
+class RequestPool:
+    """
+    多个 REQ socket 组成的连接池，接口与单个 Request 相同
+    每个 socket 同一时间只有一个请求，多个协程的请求分散到空闲的 socket 上并发执行
+    """
+    def __init__(self, factory: Callable[[], Request], size: int = 1):
+        if size < 1:
+            raise ValueError(f"pool size must be >= 1, got {size}")
+        self.factory = factory
+        self.sockets: list[Request] = [factory() for _ in range(size)]
+        self.idle: asyncio.Queue[Request] = asyncio.Queue()
+        for socket in self.sockets:
+            self.idle.put_nowait(socket)
+        self.started = False
+        self.replacing: set[asyncio.Task] = set()
+
+    @property
+    def size(self) -> int:
+        return len(self.sockets)
+
+    async def start(self):
+        await asyncio.gather(*(socket.start() for socket in self.sockets))
+        self.started = True
+
+    @staticmethod
+    async def _close(socket: Request):
+        """关闭被替换的 socket，释放底层连接；socket 提供 stop 或 close 时调用"""
+        close = getattr(socket, "stop", None) or getattr(socket, "close", None)
+        if close is None:
+            return
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"close request socket error: {e}")
+
+    async def _replace(self, socket: Request):
+        await self._close(socket)
+        fresh = self.factory()
+        self.sockets[self.sockets.index(socket)] = fresh
+        if self.started:
+            await fresh.start()
+        self.idle.put_nowait(fresh)
+
+    async def send(self, message, serializer):
+        socket = await self.idle.get()
+        try:
+            result = await socket.send(message, serializer=serializer)
+        except BaseException:
+            # 请求中途被取消或出错时 REQ socket 处于等待回复的状态，不能再发送，换一个新的
+            task = asyncio.create_task(self._replace(socket))
+            self.replacing.add(task)
+            task.add_done_callback(self.replacing.discard)
+            raise
+        self.idle.put_nowait(socket)
+        return result
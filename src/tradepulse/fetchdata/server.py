@@ -1,43 +1,93 @@
+import logging
+from pathlib import Path
 
+from communication.zeromq.factory import Factory
 
+from tradepulse.data.history.datahandlers import get_datahandler
+from tradepulse.exchange import ExchangeABC
+from tradepulse.exchange.exchange_factory import ExchangeFactory
 
+import polars as pl
 
-from communication.zeromq.factory import Factory
+from tradepulse.message.methodid_pb2 import InvokeMethod, Reply
+from .method_invoke import HistoryChunk, compression_from_id, compression_to_id, invoke_method
+from tradepulse.data.serialize import Compression, serialize_batches_frames, serialize_dataframe_frames
 
-from tradepulse.exchange.exchange_factory import ExchangeFactory
+logger = logging.getLogger(__name__)
 
-from tradepulse.message.methodid_pb2 import InvokeMethod
-from .method_invoke import invoke_method
-from tradepulse.data.serialize import serialize_dataframe
+# 小于该大小的回复不压缩，压缩收益抵不过编解码开销
+COMPRESS_MIN_BYTES = 64 * 1024
+# 大于该大小时优先 zstd（压缩率高），否则优先 lz4（速度快）
+ZSTD_MIN_BYTES = 4 * 1024 * 1024
 
 
+def choose_compression(size: int, accepted: list[Compression]) -> Compression:
+    """根据数据大小在客户端接受的压缩方式中选择一种"""
+    if size < COMPRESS_MIN_BYTES or not accepted:
+        return "uncompressed"
+    preferred: Compression = "zstd" if size >= ZSTD_MIN_BYTES else "lz4"
+    if preferred in accepted:
+        return preferred
+    return accepted[0]
 
+def _estimated_size(response: pl.DataFrame | list[pl.DataFrame]) -> int:
+    if isinstance(response, list):
+        return sum(df.estimated_size() for df in response)
+    return response.estimated_size()
 
 
 class Server():
-    def __init__(self,address:str = "localhost:6102",config:dict={}):
-        
+    def __init__(self,address:str = "localhost:6102",config:dict={},max_inflight:int=1,exchange:ExchangeABC|None=None):
+
         self.server = Factory.create_Responder(protocol="inproc",address=address)
-        self.exchange = ExchangeFactory.get_exchange(config=config)
+        self.exchange = ExchangeFactory.get_exchange(config=config) if exchange is None else exchange
+        # 配置了 datadir 时 HISTORY_* 请求从本地 parquet 读取
+        self.datahandler = get_datahandler(Path(config["datadir"]), "parquet") if "datadir" in config else None
+        # 同时处理中的请求上限；Factory.create_Responder 是 REP 模式，必须收一个回一个，只能为 1
+        if max_inflight != 1:
+            raise ValueError(f"max_inflight={max_inflight} needs a ROUTER responder, the REP responder only supports 1")
+        self.max_inflight = max_inflight
 
     async def start(self):
         await self.server.start()
     @staticmethod
     def deserialize(data:bytes)-> InvokeMethod:
         return InvokeMethod.FromString(data)
- 
+    @staticmethod
+    def serialize(reply:Reply)-> bytes:
+        return reply.SerializeToString()
+
+    async def handle(self,invokemsg:InvokeMethod):
+        """执行一个请求并把结果按 request_id 写回请求方"""
+        try:
+            response = await invoke_method(invoke_method=invokemsg,ex=self.exchange,datahandler=self.datahandler)
+            has_more = False
+            if isinstance(response, HistoryChunk):
+                response, has_more = response
+            compression: Compression = "uncompressed"
+            if response is None:
+                header, data = b"", b""
+            else:
+                accepted = [compression_from_id(c) for c in invokemsg.accept_compression]
+                compression = choose_compression(_estimated_size(response), accepted)
+                if isinstance(response, list):
+                    header, data = serialize_batches_frames(response, compression)
+                else:
+                    header, data = serialize_dataframe_frames(response, compression)
+        except Exception as e:
+            logger.error(f"invoke {invokemsg.method_id} request {invokemsg.request_id} error: {e}")
+            header, data, has_more, compression = b"", b"", False, "uncompressed"
+        # protobuf 的 bytes 字段只接受 bytes，这是数据唯一的一次复制
+        reply = Reply(request_id=invokemsg.request_id,method_id=invokemsg.method_id,header=header,data=bytes(data),
+                      has_more=has_more,compression=compression_to_id(compression))
+        await self.server.send(message=reply,serializer=Server.serialize)
+
     async def recv(self):
+        """接收并处理一个请求，处理完成后才返回"""
         invokemsg: InvokeMethod  = await self.server.recv(deserializer=Server.deserialize)
-        response = await invoke_method(invoke_method=invokemsg,ex=self.exchange)
-        if response is None:
-            return
-        await self.server.send(message=response,serializer=serialize_dataframe)
-
-
-
-
-
-
-
+        await self.handle(invokemsg)
 
-    
+    async def serve(self):
+        """逐个接收并处理请求，REP 模式下必须回复当前请求后才能接收下一个"""
+        while True:
+            await self.recv()
@@ -25,7 +25,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0emethodid.proto\x12\tfetchdata\x1a\x1cgoogle/protobuf/struct.proto\"q\n\x0cInvokeMethod\x12\x30\n\tmethod_id\x18\x01 \x01(\x0e\x32\x13.fetchdata.MethodIDR\x08methodId\x12/\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.StructR\x06params*\xe9\x01\n\x08MethodID\x12\r\n\tUNDEFINED\x10\x00\x12\x0c\n\x08\x45XCHANGE\x10\x01\x12\n\n\x06MARKET\x10\x02\x12\x11\n\rUPDATE_MARKET\x10\x03\x12\t\n\x05OHLCV\x10\n\x12\x0c\n\x08UN_OHLCV\x10\x0b\x12\r\n\tORDERBOOK\x10\x14\x12\x0b\n\x07TICKERS\x10\x1e\x12\n\n\x06TRADES\x10(\x12\r\n\tUN_TRADES\x10)\x12\x11\n\rHISTORY_OHLCV\x10\x37\x12\x15\n\x11HISTORY_ORDERBOOK\x10\x38\x12\x13\n\x0fHISTORY_TICKERS\x10\x39\x12\x12\n\x0eHISTORY_TRADES\x10:Bb\n\rcom.fetchdataB\rMethodidProtoP\x01\xa2\x02\x03\x46XX\xaa\x02\tFetchdata\xca\x02\tFetchdata\xe2\x02\x15\x46\x65tchdata\\GPBMetadata\xea\x02\tFetchdatab\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0emethodid.proto\x12\tfetchdata\x1a\x1cgoogle/protobuf/struct.proto\"\xb3\x03\n\x0cInvokeMethod\x12\x30\n\tmethod_id\x18\x01 \x01(\x0e\x32\x13.fetchdata.MethodIDR\x08methodId\x12\x1d\n\nrequest_id\x18\x03 \x01(\x04R\trequestId\x12\x31\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.StructH\x00R\x06params\x12/\n\x05\x62\x61tch\x18\x04 \x01(\x0b\x32\x17.fetchdata.BatchRequestH\x00R\x05\x62\x61tch\x12/\n\x05ohlcv\x18\x05 \x01(\x0b\x32\x17.fetchdata.OhlcvRequestH\x00R\x05ohlcv\x12\x32\n\x06trades\x18\x06 \x01(\x0b\x32\x18.fetchdata.TradesRequestH\x00R\x06trades\x12\x35\n\x07history\x18\x07 \x01(\x0b\x32\x19.fetchdata.HistoryRequestH\x00R\x07history\x12G\n\x12\x61\x63\x63\x65pt_compression\x18\x08 \x03(\x0e\x32\x18.fetchdata.CompressionIDR\x11\x61\x63\x63\x65ptCompressionB\t\n\x07request\"\xaa\x01\n\x0cOhlcvRequest\x12\x16\n\x06symbol\x18\x01 \x01(\tR\x06symbol\x12\x1c\n\ttimeframe\x18\x02 \x01(\tR\ttimeframe\x12\x14\n\x05since\x18\x03 \x01(\x03R\x05since\x12\x14\n\x05limit\x18\x04 \x01(\rR\x05limit\x12\x38\n\x0bmarket_type\x18\x05 \x01(\x0e\x32\x17.fetchdata.MarketTypeIDR\nmarketType\"\x8d\x01\n\rTradesRequest\x12\x16\n\x06symbol\x18\x01 \x01(\tR\x06symbol\x12\x14\n\x05since\x18\x02 \x01(\x03R\x05since\x12\x14\n\x05limit\x18\x03 \x01(\rR\x05limit\x12\x38\n\x0bmarket_type\x18\x04 \x01(\x0e\x32\x17.fetchdata.MarketTypeIDR\nmarketType\"\xe3\x01\n\x0eHistoryRequest\x12\x16\n\x06symbol\x18\x01 \x01(\tR\x06symbol\x12\x1c\n\ttimeframe\x18\x02 \x01(\tR\ttimeframe\x12\x14\n\x05since\x18\x03 \x01(\x03R\x05since\x12\x14\n\x05until\x18\x04 \x01(\x03R\x05until\x12\x38\n\x0bmarket_type\x18\x05 \x01(\x0e\x32\x17.fetchdata.MarketTypeIDR\nmarketType\x12\x1d\n\nchunk_rows\x18\x06 \x01(\rR\tchunkRows\x12\x16\n\x06offset\x18\x07 \x01(\x04R\x06offset\"l\n\x08\x42\x61tchKey\x12\x16\n\x06symbol\x18\x01 \x01(\tR\x06symbol\x12\x1c\n\ttimeframe\x18\x02 \x01(\tR\ttimeframe\x12\x14\n\x05since\x18\x03 \x01(\x03R\x05since\x12\x14\n\x05limit\x18\x04 \x01(\rR\x05limit\"q\n\x0c\x42\x61tchRequest\x12\'\n\x04keys\x18\x01 \x03(\x0b\x32\x13.fetchdata.BatchKeyR\x04keys\x12\x38\n\x0bmarket_type\x18\x02 \x01(\x0e\x32\x17.fetchdata.MarketTypeIDR\nmarketType\"\xdb\x01\n\x05Reply\x12\x1d\n\nrequest_id\x18\x01 \x01(\x04R\trequestId\x12\x30\n\tmethod_id\x18\x02 \x01(\x0e\x32\x13.fetchdata.MethodIDR\x08methodId\x12\x12\n\x04\x64\x61ta\x18\x03 \x01(\x0cR\x04\x64\x61ta\x12\x16\n\x06header\x18\x04 \x01(\x0cR\x06header\x12\x19\n\x08has_more\x18\x05 \x01(\x08R\x07hasMore\x12:\n\x0b\x63ompression\x18\x06 \x01(\x0e\x32\x18.fetchdata.CompressionIDR\x0b\x63ompression*\x8c\x02\n\x08MethodID\x12\r\n\tUNDEFINED\x10\x00\x12\x0c\n\x08\x45XCHANGE\x10\x01\x12\n\n\x06MARKET\x10\x02\x12\x11\n\rUPDATE_MARKET\x10\x03\x12\t\n\x05OHLCV\x10\n\x12\x0c\n\x08UN_OHLCV\x10\x0b\x12\r\n\tORDERBOOK\x10\x14\x12\x0b\n\x07TICKERS\x10\x1e\x12\n\n\x06TRADES\x10(\x12\r\n\tUN_TRADES\x10)\x12\x11\n\rHISTORY_OHLCV\x10\x37\x12\x15\n\x11HISTORY_ORDERBOOK\x10\x38\x12\x13\n\x0fHISTORY_TICKERS\x10\x39\x12\x12\n\x0eHISTORY_TRADES\x10:\x12\x0f\n\x0b\x42\x41TCH_OHLCV\x10<\x12\x10\n\x0c\x42\x41TCH_TRADES\x10=*\\\n\x0cMarketTypeID\x12\x14\n\x10MARKET_UNDEFINED\x10\x00\x12\x08\n\x04SPOT\x10\x01\x12\n\n\x06MARGIN\x10\x02\x12\x08\n\x04SWAP\x10\x03\x12\n\n\x06\x46UTURE\x10\x04\x12\n\n\x06OPTION\x10\x05*P\n\rCompressionID\x12\x14\n\x10\x43OMPRESSION_NONE\x10\x00\x12\x13\n\x0f\x43OMPRESSION_LZ4\x10\x01\x12\x14\n\x10\x43OMPRESSION_ZSTD\x10\x02\x42\x62\n\rcom.fetchdataB\rMethodidProtoP\x01\xa2\x02\x03\x46XX\xaa\x02\tFetchdata\xca\x02\tFetchdata\xe2\x02\x15\x46\x65tchdata\\GPBMetadata\xea\x02\tFetchdatab\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,8 +33,24 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'methodid_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._loaded_options = None
   _globals['DESCRIPTOR']._serialized_options = b'\n\rcom.fetchdataB\rMethodidProtoP\001\242\002\003FXX\252\002\tFetchdata\312\002\tFetchdata\342\002\025Fetchdata\\GPBMetadata\352\002\tFetchdata'
-  _globals['_METHODID']._serialized_start=175
-  _globals['_METHODID']._serialized_end=408
-  _globals['_INVOKEMETHOD']._serialized_start=59
-  _globals['_INVOKEMETHOD']._serialized_end=172
+  _globals['_METHODID']._serialized_start=1492
+  _globals['_METHODID']._serialized_end=1760
+  _globals['_MARKETTYPEID']._serialized_start=1762
+  _globals['_MARKETTYPEID']._serialized_end=1854
+  _globals['_COMPRESSIONID']._serialized_start=1856
+  _globals['_COMPRESSIONID']._serialized_end=1936
+  _globals['_INVOKEMETHOD']._serialized_start=60
+  _globals['_INVOKEMETHOD']._serialized_end=495
+  _globals['_OHLCVREQUEST']._serialized_start=498
+  _globals['_OHLCVREQUEST']._serialized_end=668
+  _globals['_TRADESREQUEST']._serialized_start=671
+  _globals['_TRADESREQUEST']._serialized_end=812
+  _globals['_HISTORYREQUEST']._serialized_start=815
+  _globals['_HISTORYREQUEST']._serialized_end=1042
+  _globals['_BATCHKEY']._serialized_start=1044
+  _globals['_BATCHKEY']._serialized_end=1152
+  _globals['_BATCHREQUEST']._serialized_start=1154
+  _globals['_BATCHREQUEST']._serialized_end=1267
+  _globals['_REPLY']._serialized_start=1270
+  _globals['_REPLY']._serialized_end=1489
 # @@protoc_insertion_point(module_scope)
@@ -1,8 +1,9 @@
 from google.protobuf import struct_pb2 as _struct_pb2
+from google.protobuf.internal import containers as _containers
 from google.protobuf.internal import enum_type_wrapper as _enum_type_wrapper
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
-from collections.abc import Mapping as _Mapping
+from collections.abc import Iterable as _Iterable, Mapping as _Mapping
 from typing import ClassVar as _ClassVar, Optional as _Optional, Union as _Union
 
 DESCRIPTOR: _descriptor.FileDescriptor
@@ -23,6 +24,23 @@ class MethodID(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
     HISTORY_ORDERBOOK: _ClassVar[MethodID]
     HISTORY_TICKERS: _ClassVar[MethodID]
     HISTORY_TRADES: _ClassVar[MethodID]
+    BATCH_OHLCV: _ClassVar[MethodID]
+    BATCH_TRADES: _ClassVar[MethodID]
+
+class MarketTypeID(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+    __slots__ = ()
+    MARKET_UNDEFINED: _ClassVar[MarketTypeID]
+    SPOT: _ClassVar[MarketTypeID]
+    MARGIN: _ClassVar[MarketTypeID]
+    SWAP: _ClassVar[MarketTypeID]
+    FUTURE: _ClassVar[MarketTypeID]
+    OPTION: _ClassVar[MarketTypeID]
+
+class CompressionID(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+    __slots__ = ()
+    COMPRESSION_NONE: _ClassVar[CompressionID]
+    COMPRESSION_LZ4: _ClassVar[CompressionID]
+    COMPRESSION_ZSTD: _ClassVar[CompressionID]
 UNDEFINED: MethodID
 EXCHANGE: MethodID
 MARKET: MethodID
@@ -37,11 +55,114 @@ HISTORY_OHLCV: MethodID
 HISTORY_ORDERBOOK: MethodID
 HISTORY_TICKERS: MethodID
 HISTORY_TRADES: MethodID
+BATCH_OHLCV: MethodID
+BATCH_TRADES: MethodID
+MARKET_UNDEFINED: MarketTypeID
+SPOT: MarketTypeID
+MARGIN: MarketTypeID
+SWAP: MarketTypeID
+FUTURE: MarketTypeID
+OPTION: MarketTypeID
+COMPRESSION_NONE: CompressionID
+COMPRESSION_LZ4: CompressionID
+COMPRESSION_ZSTD: CompressionID
 
 class InvokeMethod(_message.Message):
-    __slots__ = ("method_id", "params")
+    __slots__ = ("method_id", "request_id", "params", "batch", "ohlcv", "trades", "history", "accept_compression")
     METHOD_ID_FIELD_NUMBER: _ClassVar[int]
+    REQUEST_ID_FIELD_NUMBER: _ClassVar[int]
     PARAMS_FIELD_NUMBER: _ClassVar[int]
+    BATCH_FIELD_NUMBER: _ClassVar[int]
+    OHLCV_FIELD_NUMBER: _ClassVar[int]
+    TRADES_FIELD_NUMBER: _ClassVar[int]
+    HISTORY_FIELD_NUMBER: _ClassVar[int]
+    ACCEPT_COMPRESSION_FIELD_NUMBER: _ClassVar[int]
     method_id: MethodID
+    request_id: int
     params: _struct_pb2.Struct
-    def __init__(self, method_id: _Optional[_Union[MethodID, str]] = ..., params: _Optional[_Union[_struct_pb2.Struct, _Mapping]] = ...) -> None: ...
+    batch: BatchRequest
+    ohlcv: OhlcvRequest
+    trades: TradesRequest
+    history: HistoryRequest
+    accept_compression: _containers.RepeatedScalarFieldContainer[CompressionID]
+    def __init__(self, method_id: _Optional[_Union[MethodID, str]] = ..., request_id: _Optional[int] = ..., params: _Optional[_Union[_struct_pb2.Struct, _Mapping]] = ..., batch: _Optional[_Union[BatchRequest, _Mapping]] = ..., ohlcv: _Optional[_Union[OhlcvRequest, _Mapping]] = ..., trades: _Optional[_Union[TradesRequest, _Mapping]] = ..., history: _Optional[_Union[HistoryRequest, _Mapping]] = ..., accept_compression: _Optional[_Iterable[_Union[CompressionID, str]]] = ...) -> None: ...
+
+class OhlcvRequest(_message.Message):
+    __slots__ = ("symbol", "timeframe", "since", "limit", "market_type")
+    SYMBOL_FIELD_NUMBER: _ClassVar[int]
+    TIMEFRAME_FIELD_NUMBER: _ClassVar[int]
+    SINCE_FIELD_NUMBER: _ClassVar[int]
+    LIMIT_FIELD_NUMBER: _ClassVar[int]
+    MARKET_TYPE_FIELD_NUMBER: _ClassVar[int]
+    symbol: str
+    timeframe: str
+    since: int
+    limit: int
+    market_type: MarketTypeID
+    def __init__(self, symbol: _Optional[str] = ..., timeframe: _Optional[str] = ..., since: _Optional[int] = ..., limit: _Optional[int] = ..., market_type: _Optional[_Union[MarketTypeID, str]] = ...) -> None: ...
+
+class TradesRequest(_message.Message):
+    __slots__ = ("symbol", "since", "limit", "market_type")
+    SYMBOL_FIELD_NUMBER: _ClassVar[int]
+    SINCE_FIELD_NUMBER: _ClassVar[int]
+    LIMIT_FIELD_NUMBER: _ClassVar[int]
+    MARKET_TYPE_FIELD_NUMBER: _ClassVar[int]
+    symbol: str
+    since: int
+    limit: int
+    market_type: MarketTypeID
+    def __init__(self, symbol: _Optional[str] = ..., since: _Optional[int] = ..., limit: _Optional[int] = ..., market_type: _Optional[_Union[MarketTypeID, str]] = ...) -> None: ...
+
+class HistoryRequest(_message.Message):
+    __slots__ = ("symbol", "timeframe", "since", "until", "market_type", "chunk_rows", "offset")
+    SYMBOL_FIELD_NUMBER: _ClassVar[int]
+    TIMEFRAME_FIELD_NUMBER: _ClassVar[int]
+    SINCE_FIELD_NUMBER: _ClassVar[int]
+    UNTIL_FIELD_NUMBER: _ClassVar[int]
+    MARKET_TYPE_FIELD_NUMBER: _ClassVar[int]
+    CHUNK_ROWS_FIELD_NUMBER: _ClassVar[int]
+    OFFSET_FIELD_NUMBER: _ClassVar[int]
+    symbol: str
+    timeframe: str
+    since: int
+    until: int
+    market_type: MarketTypeID
+    chunk_rows: int
+    offset: int
+    def __init__(self, symbol: _Optional[str] = ..., timeframe: _Optional[str] = ..., since: _Optional[int] = ..., until: _Optional[int] = ..., market_type: _Optional[_Union[MarketTypeID, str]] = ..., chunk_rows: _Optional[int] = ..., offset: _Optional[int] = ...) -> None: ...
+
+class BatchKey(_message.Message):
+    __slots__ = ("symbol", "timeframe", "since", "limit")
+    SYMBOL_FIELD_NUMBER: _ClassVar[int]
+    TIMEFRAME_FIELD_NUMBER: _ClassVar[int]
+    SINCE_FIELD_NUMBER: _ClassVar[int]
+    LIMIT_FIELD_NUMBER: _ClassVar[int]
+    symbol: str
+    timeframe: str
+    since: int
+    limit: int
+    def __init__(self, symbol: _Optional[str] = ..., timeframe: _Optional[str] = ..., since: _Optional[int] = ..., limit: _Optional[int] = ...) -> None: ...
+
+class BatchRequest(_message.Message):
+    __slots__ = ("keys", "market_type")
+    KEYS_FIELD_NUMBER: _ClassVar[int]
+    MARKET_TYPE_FIELD_NUMBER: _ClassVar[int]
+    keys: _containers.RepeatedCompositeFieldContainer[BatchKey]
+    market_type: MarketTypeID
+    def __init__(self, keys: _Optional[_Iterable[_Union[BatchKey, _Mapping]]] = ..., market_type: _Optional[_Union[MarketTypeID, str]] = ...) -> None: ...
+
+class Reply(_message.Message):
+    __slots__ = ("request_id", "method_id", "data", "header", "has_more", "compression")
+    REQUEST_ID_FIELD_NUMBER: _ClassVar[int]
+    METHOD_ID_FIELD_NUMBER: _ClassVar[int]
+    DATA_FIELD_NUMBER: _ClassVar[int]
+    HEADER_FIELD_NUMBER: _ClassVar[int]
+    HAS_MORE_FIELD_NUMBER: _ClassVar[int]
+    COMPRESSION_FIELD_NUMBER: _ClassVar[int]
+    request_id: int
+    method_id: MethodID
+    data: bytes
+    header: bytes
+    has_more: bool
+    compression: CompressionID
+    def __init__(self, request_id: _Optional[int] = ..., method_id: _Optional[_Union[MethodID, str]] = ..., data: _Optional[bytes] = ..., header: _Optional[bytes] = ..., has_more: bool = ..., compression: _Optional[_Union[CompressionID, str]] = ...) -> None: ...
@@ -14,7 +14,7 @@ from .exittype import ExitType
 from .marginmode import MarginMode
 from .marketstatetype import MarketDirection
 from .ordertypevalue import OrderTypeValues
-from .polars_scheme import CANDLES_SCHEME, TRADES_SCHEME
+from .polars_scheme import CANDLES_SCHEME, FUNDING_RATE_SCHEME, SCHEMES, TRADES_SCHEME
 from .pricetype import PriceType
 from .signaltype import SignalDirection, SignalTagType, SignalType
 from .state import State
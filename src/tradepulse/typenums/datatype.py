@@ -1,7 +1,7 @@
 from typing import Literal
 
 
-DataType = Literal["ohlcv","orderbook","ticker","trades"]
+DataType = Literal["ohlcv","orderbook","ticker","trades","funding_rate"]
 
 DataTypeColumns = {
     "ohlcv": ["datetime", "open", "high", "low", "close", "volume"],
@@ -3,11 +3,15 @@ import polars as pl
 
 
 
+# ccxt 统一的成交方向和订单类型，可以为 null，其他值在转换时变为 null 并记录警告
+TRADE_SIDE = pl.Enum(["buy", "sell"])
+TRADE_TYPE = pl.Enum(["market", "limit"])
+
 TRADES_SCHEME = {
     "timestamp": pl.Datetime(time_unit="ms",time_zone="UTC"),
     "id": pl.String,
-    "type": pl.String,
-    "side": pl.String,
+    "type": TRADE_TYPE,
+    "side": TRADE_SIDE,
     "price": pl.Float64,
     "amount": pl.Float64,
     "cost": pl.Float64,
@@ -22,4 +26,14 @@ CANDLES_SCHEME ={
             "volume": pl.Float64,
     }
 
+FUNDING_RATE_SCHEME = {
+    "timestamp": pl.Datetime(time_unit="ms",time_zone="UTC"),
+    "fundingRate": pl.Float64,
+}
 
+# DataKey.datatype 对应的 schema
+SCHEMES = {
+    "trades": TRADES_SCHEME,
+    "ohlcv": CANDLES_SCHEME,
+    "funding_rate": FUNDING_RATE_SCHEME,
+}
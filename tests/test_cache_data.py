@@ -0,0 +1,97 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import polars as pl
+import pytest
+
+from tradepulse.data.cache_data import DataframeCache
+from tradepulse.data.protocol import DataKey
+from tradepulse.typenums import TRADES_SCHEME
+
+
+def test_cache_retention_policies():
+    cache = DataframeCache()
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    now_ms = int(now.timestamp() * 1000)
+    keys = [DataKey(pair, "", "future", "trades") for pair in ("BTC/USDT", "ETH/USDT")]
+    for key in keys:
+        for i in range(10):
+            cache.append(key, [[now_ms - (10 - i) * 60_000, str(i), None, "buy", 1.0, 1.0, 1.0]])
+    cache.set_retention(max_age=timedelta(minutes=5))
+    cache.set_retention(keys[1], max_rows=2)
+    reclaimed = cache.enforce_retention(now)
+    assert reclaimed > 0 and cache.reclaimed_bytes == reclaimed
+    assert len(cache.get_recoder(key=keys[0])) == 5
+    assert len(cache.get_recoder(key=keys[1])) == 2
+    assert cache.enforce_retention(now) == 0
+
+
+def test_cache_budget_spills_and_reloads(tmp_path):
+    cache = DataframeCache(budget_bytes=1, spill_dir=tmp_path, min_idle=0)
+    keys = [DataKey(pair, "", "future", "trades") for pair in ("BTC/USDT", "ETH/USDT", "SOL/USDT")]
+    trade = lambda i: [1704067200000 + i, str(i), None, "buy", 1.0, 1.0, 1.0]
+    for key in keys:
+        cache.append(key, [trade(i) for i in range(100)])
+    cache.read(keys[2])
+    cache.read(keys[0])
+    cache.budget_bytes = cache.estimated_size() - 1
+    # ETH 从没读取过，最先淘汰；之后已经低于预算
+    assert cache.enforce_budget() > 0
+    assert cache.evictions == 1 and list(cache.spilled) == [keys[1]]
+    assert cache[keys[1]].is_empty and len(list(tmp_path.iterdir())) == 1
+    # 淘汰后实时数据照常写入，读取时磁盘上的数据放在前面，读取本身不修改缓存
+    cache.append(keys[1], [trade(100)])
+    snapshot = cache.read(keys[1])
+    assert snapshot.data["id"].to_list() == [str(i) for i in range(101)]
+    assert snapshot.rows == 101 and snapshot.first_time == 1704067200000
+    assert list(cache.spilled) == [keys[1]] and len(cache[keys[1]]) == 1
+    # 写入方处理读取记录时读回
+    cache.budget_bytes = 10**9
+    cache.enforce_budget()
+    assert cache[keys[1]].rawdata["id"].to_list() == [str(i) for i in range(101)]
+    assert not cache.spilled and not list(tmp_path.iterdir())
+    assert cache.read(DataKey("XRP/USDT", "", "future", "trades")) is None and len(cache) == 3
+
+
+def test_cache_budget_idle_from_creation_and_signals_reload(tmp_path):
+    cache = DataframeCache(budget_bytes=1, spill_dir=tmp_path, min_idle=60)
+    key = DataKey("BTC/USDT", "", "future", "trades")
+    cache.append(key, [[1704067200000 + i, str(i), None, "buy", 1.0, 1.0, 1.0] for i in range(100)])
+    # 刚创建、从没读取过的 key 也要空闲 min_idle 秒后才淘汰
+    assert cache.enforce_budget() == 0 and not cache.spilled
+    cache.min_idle = 0
+    assert cache.enforce_budget() > 0 and key in cache.spilled
+    signals = []
+    cache.on_spilled_read = lambda: signals.append(key)
+    assert cache.read(key).rows == 100
+    # 读取已淘汰的数据时通知写入方，写入方立即读回，不必等下一次 enforce_budget
+    assert signals == [key]
+    assert cache.reload_reads() == 1
+    assert not cache.spilled and len(cache[key]) == 100
+    cache.read(key)
+    assert signals == [key]
+
+
+def test_cache_convert_columnar(caplog):
+    cache = DataframeCache()
+    trades = [
+        {"info": {}, "timestamp": 1704067200000, "id": "1", "type": "limit", "side": "buy", "price": 1, "amount": 2.0, "cost": 2.0},
+        {"info": {}, "timestamp": 1704067200001, "id": "2", "type": None, "side": "sell", "price": 1.5, "amount": None, "cost": None},
+    ]
+    df = cache.convert(trades, "trades")
+    assert df.schema == pl.Schema(TRADES_SCHEME)
+    assert df["type"].to_list() == ["limit", None]
+    # 未知的值只让该行的 type 为 null，并记录警告，不影响整批数据
+    with caplog.at_level(logging.WARNING):
+        unknown = cache.convert([{**trades[0], "type": "stop"}, trades[1]], "trades")
+    assert unknown["type"].to_list() == [None, None] and unknown["price"].to_list() == [1.0, 1.5]
+    assert "stop" in caplog.text
+    assert df["price"].to_list() == [1.0, 1.5]
+    # 缺少字段时按 None 处理
+    partial = cache.convert([{"timestamp": 1, "price": 1.0, "side": "buy"}], "trades")
+    assert partial["id"].to_list() == [None] and partial["side"].to_list() == ["buy"]
+    funding = cache.convert([{"timestamp": 1704067200000, "fundingRate": 0.0001, "symbol": "BTC/USDT:USDT"}], "funding_rate")
+    assert funding.columns == ["timestamp", "fundingRate"]
+    assert cache.convert([], "ohlcv").columns == ["date", "open", "high", "low", "close", "volume"]
+    with pytest.raises(ValueError):
+        cache.convert([[1, 2]], "orderbook")
@@ -6,11 +6,19 @@ import asyncio
 # 项目模块导入
 from tradepulse.exchange.protocol import ExchangeABC
 from tradepulse.fetchdata import Server,Client
-from tradepulse.message.methodid_pb2 import MethodID, InvokeMethod
+from tradepulse.fetchdata.server import choose_compression
+from tradepulse.message.methodid_pb2 import MethodID, InvokeMethod, MarketTypeID, Reply, CompressionID
 from tradepulse.message.google.protobuf.struct_pb2 import Struct
-from tradepulse.fetchdata.method_invoke import invoke_method, create_invoke_method
+from tradepulse.fetchdata.method_invoke import (
+    invoke_method,
+    create_invoke_method,
+    create_batch_invoke_method,
+    create_ohlcv_invoke_method,
+    create_trades_invoke_method,
+    create_history_invoke_method,
+)
 from tradepulse.exchange.exchange_factory import ExchangeFactory
-from tradepulse.data.serialize import serialize_dataframe, deserialize_dataframe
+from tradepulse.data.serialize import serialize_dataframe, deserialize_dataframe, serialize_batches, deserialize_batches
 import polars as pl
 
 # 测试配置
@@ -241,3 +249,422 @@ class TestDataSerialization:
         assert deserialized.shape == large_df.shape
         assert len(deserialized) == len(large_df)
 
+
+
+# ==================
+# 请求分发测试
+# ==================
+class StubExchange(ExchangeABC[pl.DataFrame]):
+    """按 symbol 控制延迟的交易所"""
+    def __init__(self, delays: dict[str, float]):
+        self.delays = delays
+        self.running = 0
+        self.max_running = 0
+
+    async def ohlcv(self, symbol: str, timeframe: str, since: float | int, marketType="future", limit=None, params=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delays.get(symbol, 0))
+        self.running -= 1
+        return TEST_DF
+
+    async def trades(self, symbol: str, since: float | int, marketType="future", limit=None, params=None):
+        return await self.ohlcv(symbol, "", since)
+
+    async def un_watch_trades(self, pair, until=0, marketType="future"): ...
+    async def un_watch_ohlcv(self, pair, timeframe, until=0, marketType="future"): ...
+    async def update(self): ...
+    def tickers(self, symbol, since, marketType="future", limit=None, params=None): ...
+    def funding_rate(self, symbol, since, limit=None, params={}): ...
+    def funding_rate_history(self, symbol, since, limit=None, params={}): ...
+    @property
+    def cache(self): ...
+
+
+class QueueResponder:
+    """把请求放进队列、把回复记录下来的 Responder"""
+    def __init__(self, invokes: list[InvokeMethod]):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        for invoke in invokes:
+            self.queue.put_nowait(invoke.SerializeToString())
+        self.replies: list[Reply] = []
+
+    async def recv(self, deserializer):
+        return deserializer(await self.queue.get())
+
+    async def send(self, message, serializer):
+        self.replies.append(Reply.FromString(serializer(message)))
+
+
+def make_server(exchange: ExchangeABC, invokes: list[InvokeMethod]) -> tuple[Server, QueueResponder]:
+    server = Server(address=TEST_ADDRESS, exchange=exchange)
+    responder = QueueResponder(invokes)
+    server.server = responder
+    return server, responder
+
+
+class TestServerDispatch:
+    @pytest.mark.asyncio
+    async def test_serve_replies_in_order(self):
+        exchange = StubExchange({"SLOW/USDT": 0.05})
+        invokes = [
+            create_invoke_method(MethodID.OHLCV, {"symbol": "SLOW/USDT", "timeframe": "1h"}, request_id=1),
+            create_invoke_method(MethodID.OHLCV, {"symbol": "FAST/USDT", "timeframe": "1h"}, request_id=2),
+        ]
+        server, responder = make_server(exchange, invokes)
+        task = asyncio.create_task(server.serve())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        # REP 模式收一个回一个
+        assert [r.request_id for r in responder.replies] == [1, 2]
+        assert exchange.max_running == 1
+        assert Client.to_dataframe(responder.replies[1]).shape == TEST_DF.shape
+
+    def test_rep_rejects_concurrent_dispatch(self):
+        with pytest.raises(ValueError, match="ROUTER"):
+            Server(address=TEST_ADDRESS, exchange=StubExchange({}), max_inflight=4)
+
+    @pytest.mark.asyncio
+    async def test_unknown_method_replies_empty(self):
+        invoke = create_invoke_method(MethodID.UNDEFINED, {}, request_id=7)
+        server, responder = make_server(StubExchange({}), [invoke])
+        await server.recv()
+        assert responder.replies[0].request_id == 7
+        assert responder.replies[0].data == b""
+
+
+# ==================
+# 批量请求测试
+# ==================
+class LoopbackRequest:
+    """直接在本进程内调用 Server.handle 的 Request"""
+    def __init__(self, server: Server):
+        self.server = server
+
+    async def send(self, message, serializer):
+        invoke = Server.deserialize(serializer(message))
+        responder = QueueResponder([])
+        self.server.server = responder
+        await self.server.handle(invoke)
+        return responder.replies[0].SerializeToString()
+
+
+class TestBatch:
+    @pytest.mark.asyncio
+    async def test_batch_invoke(self):
+        keys = [("BTC/USDT", "1h", 1620000000), ("ETH/USDT", "1h", 1620000000, 10)]
+        invoke = create_batch_invoke_method(MethodID.BATCH_OHLCV, keys, market_type="spot")
+        assert [k.symbol for k in invoke.batch.keys] == ["BTC/USDT", "ETH/USDT"]
+        assert invoke.batch.keys[1].limit == 10
+
+        result = await invoke_method(invoke, StubExchange({}))
+        assert len(result) == 2
+        dfs = deserialize_batches(serialize_batches(result))
+        assert all(df.equals(TEST_DF) for df in dfs)
+
+    @pytest.mark.asyncio
+    async def test_client_batch_ohlcv(self):
+        client = Client(address=TEST_ADDRESS)
+        client.request = LoopbackRequest(Server(address=TEST_ADDRESS, exchange=StubExchange({})))
+        result = await client.batch_ohlcv([("BTC/USDT", "1h", 0), ("ETH/USDT", "4h", 0)])
+        assert set(result) == {("BTC/USDT", "1h"), ("ETH/USDT", "4h")}
+        assert result[("ETH/USDT", "4h")].equals(TEST_DF)
+
+        trades = await client.batch_trades([("BTC/USDT", 0)])
+        assert trades["BTC/USDT"].equals(TEST_DF)
+
+
+# ==================
+# 类型化请求测试
+# ==================
+class RecordExchange(StubExchange):
+    """记录调用参数的交易所"""
+    def __init__(self):
+        super().__init__({})
+        self.calls: list[dict] = []
+
+    async def ohlcv(self, symbol, timeframe, since, marketType="future", limit=None, params=None):
+        self.calls.append(dict(symbol=symbol, timeframe=timeframe, since=since, marketType=marketType, limit=limit))
+        return TEST_DF
+
+    async def trades(self, symbol, since, marketType="future", limit=None, params=None):
+        self.calls.append(dict(symbol=symbol, since=since, marketType=marketType, limit=limit))
+        return TEST_DF
+
+
+class TestTypedRequest:
+    def test_create_ohlcv_invoke(self):
+        invoke = create_ohlcv_invoke_method("BTC/USD", "1h", since=1717029200123, limit=100, market_type="spot")
+        assert invoke.WhichOneof("request") == "ohlcv"
+        assert invoke.ohlcv.since == 1717029200123
+        assert invoke.ohlcv.market_type == MarketTypeID.SPOT
+
+    @pytest.mark.asyncio
+    async def test_invoke_typed(self):
+        exchange = RecordExchange()
+        await invoke_method(create_ohlcv_invoke_method("BTC/USD", "1h", since=1717029200123, market_type="swap"), exchange)
+        await invoke_method(create_trades_invoke_method("ETH/USD", since=5, limit=10), exchange)
+        assert exchange.calls == [
+            dict(symbol="BTC/USD", timeframe="1h", since=1717029200123, marketType="swap", limit=None),
+            dict(symbol="ETH/USD", since=5, marketType="future", limit=10),
+        ]
+
+
+# ==================
+# 历史数据分块测试
+# ==================
+class HistoryExchange(StubExchange):
+    def __init__(self, rows: int):
+        super().__init__({})
+        self.df = pl.DataFrame({"timestamp": list(range(rows)), "price": [float(i) for i in range(rows)]})
+
+    async def trades(self, symbol, since, marketType="future", limit=None, params=None):
+        return self.df.filter(pl.col("timestamp") >= since)
+
+
+class TestHistoryStream:
+    @pytest.mark.asyncio
+    async def test_history_chunk(self):
+        exchange = HistoryExchange(25)
+        invoke = create_history_invoke_method(MethodID.HISTORY_TRADES, "BTC/USDT", since=16, until=19, chunk_rows=8)
+        chunk = await invoke_method(invoke, exchange)
+        assert chunk.data["timestamp"].to_list() == [16, 17, 18, 19]
+        assert not chunk.has_more
+
+    @pytest.mark.asyncio
+    async def test_client_history_trades(self):
+        client = Client(address=TEST_ADDRESS)
+        client.request = LoopbackRequest(Server(address=TEST_ADDRESS, exchange=HistoryExchange(25)))
+        chunks = [df async for df in client.history_trades("BTC/USDT", since=2, chunk_rows=10)]
+        assert [df.height for df in chunks] == [10, 10, 3]
+        assert pl.concat(chunks)["timestamp"].to_list() == list(range(2, 25))
+
+    @pytest.mark.asyncio
+    async def test_client_history_time_cursor(self):
+        exchange = HistoryExchange(0)
+        # 每个时间戳 3 行，分块边界落在同一时间戳内
+        exchange.df = pl.DataFrame({"timestamp": [i // 3 for i in range(25)], "price": [float(i) for i in range(25)]})
+        trades = exchange.trades
+
+        async def trimmed(symbol, since, marketType="future", limit=None, params=None):
+            # 每次请求前删除最早的一个时间戳，模拟保留策略
+            exchange.df = exchange.df.slice(3)
+            return await trades(symbol, since, marketType, limit, params)
+
+        exchange.trades = trimmed
+        client = Client(address=TEST_ADDRESS)
+        client.request = LoopbackRequest(Server(address=TEST_ADDRESS, exchange=exchange))
+        chunks = [df async for df in client.history_trades("BTC/USDT", since=2, chunk_rows=4)]
+        assert pl.concat(chunks)["price"].to_list() == [float(i) for i in range(6, 25)]
+
+    @pytest.mark.asyncio
+    async def test_history_ohlcv_from_datahandler(self, tmp_path):
+        from tradepulse.data.history import get_datahandler
+        from tradepulse.typenums import CANDLES_SCHEME, CandleType
+
+        start, minute = 1704067200000, 60_000
+        candles = pl.DataFrame(
+            {
+                "date": [start + i * minute for i in range(30)],
+                "open": [float(i) for i in range(30)],
+                "high": [0.0] * 30,
+                "low": [0.0] * 30,
+                "close": [0.0] * 30,
+                "volume": [0.0] * 30,
+            },
+            schema=CANDLES_SCHEME,
+        )
+        get_datahandler(tmp_path, "parquet").ohlcv_store("BTC_USDT", "1m", candles, CandleType.SPOT)
+
+        server = Server(address=TEST_ADDRESS, config={"datadir": str(tmp_path)}, exchange=StubExchange({}))
+        client = Client(address=TEST_ADDRESS)
+        client.request = LoopbackRequest(server)
+        chunks = [
+            df async for df in client.history_ohlcv(
+                "BTC_USDT", "1m", since=start + 5 * minute, until=start + 24 * minute, marketType="spot", chunk_rows=8
+            )
+        ]
+        assert [df.height for df in chunks] == [8, 8, 4]
+        assert pl.concat(chunks)["open"].to_list() == [float(i) for i in range(5, 25)]
+
+
+class LargeExchange(StubExchange):
+    """返回大块数据的交易所"""
+    def __init__(self, rows: int):
+        super().__init__({})
+        self.df = pl.DataFrame({"timestamp": range(rows), "close": [30000.0] * rows})
+
+    async def ohlcv(self, symbol: str, timeframe: str, since: float | int, marketType="future", limit=None, params=None):
+        return self.df
+
+
+class TestCompression:
+    def test_choose_compression(self):
+        assert choose_compression(1024, ["lz4", "zstd"]) == "uncompressed"
+        assert choose_compression(1 << 20, []) == "uncompressed"
+        assert choose_compression(1 << 20, ["zstd", "lz4"]) == "lz4"
+        assert choose_compression(1 << 20, ["zstd"]) == "zstd"
+        assert choose_compression(1 << 23, ["lz4", "zstd"]) == "zstd"
+
+    @pytest.mark.asyncio
+    async def test_negotiated_reply(self):
+        exchange = LargeExchange(100_000)
+        invoke = create_ohlcv_invoke_method("BTC/USDT", "1m", request_id=1)
+        plain = create_ohlcv_invoke_method("BTC/USDT", "1m", request_id=2)
+        invoke.accept_compression[:] = [CompressionID.COMPRESSION_LZ4]
+        server, responder = make_server(exchange, [])
+        await server.handle(invoke)
+        await server.handle(plain)
+        compressed, uncompressed = responder.replies
+        assert compressed.compression == CompressionID.COMPRESSION_LZ4
+        assert uncompressed.compression == CompressionID.COMPRESSION_NONE
+        assert len(compressed.data) < len(uncompressed.data)
+        assert Client.to_dataframe(compressed).equals(exchange.df)
+
+    @pytest.mark.asyncio
+    async def test_small_reply_uncompressed(self):
+        invoke = create_ohlcv_invoke_method("BTC/USDT", "1m", request_id=1)
+        invoke.accept_compression[:] = [CompressionID.COMPRESSION_ZSTD]
+        server, responder = make_server(StubExchange({}), [])
+        await server.handle(invoke)
+        assert responder.replies[0].compression == CompressionID.COMPRESSION_NONE
+
+
+# ==================
+# 客户端增量缓存测试
+# ==================
+class GrowingExchange(StubExchange):
+    """K 线随时间增长，最后一根 K 线会被更新"""
+    def __init__(self):
+        super().__init__({})
+        self.sinces: list[int] = []
+        self.df = self.candles(range(5))
+
+    @staticmethod
+    def candles(index, close: float = 0.0) -> pl.DataFrame:
+        from tradepulse.typenums import CANDLES_SCHEME
+        index = list(index)
+        return pl.DataFrame(
+            {"date": [1704067200000 + i * 60_000 for i in index], "open": [float(i) for i in index],
+             "high": [0.0] * len(index), "low": [0.0] * len(index), "close": [close] * len(index), "volume": [0.0] * len(index)},
+            schema=CANDLES_SCHEME,
+        )
+
+    async def ohlcv(self, symbol, timeframe, since, marketType="future", limit=None, params=None):
+        self.sinces.append(since)
+        return self.df.filter(pl.col("date").dt.epoch("ms") >= since)
+
+
+class TestIncrementalCache:
+    @pytest.mark.asyncio
+    async def test_ohlcv_delta(self):
+        exchange = GrowingExchange()
+        client = Client(address=TEST_ADDRESS)
+        client.request = LoopbackRequest(Server(address=TEST_ADDRESS, exchange=exchange))
+        first = await client._ohlcv("BTC/USDT", "1m", since=0)
+        assert first.height == 5
+
+        # 最后一根 K 线更新并新增两根
+        exchange.df = pl.concat([exchange.df.head(4), GrowingExchange.candles(range(4, 7), close=1.0)])
+        second = await client._ohlcv("BTC/USDT", "1m", since=0)
+        assert exchange.sinces == [0, 1704067200000 + 4 * 60_000]
+        assert second.equals(exchange.df)
+
+        # 没有新数据时返回缓存
+        assert (await client._ohlcv("BTC/USDT", "1m", since=0)).equals(exchange.df)
+
+    @pytest.mark.asyncio
+    async def test_earlier_since_refetch(self):
+        exchange = GrowingExchange()
+        client = Client(address=TEST_ADDRESS)
+        client.request = LoopbackRequest(Server(address=TEST_ADDRESS, exchange=exchange))
+        start = 1704067200000
+        assert (await client._ohlcv("BTC/USDT", "1m", since=start + 2 * 60_000)).height == 3
+        assert (await client._ohlcv("BTC/USDT", "1m", since=0)).height == 5
+        assert exchange.sinces == [start + 2 * 60_000, 0]
+
+        client.clear_cache()
+        await client._ohlcv("BTC/USDT", "1m", since=0)
+        assert exchange.sinces[-1] == 0
+
+
+# ==================
+# 连接池测试
+# ==================
+class SlowRequest:
+    """固定往返延迟的 REQ socket，同一时间只允许一个请求"""
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.busy = False
+        self.closed = False
+
+    async def start(self): ...
+
+    async def stop(self):
+        self.closed = True
+
+    async def send(self, message, serializer):
+        assert not self.busy, "REQ socket 不能同时发送两个请求"
+        self.busy = True
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.busy = False
+        invoke = InvokeMethod.FromString(serializer(message))
+        return Reply(request_id=invoke.request_id, method_id=invoke.method_id).SerializeToString()
+
+
+class TestRequestPool:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests(self):
+        from tradepulse.fetchdata.pool import RequestPool
+        client = Client(address=TEST_ADDRESS)
+        client.request = RequestPool(SlowRequest, size=4)
+        start = asyncio.get_running_loop().time()
+        replies = await asyncio.gather(*(client.send(MethodID.UPDATE_MARKET, {}) for _ in range(8)))
+        elapsed = asyncio.get_running_loop().time() - start
+        assert sorted(r.request_id for r in replies) == list(range(1, 9))
+        # 8 个请求 4 个 socket，两轮完成
+        assert elapsed < 0.15
+
+    @pytest.mark.asyncio
+    async def test_cancelled_socket_replaced(self):
+        from tradepulse.fetchdata.pool import RequestPool
+        pool = RequestPool(SlowRequest, size=1)
+        first = pool.sockets[0]
+        task = asyncio.create_task(pool.send(InvokeMethod(), serializer=InvokeMethod.SerializeToString))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        reply = await pool.send(InvokeMethod(request_id=7), serializer=InvokeMethod.SerializeToString)
+        assert Reply.FromString(reply).request_id == 7
+        assert pool.sockets[0] is not first
+        # 被替换的 socket 已经关闭
+        assert first.closed and not pool.sockets[0].closed
+
+
+# ==================
+# 进程内直接调用测试
+# ==================
+class TestInProc:
+    @pytest.mark.asyncio
+    async def test_ohlcv_from_cache(self):
+        from tradepulse.data import DataKey
+        from tradepulse.exchange import ExchangeFactory
+        from tradepulse.fetchdata.inproc import InProc
+
+        exchange = ExchangeFactory.get_exchange(name="binance", config={"name": "binance"})
+        inproc = InProc(exchange)
+        candles = GrowingExchange.candles(range(10))
+        key = DataKey("BTC/USDT", "1m", "future", "ohlcv")
+        exchange.cache.append(key, candles)
+
+        start = 1704067200000
+        result = inproc.ohlcv("BTC/USDT", "1m", since=start + 4 * 60_000)
+        assert result.equals(candles.slice(4))
+        assert inproc.ohlcv("BTC/USDT", "1m", since=start, limit=3).equals(candles.head(3))
+
+        # 缓存不覆盖 since 时返回空并登记回补
+        assert inproc.ohlcv("BTC/USDT", "1m", since=start - 60_000).is_empty()
+        assert exchange.since[key].time_marker == start - 60_000
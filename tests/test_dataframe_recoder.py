@@ -115,4 +115,106 @@ def test_invalid_column_count(recoder):
 
 def test_empty_data(recoder: DataFrameRecoder):
     assert recoder.is_empty
-    assert len(recoder) == 0
\ No newline at end of file
+    assert len(recoder) == 0
+
+def test_chunked_append_keeps_order(recoder: DataFrameRecoder):
+    for i in range(1000):
+        recoder.append(pl.DataFrame({"timestamp": [i], "price": [float(i)]}))
+    assert len(recoder) == 1000
+    # 块数量按层级合并，不随追加次数线性增长
+    assert len(recoder.chunks) < 2 * recoder.fanout
+    assert recoder.data["timestamp"].to_list() == list(range(1000))
+
+def test_chunked_prepend_keeps_order(recoder: DataFrameRecoder):
+    recoder.append(pl.DataFrame({"timestamp": [1000], "price": [0.0]}))
+    for i in reversed(range(1000)):
+        recoder.prepend(pl.DataFrame({"timestamp": [i], "price": [float(i)]}))
+    recoder.append(pl.DataFrame({"timestamp": [1001], "price": [0.0]}))
+    assert len(recoder.chunks) < 3 * recoder.fanout
+    assert recoder.data["timestamp"].to_list() == list(range(1002))
+    recoder.compact()
+    assert len(recoder.chunks) == 1 and len(recoder) == 1002
+
+def test_append_dtype_mismatch(recoder: DataFrameRecoder, sample_df: pl.DataFrame):
+    recoder.append(sample_df)
+    with pytest.raises(pl.exceptions.SchemaError):
+        recoder.append(pl.DataFrame({"timestamp": [1620000120000], "price": ["x"]}))
+    assert len(recoder) == 2
+
+def test_cached_first_last_time(recoder: DataFrameRecoder, sample_df: pl.DataFrame, datetime_df: pl.DataFrame):
+    assert recoder.first_time.is_empty and recoder.last_time.is_empty
+    recoder.append(sample_df)
+    assert (recoder.first_time, recoder.last_time) == (1620000000000, 1620000060000)
+    recoder.append(datetime_df)
+    assert recoder.last_time == 1620000090000
+    recoder.prepend(pl.DataFrame({"timestamp": [1610000000000], "price": [1.0]}))
+    assert recoder.first_time == 1610000000000
+    # 时间列不是第一列时也使用时间列
+    other = DataFrameRecoder(pair="BTC/USDT", marketType="spot", datatype="trades")
+    other.append(pl.DataFrame({"price": [1.0, 2.0], "timestamp": [5, 9]}))
+    assert (other.first_time, other.last_time) == (5, 9)
+
+def test_sorted_slice_matches_filter(recoder: DataFrameRecoder):
+    for i in range(0, 100, 10):
+        recoder.append(pl.DataFrame({"timestamp": list(range(i, i + 10)), "price": [0.0] * 10}))
+    assert recoder.sorted and recoder.data["timestamp"].flags["SORTED_ASC"]
+    assert recoder[20:29.5]["timestamp"].to_list() == list(range(20, 30))
+    assert recoder[(10.5,)]["timestamp"].to_list() == list(range(11, 100))
+    assert recoder[200].is_empty()
+
+def test_datetime_slice_uses_epoch_ms():
+    from tradepulse.data.dataframe_recoder import time_slice
+    dates = pl.Series("date", [1000, 1500, 2000, 2999, 3000], dtype=pl.Datetime("ms", "UTC")).cast(pl.Datetime("us", "UTC"))
+    df = pl.DataFrame({"date": dates, "close": [1.0] * 5})
+    expected = time_slice(df, "date", 1500, 2999)
+    sliced = time_slice(df.with_columns(pl.col("date").set_sorted()), "date", 1500, 2999)
+    assert sliced.equals(expected) and sliced.height == 3
+    assert time_slice(df.with_columns(pl.col("date").set_sorted()), "date", 1000, limit=2).height == 2
+
+def test_unsorted_data_falls_back_to_filter(recoder: DataFrameRecoder):
+    recoder.append(pl.DataFrame({"timestamp": [5, 6], "price": [0.0, 0.0]}))
+    recoder.append(pl.DataFrame({"timestamp": [1, 9], "price": [0.0, 0.0]}))
+    assert not recoder.sorted
+    assert recoder[5:6]["timestamp"].to_list() == [5, 6]
+
+def test_trim_by_time_and_rows(recoder: DataFrameRecoder):
+    for i in range(0, 1000, 10):
+        recoder.append(pl.DataFrame({"timestamp": list(range(i, i + 10)), "price": [0.0] * 10}))
+    reclaimed = recoder.trim(before=305.5)
+    assert reclaimed > 0
+    assert recoder.first_time == 306 and len(recoder) == 694
+    assert recoder.data["timestamp"].to_list() == list(range(306, 1000))
+    recoder.trim(max_rows=100)
+    assert recoder.data["timestamp"].to_list() == list(range(900, 1000))
+    recoder.trim(before=5000)
+    assert recoder.is_empty and recoder.first_time.is_empty
+
+def test_snapshot_is_immutable(recoder: DataFrameRecoder, sample_df: pl.DataFrame, datetime_df: pl.DataFrame):
+    recoder.append(sample_df)
+    snapshot = recoder.snapshot()
+    recoder.append(datetime_df)
+    recoder.trim(max_rows=1)
+    # 旧版本不受之后写入的影响
+    assert snapshot.rows == 2 and snapshot.data.equals(sample_df)
+    assert snapshot.last_time == 1620000060000
+    assert recoder.snapshot().version > snapshot.version and len(recoder) == 1
+
+def test_snapshot_reads_from_thread(recoder: DataFrameRecoder):
+    import threading
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            snapshot = recoder.snapshot()
+            data = snapshot.data
+            if data.height != snapshot.rows or (snapshot.rows and data["timestamp"][-1] != snapshot.last_time):
+                errors.append(snapshot.version)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for i in range(2000):
+        recoder.append(pl.DataFrame({"timestamp": [i], "price": [0.0]}))
+    stop.set()
+    thread.join()
+    assert not errors
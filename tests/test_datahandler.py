@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+import polars as pl
+import pytest
+
+from tradepulse.data import TimeRange
+from tradepulse.data.history import get_datahandler
+from tradepulse.typenums import CANDLES_SCHEME, CandleType, TradingMode
+
+START = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+MINUTE = 60_000
+
+
+@pytest.fixture
+def datahandler(tmp_path):
+    return get_datahandler(tmp_path, "parquet")
+
+
+@pytest.fixture
+def candles():
+    rows = 100
+    return pl.DataFrame(
+        {
+            "date": [START + i * MINUTE for i in range(rows)],
+            "open": [float(i) for i in range(rows)],
+            "high": [float(i) for i in range(rows)],
+            "low": [float(i) for i in range(rows)],
+            "close": [float(i) for i in range(rows)],
+            "volume": [1.0] * rows,
+        },
+        schema=CANDLES_SCHEME,
+    )
+
+
+def test_ohlcv_load_timerange(datahandler, candles):
+    datahandler.ohlcv_store("BTC_USDT", "1m", candles, CandleType.SPOT)
+    timerange = TimeRange("date", "date", START + 10 * MINUTE, START + 19 * MINUTE)
+
+    df = datahandler._ohlcv_load("BTC_USDT", "1m", timerange, CandleType.SPOT)
+    assert df.height == 10
+    assert df["open"].to_list() == [float(i) for i in range(10, 20)]
+
+    lazy_df = datahandler._ohlcv_scan("BTC_USDT", "1m", timerange, CandleType.SPOT)
+    assert isinstance(lazy_df, pl.LazyFrame)
+    assert lazy_df.collect().equals(df)
+
+
+def test_ohlcv_load_missing(datahandler):
+    df = datahandler._ohlcv_load("ETH_USDT", "1m", None, CandleType.SPOT)
+    assert df.is_empty()
+    assert df.schema == pl.Schema(CANDLES_SCHEME)
+
+
+def test_trades_load_timerange(datahandler):
+    trades = pl.DataFrame(
+        {"timestamp": [START + i * 1000 for i in range(50)], "price": [float(i) for i in range(50)]}
+    ).with_columns(pl.col("timestamp").cast(pl.Datetime("ms", "UTC")))
+    datahandler._trades_store("BTC_USDT", trades, TradingMode.SPOT)
+
+    timerange = TimeRange("date", None, START + 40 * 1000, 0)
+    df = datahandler._trades_load("BTC_USDT", TradingMode.SPOT, timerange=timerange)
+    assert df["price"].to_list() == [float(i) for i in range(40, 50)]
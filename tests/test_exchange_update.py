@@ -0,0 +1,462 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from tradepulse.data import DataKey
+from tradepulse.exchange import ExchangeFactory
+from tradepulse.exchange.scheduler import RateLimiter
+
+START = 1704067200000
+MINUTE = 60_000
+
+
+def candle(i: int) -> list:
+    return [START + i * MINUTE, 1.0, 2.0, 0.5, 1.5, 10.0]
+
+
+class FakeCCXT:
+    """按 symbol 控制延迟的 ccxt.pro 替身"""
+    rateLimit = 0
+
+    def __init__(self, delays: dict[str, float]):
+        self.delays = delays
+        self.calls: list[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def watch_ohlcv(self, symbol: str, timeframe: str = "1m", since=None, limit=None, params={}):
+        self.calls.append(symbol)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(symbol, 0))
+        finally:
+            self.running -= 1
+        return [candle(len(self.calls))]
+
+
+def make_exchange(fake: FakeCCXT, symbols: list[str], **config):
+    exchange = ExchangeFactory.get_exchange(name="binance", config={"name": "binance", **config})
+    exchange.exchange = fake
+    exchange.rateLimit = fake.rateLimit
+    exchange.limiter = RateLimiter(fake.rateLimit)
+    keys = [DataKey(symbol, "1m", "future", "ohlcv") for symbol in symbols]
+    for key in keys:
+        exchange.cache.get_recoder(key=key)
+    return exchange, keys
+
+
+@pytest.mark.asyncio
+async def test_quiet_key_does_not_block():
+    fake = FakeCCXT({"QUIET/USDT": 10})
+    exchange, keys = make_exchange(fake, ["QUIET/USDT", "BUSY/USDT"], watch_timeout=0.1)
+    await exchange._update_newest_data()
+    await exchange._update_newest_data()
+    busy = exchange.cache.get_recoder(key=keys[1])
+    assert len(busy) == 2
+    assert exchange.cache.get_recoder(key=keys[0]).is_empty
+    assert exchange.latency[keys[0]].timeouts == 2
+    assert exchange.latency[keys[1]].count == 2
+
+
+@pytest.mark.asyncio
+async def test_bounded_concurrency():
+    symbols = [f"P{i}/USDT" for i in range(10)]
+    fake = FakeCCXT({symbol: 0.02 for symbol in symbols})
+    exchange, keys = make_exchange(fake, symbols, max_concurrency=3)
+    await exchange._update_newest_data()
+    assert fake.max_running == 3
+    assert all(len(exchange.cache.get_recoder(key=key)) == 1 for key in keys)
+    assert all(exchange.latency[key].mean > 0 for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_new_subscriptions_respect_rate_limit():
+    fake = FakeCCXT({})
+    fake.rateLimit = 50
+    exchange, keys = make_exchange(fake, ["A/USDT", "B/USDT", "C/USDT"])
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await exchange._update_newest_data()
+    assert loop.time() - start >= 0.1
+    # 已订阅的 key 不再等待
+    start = loop.time()
+    await exchange._update_newest_data()
+    assert loop.time() - start < 0.05
+
+
+class FakeMultiplexCCXT(FakeCCXT):
+    has = {"watchOHLCVForSymbols": True, "watchTradesForSymbols": True}
+
+    def __init__(self):
+        super().__init__({})
+        self.batches: list[list] = []
+
+    def market(self, pair: str) -> dict:
+        return {"symbol": f"{pair}:USDT"}
+
+    async def watch_ohlcv_for_symbols(self, symbolsAndTimeframes, since=None, limit=None, params={}):
+        self.batches.append(symbolsAndTimeframes)
+        return {f"{symbol}:USDT": {timeframe: [candle(len(self.batches))]} for symbol, timeframe in symbolsAndTimeframes[:2]}
+
+
+@pytest.mark.asyncio
+async def test_multiplexed_ohlcv():
+    symbols = [f"P{i}/USDT" for i in range(5)]
+    fake = FakeMultiplexCCXT()
+    exchange, keys = make_exchange(fake, symbols, multiplex=True, multiplex_size=3)
+    await exchange._update_newest_data()
+    # 5 个 key 分为两个订阅，没有单独的 watch_ohlcv
+    assert [len(batch) for batch in fake.batches] == [3, 2]
+    assert fake.calls == []
+    # 每个订阅返回前两个 symbol 的数据，按 symbol 写入对应的 key
+    assert [len(exchange.cache.get_recoder(key=key)) for key in keys] == [1, 1, 0, 1, 1]
+    assert exchange.latency[keys[0]].count == 1 and exchange.latency[keys[2]].count == 0
+
+
+@pytest.mark.asyncio
+async def test_updater_isolates_tasks():
+    from tradepulse.exchange import ExchangeUpdater
+
+    fake = FakeCCXT({"BTC/USDT": 0.01})
+    exchange, keys = make_exchange(fake, ["BTC/USDT"])
+
+    async def slow_history(current_time):
+        await asyncio.sleep(10)
+
+    async def broken_unwatch():
+        raise RuntimeError("boom")
+
+    def broken_budget():
+        raise OSError("disk full")
+
+    exchange._update_history_data = slow_history
+    exchange._check_and_unwatch_data = broken_unwatch
+    exchange.cache.enforce_budget = broken_budget
+    updater = ExchangeUpdater(exchange, housekeeping_interval=0.01, retention_interval=0.01)
+    updater.start()
+    await asyncio.sleep(0.2)
+    await updater.stop()
+    # 历史回补卡住、清理出错都不影响实时数据
+    assert len(exchange.cache.get_recoder(key=keys[0])) >= 5
+    metrics = updater.metrics()
+    assert metrics["appended"] == len(exchange.cache.get_recoder(key=keys[0]))
+    assert metrics["queue_depth"] == 0
+    assert metrics["reclaimed_bytes"] == 0
+    assert metrics["errors"]["housekeeping"] >= 2
+    # 缓存清理出错后继续按间隔执行
+    assert metrics["errors"]["retention"] >= 2
+    assert exchange.live_queue is None
+
+
+@pytest.mark.asyncio
+async def test_live_backs_off_when_every_key_fails():
+    from tradepulse.exchange import ExchangeUpdater
+
+    class BrokenCCXT(FakeCCXT):
+        async def watch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None, params={}):
+            self.calls.append(symbol)
+            raise RuntimeError("disconnected")
+
+    fake = BrokenCCXT({})
+    exchange, _ = make_exchange(fake, ["BTC/USDT", "ETH/USDT"])
+    assert await exchange._update_newest_data() is False
+    updater = ExchangeUpdater(exchange, idle_interval=0.01, max_idle_interval=0.04)
+    updater.start()
+    await asyncio.sleep(0.3)
+    await updater.stop()
+    # 全部出错时等待时间加倍，不会空转
+    assert updater.live_backoff == 0.04
+    assert len(fake.calls) < 30
+    assert await make_exchange(FakeCCXT({}), ["BTC/USDT"])[0]._update_newest_data() is True
+
+
+@pytest.mark.asyncio
+async def test_updater_reloads_spilled_key_on_read(tmp_path):
+    from tradepulse.exchange import ExchangeUpdater
+
+    fake = FakeCCXT({})
+    exchange, keys = make_exchange(fake, [])
+    cache = exchange.cache
+    key = DataKey("BTC/USDT", "1m", "future", "ohlcv")
+    cache.append(key, [candle(i) for i in range(10)])
+    cache.budget_bytes, cache.spill_dir, cache.min_idle = 1, tmp_path, 0
+    cache.enforce_budget()
+    assert key in cache.spilled
+    cache.min_idle = 60
+    updater = ExchangeUpdater(exchange, retention_interval=60)
+    updater.start()
+    await asyncio.sleep(0.01)
+    assert cache.read(key).first_time == START
+    await asyncio.sleep(0.05)
+    # 不必等到下一次 retention
+    assert key not in cache.spilled and cache[key].first_time == START
+    await updater.stop()
+    assert cache.on_spilled_read is None
+
+
+@pytest.mark.asyncio
+async def test_live_queue_backpressure():
+    fake = FakeCCXT({})
+    exchange, keys = make_exchange(fake, ["A/USDT", "B/USDT", "C/USDT"])
+    exchange.live_queue = asyncio.Queue(maxsize=1)
+    task = asyncio.create_task(exchange._update_newest_data())
+    await asyncio.sleep(0.05)
+    # 队列满时 watch 任务等待，数据不会丢失也不会直接写入缓存
+    assert not task.done()
+    assert exchange.live_queue.qsize() == 1
+    while not task.done():
+        exchange._append_newest(*exchange.live_queue.get_nowait()[:2])
+        await asyncio.sleep(0.01)
+    while not exchange.live_queue.empty():
+        exchange._append_newest(*exchange.live_queue.get_nowait()[:2])
+    assert all(len(exchange.cache.get_recoder(key=key)) == 1 for key in keys)
+
+
+# ==================
+# 限速器测试
+# ==================
+@pytest.mark.asyncio
+async def test_rate_limiter_priority():
+    limiter = RateLimiter(rate_limit=20)
+    order: list[int] = []
+
+    async def request(priority: int):
+        await limiter.acquire(priority)
+        order.append(priority)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await limiter.acquire()
+    await asyncio.gather(*(request(p) for p in (5, 1, 3, 2, 4)))
+    # 第一个令牌之后每 20ms 一个，高优先级先拿到
+    assert order == [1, 2, 3, 4, 5]
+    assert loop.time() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_pause_and_shared():
+    owner = FakeCCXT({})
+    limiter = RateLimiter.shared(owner, rate_limit=1)
+    assert RateLimiter.shared(owner, rate_limit=1) is limiter
+    loop = asyncio.get_running_loop()
+    await limiter.acquire()
+    limiter.pause(0.1)
+    start = loop.time()
+    await limiter.acquire()
+    assert loop.time() - start >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_backfill_goes_through_limiter():
+    fake = FakeCCXT({})
+    exchange, keys = make_exchange(fake, ["BTC/USDT"])
+    exchange.limiter = RateLimiter(rate_limit=20)
+    exchange.cache.append(keys[0], [candle(10)])
+    calls = []
+
+    async def fetch(since):
+        calls.append(asyncio.get_running_loop().time())
+        i = -(-(since - START) // MINUTE)
+        return [candle(j) for j in range(i, min(i + 3, 10))]
+
+    await exchange._fetch_history_data(keys[0], since=START, fetch_func=fetch)
+    assert len(calls) >= 3
+    assert all(b - a >= 0.015 for a, b in zip(calls, calls[1:]))
+
+
+# ==================
+# 窗口并发回补测试
+# ==================
+class FakeHistoryCCXT(FakeCCXT):
+    """fetch_ohlcv 每次最多返回 limit + 2 根 K 线，超出窗口的部分需要去掉"""
+    def __init__(self, total: int):
+        super().__init__({})
+        self.total = total
+        self.sinces: list[int] = []
+        self.max_fetching = 0
+
+    async def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None, params={}):
+        self.sinces.append(since)
+        self.running += 1
+        self.max_fetching = max(self.max_fetching, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        i = -(-(since - START) // MINUTE)
+        return [candle(j) for j in range(i, min(i + limit + 2, self.total))]
+
+
+@pytest.mark.asyncio
+async def test_windowed_ohlcv_backfill():
+    fake = FakeHistoryCCXT(total=100)
+    exchange, keys = make_exchange(fake, ["BTC/USDT"], windowed_backfill=True, ohlcv_limit=10, backfill_concurrency=4)
+    exchange.cache.append(keys[0], [candle(95), candle(96)])
+    await exchange._fetch_history_ohlcv(keys[0], since=START + 3 * MINUTE + 1)
+    # [3, 95) 的窗口起点按 timeframe 对齐，每个窗口 10 根
+    assert sorted(fake.sinces) == [START + i * MINUTE for i in range(3, 95, 10)]
+    # 离缓存最近的窗口最先请求
+    assert fake.sinces[:4] == [START + i * MINUTE for i in (93, 83, 73, 63)]
+    assert 1 < fake.max_fetching <= 4
+    dates = exchange.cache.get_recoder(key=keys[0]).rawdata["date"].dt.epoch("ms").to_list()
+    assert dates == [START + i * MINUTE for i in range(3, 97)]
+
+
+@pytest.mark.asyncio
+async def test_windowed_backfill_prepends_incrementally():
+    fake = FakeHistoryCCXT(total=100)
+    exchange, keys = make_exchange(fake, ["BTC/USDT"], windowed_backfill=True, ohlcv_limit=10, backfill_concurrency=2)
+    exchange.cache.append(keys[0], [candle(40)])
+    recoder = exchange.cache.get_recoder(key=keys[0])
+    sizes = []
+    events = []
+    prepend = recoder.prepend
+    fetch_ohlcv = fake.fetch_ohlcv
+
+    def record(data, dt=None):
+        prepend(data, dt)
+        sizes.append(len(recoder))
+        events.append("prepend")
+
+    async def fetch(symbol, timeframe="1m", since=None, limit=None, params={}):
+        events.append(since)
+        return await fetch_ohlcv(symbol, timeframe, since, limit, params)
+
+    recoder.prepend = record
+    fake.fetch_ohlcv = fetch
+    await exchange._fetch_history_ohlcv(keys[0], since=START)
+    # 从最新的窗口开始，最旧的窗口开始请求之前已经有数据前置到缓存
+    assert events.index("prepend") < events.index(START)
+    assert sizes == [11, 21, 31, 41]
+    assert recoder.rawdata["date"].dt.epoch("ms").to_list() == [START + i * MINUTE for i in range(41)]
+
+
+@pytest.mark.asyncio
+async def test_sequential_trades_backfill():
+    fake = FakeCCXT({})
+    exchange, _ = make_exchange(fake, [])
+    key = DataKey("BTC/USDT", "", "future", "trades")
+    trade = lambda i: {"timestamp": START + i * 1000, "id": str(i), "type": None, "side": "buy", "price": 1.0, "amount": 1.0, "cost": 1.0}
+    exchange.cache.append(key, [trade(20)])
+
+    async def fetch(since):
+        i = -(-(since - START) // 1000)
+        return [trade(j) for j in range(i, min(i + 8, 25))]
+
+    await exchange._fetch_history_data(key, since=START, fetch_func=fetch)
+    timestamps = exchange.cache.get_recoder(key=key).rawdata["timestamp"].dt.epoch("ms").to_list()
+    assert timestamps == [START + i * 1000 for i in range(21)]
+
+
+@pytest.mark.asyncio
+async def test_sequential_backfill_from_empty_cache(monkeypatch):
+    now = datetime.fromtimestamp((START + 30 * 1000) / 1000, timezone.utc)
+    monkeypatch.setattr("tradepulse.exchange.exchange.dt_now", lambda: now)
+    fake = FakeCCXT({})
+    exchange, _ = make_exchange(fake, [])
+    key = DataKey("BTC/USDT", "", "future", "trades")
+    trade = lambda i: {"timestamp": START + i * 1000, "id": str(i), "type": None, "side": "buy", "price": 1.0, "amount": 1.0, "cost": 1.0}
+
+    async def fetch(since):
+        i = int(-(-(since - START) // 1000))
+        return [trade(j) for j in range(i, min(i + 8, 30))]
+
+    await exchange._fetch_history_data(key, since=START, fetch_func=fetch)
+    # 空缓存从当前时间向前获取
+    timestamps = exchange.cache.get_recoder(key=key).rawdata["timestamp"].dt.epoch("ms").to_list()
+    assert timestamps == [START + i * 1000 for i in range(30)]
+
+
+@pytest.mark.asyncio
+async def test_trades_backfill_keeps_same_millisecond_across_pages():
+    fake = FakeCCXT({})
+    exchange, _ = make_exchange(fake, [])
+    key = DataKey("BTC/USDT", "", "future", "trades")
+    # 每毫秒 3 笔成交，每页 4 笔，同一毫秒的成交会被分到两页
+    trade = lambda i: {"timestamp": START + i // 3, "id": str(i), "type": None, "side": "buy", "price": 1.0, "amount": 1.0, "cost": 1.0}
+    trades = [trade(i) for i in range(30)]
+    exchange.cache.append(key, [trade(30)])
+
+    async def fetch(since):
+        first = next(i for i, t in enumerate(trades) if t["timestamp"] >= since)
+        return trades[first:first + 4] or [trade(30)]
+
+    await exchange._fetch_history_data(key, since=START, fetch_func=fetch)
+    ids = exchange.cache.get_recoder(key=key).rawdata["id"].to_list()
+    assert ids == [str(i) for i in range(31)]
+
+
+@pytest.mark.asyncio
+async def test_windowed_backfill_pages_within_window():
+    fake = FakeHistoryCCXT(total=100)
+    exchange, keys = make_exchange(fake, ["BTC/USDT"], windowed_backfill=True, ohlcv_limit=20, backfill_concurrency=2)
+    exchange.cache.append(keys[0], [candle(80)])
+    fetch_ohlcv = fake.fetch_ohlcv
+
+    async def capped(symbol, timeframe="1m", since=None, limit=None, params={}):
+        # 交易所每次最多返回 6 根，少于 ohlcv_limit
+        return (await fetch_ohlcv(symbol, timeframe, since, limit, params))[:6]
+
+    fake.fetch_ohlcv = capped
+    await exchange._fetch_history_ohlcv(keys[0], since=START)
+    dates = exchange.cache.get_recoder(key=keys[0]).rawdata["date"].dt.epoch("ms").to_list()
+    assert dates == [START + i * MINUTE for i in range(81)]
+
+
+@pytest.mark.asyncio
+async def test_history_update_backfills_empty_cache(monkeypatch):
+    now = datetime.fromtimestamp((START + 40 * MINUTE) / 1000, timezone.utc)
+    monkeypatch.setattr("tradepulse.exchange.exchange.dt_now", lambda: now)
+    fake = FakeHistoryCCXT(total=30)
+    exchange, keys = make_exchange(fake, ["BTC/USDT", "ETH/USDT"], windowed_backfill=True, ohlcv_limit=10)
+    exchange.cache.append(keys[1], [candle(29)])
+    for key in keys:
+        exchange.set_since(key, START, "1m")
+    await exchange._update_history_data(now)
+    # 空缓存不会让整轮回补失败，从当前时间向前回补
+    assert len(exchange.cache.get_recoder(key=keys[0])) == 30
+    assert len(exchange.cache.get_recoder(key=keys[1])) == 30
+
+
+@pytest.mark.asyncio
+async def test_sequential_backfill_commits_contiguous_segments():
+    fake = FakeCCXT({})
+    exchange, _ = make_exchange(fake, [])
+    key = DataKey("BTC/USDT", "", "future", "trades")
+    trade = lambda i: {"timestamp": START + i * 1000, "id": str(i), "type": None, "side": "buy", "price": 1.0, "amount": 1.0, "cost": 1.0}
+    exchange.cache.append(key, [trade(200)])
+    recoder = exchange.cache.get_recoder(key=key)
+    firsts = []
+    prepend = recoder.prepend
+
+    def record(data, dt=None):
+        prepend(data, dt)
+        firsts.append(int(recoder.first_time))
+
+    recoder.prepend = record
+
+    async def fetch(since):
+        i = int(-(-(since - START) // 1000))
+        # 早于 100 的数据一直请求失败
+        if i < 100:
+            return None
+        return [trade(j) for j in range(i, min(i + 8, 201))]
+
+    await exchange._fetch_history_data(key, since=START, fetch_func=fetch)
+    # 从缓存最早的时间向前逐段前置，失败的段不写入，缓存中没有缺口
+    assert len(firsts) > 1 and firsts == sorted(firsts, reverse=True)
+    timestamps = recoder.rawdata["timestamp"].dt.epoch("ms").to_list()
+    first = (timestamps[0] - START) // 1000
+    assert 100 <= first < 140
+    assert timestamps == [START + i * 1000 for i in range(first, 201)]
+
+
+def test_funding_rate_history_from_cache():
+    exchange, _ = make_exchange(FakeCCXT({}), [])
+    key = DataKey("BTC/USDT", "", "future", "funding_rate")
+    # 没有缓存时只记录 since，由回补任务创建 key
+    assert exchange.funding_rate_history("BTC/USDT", since=START).is_empty()
+    assert key not in exchange.cache and exchange.since[key].time_marker == START
+    exchange.cache.append(key, [{"timestamp": START + i * 8 * 3600_000, "fundingRate": 0.0001 * i} for i in range(3)])
+    df = exchange.funding_rate_history("BTC/USDT", since=START + 1)
+    assert df["fundingRate"].to_list() == [0.0001, 0.0002]
@@ -0,0 +1,36 @@
+import pytest
+
+from tradepulse.data.list_recoder import ListDataRecoder
+
+START = 1704067200000
+
+
+def rows(start: int, stop: int) -> list[list]:
+    return [[START + i * 1000, float(i)] for i in range(start, stop)]
+
+
+@pytest.fixture
+def recoder():
+    return ListDataRecoder(pair="BTC/USDT", marketType="future", datatype="trades")
+
+
+def test_snapshot_is_isolated_from_writes(recoder: ListDataRecoder):
+    assert recoder.snapshot().is_empty and recoder.snapshot().first_time.is_empty
+    recoder.append(rows(5, 10))
+    snapshot = recoder.snapshot()
+    recoder.append(rows(10, 12))
+    recoder.prepend(rows(0, 5))
+    # 之后的写入不影响已经取得的 snapshot
+    assert snapshot.rows == 5
+    assert (snapshot.first_time, snapshot.last_time) == (START + 5000, START + 9000)
+    assert snapshot[START + 6000:START + 7000] == rows(6, 8)
+    assert (recoder.first_time, recoder.last_time) == (START, START + 11000)
+
+
+def test_trim(recoder: ListDataRecoder):
+    recoder.append(rows(0, 20))
+    assert recoder.trim(before=START + 5000) > 0
+    assert recoder.first_time == START + 5000 and len(recoder) == 15
+    recoder.trim(max_rows=4)
+    assert recoder.rawdata == rows(16, 20)
+    assert recoder.trim(before=START, max_rows=10) == 0
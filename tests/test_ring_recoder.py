@@ -0,0 +1,86 @@
+import polars as pl
+import pytest
+
+from tradepulse.data.cache_data import DataframeCache
+from tradepulse.data.protocol import DataKey
+from tradepulse.data.ring_recoder import RingBufferRecoder
+from tradepulse.typenums import CANDLES_SCHEME, TRADES_SCHEME
+
+START = 1704067200000
+
+
+def candles(start: int, stop: int) -> pl.DataFrame:
+    return pl.DataFrame([[START + i * 60_000, 1.0, 2.0, 0.5, float(i), 10.0] for i in range(start, stop)], schema=CANDLES_SCHEME, orient="row")
+
+
+def dates(recoder: RingBufferRecoder) -> list[int]:
+    return [(t - START) // 60_000 for t in recoder.rawdata["date"].dt.epoch("ms").to_list()]
+
+
+@pytest.fixture
+def recoder():
+    return RingBufferRecoder(pair="BTC/USDT", marketType="future", datatype="ohlcv", timeframe="1m", max_rows=10)
+
+
+def test_append_overwrites_oldest(recoder: RingBufferRecoder):
+    for i in range(0, 25, 3):
+        recoder.append(candles(i, i + 3))
+    assert len(recoder) == 10 and recoder.dropped == 17
+    assert dates(recoder) == list(range(17, 27))
+    assert recoder.first_time == START + 17 * 60_000
+    assert recoder.last_time == START + 26 * 60_000
+    assert recoder.rawdata.schema == pl.Schema(CANDLES_SCHEME)
+    # 一次写入超过容量时只保留最新的行
+    recoder.append(candles(30, 45))
+    assert dates(recoder) == list(range(35, 45))
+
+
+def test_prepend_fills_free_space(recoder: RingBufferRecoder):
+    recoder.append(candles(10, 14))
+    recoder.prepend(candles(5, 10))
+    assert dates(recoder) == list(range(5, 14))
+    recoder.prepend(candles(0, 5))
+    assert dates(recoder) == list(range(4, 14)) and recoder.dropped == 4
+
+
+def test_drop_before_and_slice(recoder: RingBufferRecoder):
+    recoder.append(candles(0, 8))
+    recoder.append(candles(8, 14))
+    # 数据跨过数组末尾
+    assert recoder.head == 4
+    assert recoder.drop_before(START + 9 * 60_000) == 5
+    assert dates(recoder) == list(range(9, 14))
+    assert recoder[START + 11 * 60_000:START + 12 * 60_000]["close"].to_list() == [11.0, 12.0]
+
+
+def test_trades_memory_budget():
+    recoder = RingBufferRecoder(pair="BTC/USDT", marketType="future", datatype="trades", max_bytes=10_000)
+    assert recoder.nbytes <= 10_000
+    trades = pl.DataFrame([[START + i, str(i), None, "buy", 1.0, 1.0, 1.0] for i in range(1000)], schema=TRADES_SCHEME, orient="row")
+    recoder.append(trades)
+    assert len(recoder) == recoder.capacity
+    assert recoder.rawdata["id"].to_list()[-1] == "999"
+
+
+def test_cache_uses_ring_buffer():
+    cache = DataframeCache(max_rows=5)
+    key = DataKey("BTC/USDT", "1m", "future", "ohlcv")
+    cache.append(key, [[START + i * 60_000, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(8)])
+    assert isinstance(cache.get_recoder(key=key), RingBufferRecoder)
+    assert len(cache.get_recoder(key=key)) == 5
+
+
+def test_trim(recoder: RingBufferRecoder):
+    recoder.append(candles(0, 10))
+    assert recoder.trim(before=START + 2 * 60_000 + 1, max_rows=5) == 5 * recoder.row_bytes
+    assert dates(recoder) == list(range(5, 10))
+    assert recoder.trim(before=START + 7 * 60_000) == 2 * recoder.row_bytes
+
+
+def test_snapshot_survives_overwrite(recoder: RingBufferRecoder):
+    recoder.append(candles(0, 10))
+    snapshot = recoder.snapshot()
+    assert recoder.snapshot() is snapshot
+    recoder.append(candles(10, 20))
+    assert snapshot.data["close"].to_list() == [float(i) for i in range(10)]
+    assert recoder.version % 2 == 0 and recoder.snapshot().version > snapshot.version
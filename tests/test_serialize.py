@@ -1,7 +1,15 @@
 import pytest
 import polars as pl
 import pyarrow as pa
-from tradepulse.data.serialize import serialize_dataframe, deserialize_dataframe
+from tradepulse.data.serialize import (
+    serialize_dataframe,
+    deserialize_dataframe,
+    serialize_batches,
+    deserialize_batches,
+    serialize_dataframe_frames,
+    deserialize_dataframe_frames,
+    DataFrameTransport,
+)
 from datetime import datetime
 
 def test_serialize_non_empty():
@@ -49,4 +57,56 @@ def test_roundtrip_with_metadata():
     serialized = serialize_dataframe(df)
     deserialized = deserialize_dataframe(serialized)
     assert deserialized.equals(df)
-    assert deserialized["timestamp"].dtype == pl.Datetime(time_unit="ms")
\ No newline at end of file
+    assert deserialized["timestamp"].dtype == pl.Datetime(time_unit="ms")
+
+def test_serialize_batches_roundtrip():
+    """测试多个DataFrame写入同一个stream"""
+    df = pl.DataFrame({"timestamp": [1, 2], "value": [100.0, 200.0]})
+    empty = df.clear()
+    dfs = deserialize_batches(serialize_batches([df, empty, pl.DataFrame(), df]))
+    assert len(dfs) == 4
+    assert dfs[0].equals(df)
+    assert dfs[1].is_empty() and dfs[1].columns == df.columns
+    assert dfs[2].is_empty()
+    assert dfs[3].equals(df)
+
+def test_frames_roundtrip():
+    """测试格式标识头与数据分帧"""
+    df = pl.DataFrame({"timestamp": [1, 2, 3], "side": ["buy", "sell", "buy"]})
+    header, payload = serialize_dataframe_frames(df)
+    assert header == b"POLARS_IPC"
+    assert isinstance(payload, memoryview)
+    assert deserialize_dataframe_frames(header, payload).equals(df)
+
+    header, payload = serialize_dataframe_frames(df.to_arrow())
+    assert header == b"ARROW_IPC"
+    assert deserialize_dataframe_frames(header, payload).equals(df)
+
+    with pytest.raises(ValueError):
+        deserialize_dataframe_frames(b"UNKNOWN", payload)
+
+def test_deserialize_memoryview():
+    """测试从memoryview反序列化"""
+    df = pl.DataFrame({"a": [1, 2, 3]})
+    assert deserialize_dataframe(memoryview(serialize_dataframe(df))).equals(df)
+
+@pytest.mark.parametrize("compression", ["lz4", "zstd"])
+def test_compressed_roundtrip(compression):
+    """测试 IPC body 压缩，读取端自动解压"""
+    df = pl.DataFrame({"timestamp": range(10_000), "close": [30000.0] * 10_000})
+    header, payload = serialize_dataframe_frames(df, compression)
+    assert len(payload) < len(serialize_dataframe_frames(df)[1])
+    assert deserialize_dataframe_frames(header, payload).equals(df)
+
+    header, payload = serialize_dataframe_frames(df.to_arrow(), compression)
+    assert deserialize_dataframe_frames(header, payload).equals(df)
+
+    dfs = deserialize_batches(serialize_batches([df, df.clear()], compression))
+    assert dfs[0].equals(df) and dfs[1].is_empty()
+
+def test_transport_roundtrip():
+    """测试 DataFrameTransport 压缩与解压"""
+    df = pl.DataFrame({"timestamp": range(1000), "close": [30000.0] * 1000})
+    header, raw = DataFrameTransport.serialize_dataframe(df)
+    assert header["compression"] == "lz4"
+    assert DataFrameTransport().recv_dataframe(header, raw).equals(df)
@@ -0,0 +1,116 @@
+import polars as pl
+import pytest
+
+from tradepulse.data.cache_data import DataframeCache
+from tradepulse.data.protocol import DataKey
+from tradepulse.data.tiered_recoder import TieredRecoder
+
+
+def rows(start: int, stop: int) -> pl.DataFrame:
+    return pl.DataFrame({"timestamp": list(range(start, stop)), "price": [float(i) for i in range(start, stop)]})
+
+
+@pytest.fixture
+def recoder(tmp_path):
+    recoder = TieredRecoder(pair="BTC/USDT", marketType="future", datatype="trades", directory=tmp_path, hot_rows=50)
+    recoder.fanout = 4
+    return recoder
+
+
+def test_old_chunks_flushed_to_ipc(recoder: TieredRecoder, tmp_path):
+    for i in range(0, 300, 10):
+        recoder.append(rows(i, i + 10))
+    assert recoder.rows <= 50 + 40 and recoder.warm_rows > 0
+    assert len(recoder) == 300 and len(list(tmp_path.iterdir())) == len(recoder.segments)
+    # 查询同时覆盖温数据和热数据
+    assert recoder.data["timestamp"].to_list() == list(range(300))
+    assert recoder[95:105]["timestamp"].to_list() == list(range(95, 106))
+    assert recoder.estimated_size() < recoder.data.estimated_size()
+
+
+def test_flush_writes_hot_rows_segments(recoder: TieredRecoder, tmp_path):
+    recoder.hot_rows, recoder.fanout = 1000, 1000
+    for i in range(0, 300, 10):
+        recoder.append(rows(i, i + 10))
+    assert not recoder.segments and len(recoder.chunks) == 30
+    version = recoder.snapshot().version
+    recoder.hot_rows = 50
+    recoder.flush()
+    # 一次移出的 25 个块合并为 5 个 50 行的文件，只发布一次
+    assert [segment.height for segment in recoder.segments] == [50] * 5
+    assert len(list(tmp_path.iterdir())) == 5
+    assert recoder.snapshot().version == version + 1
+    assert recoder.data["timestamp"].to_list() == list(range(300))
+
+
+def test_prepend_before_warm(recoder: TieredRecoder):
+    for i in range(100, 300, 10):
+        recoder.append(rows(i, i + 10))
+    assert recoder.segments
+    recoder.prepend(rows(50, 100))
+    assert recoder.first_time == 50 and recoder.sorted
+    assert recoder.data["timestamp"].to_list() == list(range(50, 300))
+
+
+def test_trim_across_tiers(recoder: TieredRecoder, tmp_path):
+    for i in range(0, 300, 10):
+        recoder.append(rows(i, i + 10))
+    segments = len(recoder.segments)
+    recoder.trim(before=85)
+    assert recoder.first_time == 85 and len(recoder) == 215
+    assert len(list(tmp_path.iterdir())) < segments
+    recoder.trim(max_rows=20)
+    assert not recoder.segments and not list(tmp_path.iterdir())
+    assert recoder.data["timestamp"].to_list() == list(range(280, 300))
+
+
+def test_trim_frees_pending_prepends(recoder: TieredRecoder):
+    for i in range(200, 300, 10):
+        recoder.append(rows(i, i + 10))
+    recoder.prepend(rows(160, 200))
+    assert recoder.segment_paths[0] is None
+    size = recoder.estimated_size()
+    # 只裁剪内存中回补数据的一部分，也计入释放的字节数
+    freed = recoder.trim(before=180)
+    assert freed > 0 and recoder.estimated_size() == size - freed
+    assert recoder.first_time == 180 and recoder.segments[0].height == 20
+
+
+def test_cache_uses_tiers(tmp_path):
+    cache = DataframeCache(tier_dir=tmp_path, hot_rows=10)
+    key = DataKey("BTC/USDT", "", "future", "trades")
+    for i in range(100):
+        cache.append(key, [[1704067200000 + i, str(i), None, "buy", 1.0, 1.0, 1.0]])
+    recoder = cache.get_recoder(key=key)
+    assert isinstance(recoder, TieredRecoder) and recoder.segments
+    assert recoder.rawdata["id"].to_list() == [str(i) for i in range(100)]
+
+
+def test_prepends_coalesced_into_segments(recoder: TieredRecoder, tmp_path):
+    for i in range(200, 300, 10):
+        recoder.append(rows(i, i + 10))
+    files = len(list(tmp_path.iterdir()))
+    for i in range(190, -10, -10):
+        recoder.prepend(rows(i, i + 10))
+    # 每次回补 10 行，累计到 hot_rows 行才写入一个文件
+    assert len(list(tmp_path.iterdir())) == files + 4
+    assert recoder.first_time == 0 and recoder.sorted
+    assert recoder.data["timestamp"].to_list() == list(range(300))
+
+
+def test_mapped_segment_unlinked_later(recoder: TieredRecoder, tmp_path, monkeypatch):
+    for i in range(0, 300, 10):
+        recoder.append(rows(i, i + 10))
+    snapshot = recoder.snapshot()
+
+    def locked(self, missing_ok=False):
+        raise PermissionError(f"{self} is mapped")
+
+    # 模拟 Windows：仍被映射的文件不能删除
+    with monkeypatch.context() as patch:
+        patch.setattr(type(tmp_path), "unlink", locked)
+        recoder.trim(before=100)
+    assert recoder.retired and all(path.exists() for path in recoder.retired)
+    assert snapshot.data["timestamp"].to_list() == list(range(300))
+    recoder.append(rows(300, 310))
+    assert not recoder.retired and len(list(tmp_path.iterdir())) == len(recoder.segments)